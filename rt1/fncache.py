@@ -0,0 +1,260 @@
+"""
+Persistent on-disk cache for the fn-coefficients and the generated source
+of the _fnevals functions.
+
+The cache-entries are addressed by a hash of the model-signature, i.e.
+of all properties of an RT1-object that have an effect on the
+fn-coefficients (the classes, legendre-coefficients, number of coefficients
+and a-parameters of V and SRF, the geometry, the keys of param_dict and the
+chosen lambda_backend).
+"""
+
+import os
+import hashlib
+import pickle
+import tempfile
+import errno
+
+import numpy as np
+import sympy as sp
+
+try:
+    # fcntl is only available on unix-systems. On other systems, the
+    # cache relies only on atomic file-replacements.
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# os.replace is atomic on all platforms but not available for python 2
+_replace = getattr(os, 'replace', os.rename)
+
+# increase this number if the format of the cache-entries changes
+_CACHE_VERSION = 1
+
+
+def _scatter_signature(S):
+    '''
+    a string-representation of all properties of a Volume or Surface
+    object that are used to evaluate its legendre-expansion
+    '''
+    # linear-combinations are represented by their individual choices
+    choices = getattr(S, 'Vchoices', getattr(S, 'SRFchoices', None))
+    if choices is not None:
+        return (type(S).__name__ + '(' +
+                ', '.join([repr(float(w)) + '*' + _scatter_signature(c)
+                           for w, c in choices]) + ')')
+
+    return (type(S).__name__ +
+            '(legcoefs=' + sp.srepr(sp.sympify(S.legcoefs)) +
+            ', ncoefs=' + str(S.ncoefs) +
+            ', a=' + repr([float(i) for i in S.a]) + ')')
+
+
+def model_signature(R):
+    '''
+    Generate a string that uniquely identifies the fn-coefficients (and
+    the generated _fnevals functions) of the given RT1-object.
+
+    Parameters:
+    ------------
+    R : RT1-object
+
+    Returns:
+    ---------
+    signature : str
+    '''
+
+    # angles that are treated as numerical constants within the
+    # fn-coefficients must be part of the signature
+    if R.geometry == 'mono':
+        fixed = [np.unique(R.p_0)[0]]
+    else:
+        fixed = [np.unique(ang)[0] if g == 'f' else None
+                 for g, ang in zip(R.geometry,
+                                   [R.t_0, R.t_ex, R.p_0, R.p_ex])]
+
+    return '; '.join([
+        'version=' + str(_CACHE_VERSION),
+        'V=' + _scatter_signature(R.V),
+        'SRF=' + _scatter_signature(R.SRF),
+        'geometry=' + R.geometry,
+        'fixed=' + repr([None if i is None else float(i) for i in fixed]),
+        'params=' + repr(list(map(str, R.param_dict.keys()))),
+        'lambda_backend=' + str(R.lambda_backend)])
+
+
+class FnCache(object):
+    '''
+    A persistent on-disk cache for fn-coefficients and the source-code
+    of the generated _fnevals functions.
+
+    The cache is safe to be used by multiple processes simultaneously:
+    entries are written to temporary files and moved in place atomically,
+    and the eviction of entries is guarded by a file-lock (if fcntl is
+    available).
+
+    If the total size of the stored entries exceeds max_size, the least
+    recently used entries are removed.
+
+    Parameters:
+    ------------
+    path : str (default = None)
+           the directory used to store the cache-entries.
+           If None, the directory '~/.rt1/fncache' is used.
+    max_size : int (default = 500e6)
+               the maximum size (in bytes) of all stored cache-entries
+    '''
+
+    def __init__(self, path=None, max_size=500e6):
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.rt1', 'fncache')
+        self.path = path
+        self.max_size = max_size
+
+        try:
+            os.makedirs(self.path)
+        except OSError as err:
+            if err.errno != errno.EEXIST:
+                raise
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def key(self, R):
+        '''
+        the (content-addressed) key of the cache-entry of an RT1-object
+        '''
+        return hashlib.sha256(
+            model_signature(R).encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key + '.pkl')
+
+    def _entries(self):
+        # list all cache-entries as tuples of (mtime, size, path)
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.pkl'):
+                continue
+            filepath = os.path.join(self.path, name)
+            try:
+                stat = os.stat(filepath)
+            except OSError:
+                # the entry has been removed by another process
+                continue
+            entries += [(stat.st_mtime, stat.st_size, filepath)]
+        return entries
+
+    def _lock(self):
+        lockfile = open(os.path.join(self.path, '.lock'), 'a')
+        if fcntl is not None:
+            fcntl.flock(lockfile, fcntl.LOCK_EX)
+        return lockfile
+
+    def _unlock(self, lockfile):
+        if fcntl is not None:
+            fcntl.flock(lockfile, fcntl.LOCK_UN)
+        lockfile.close()
+
+    def get(self, key):
+        '''
+        Load a cache-entry.
+
+        Parameters:
+        ------------
+        key : str
+              the key of the cache-entry (see FnCache.key())
+
+        Returns:
+        ---------
+        entry : dict or None
+                the cache-entry or None if no entry is available
+        '''
+        filepath = self._entry_path(key)
+        try:
+            with open(filepath, 'rb') as file:
+                entry = pickle.load(file)
+            # update the modification-time to keep track of the
+            # least recently used entries
+            os.utime(filepath, None)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        '''
+        Store a cache-entry and remove the least recently used entries
+        in case the size-limit of the cache is exceeded.
+
+        Parameters:
+        ------------
+        key : str
+              the key of the cache-entry (see FnCache.key())
+        entry : dict
+                the cache-entry
+        '''
+        # write to a temporary file first and move it in place afterwards
+        # to ensure that no other process reads an incomplete entry
+        fd, tmppath = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump(entry, file, protocol=2)
+
+        lockfile = self._lock()
+        try:
+            _replace(tmppath, self._entry_path(key))
+            self.writes += 1
+            self._evict()
+        finally:
+            self._unlock(lockfile)
+
+    def _evict(self):
+        # remove least recently used entries until the size-limit is met
+        entries = sorted(self._entries())
+        size = sum(i[1] for i in entries)
+        for mtime, filesize, filepath in entries:
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(filepath)
+                self.evictions += 1
+            except OSError:
+                pass
+            size -= filesize
+
+    def clear(self):
+        '''
+        remove all cache-entries
+        '''
+        lockfile = self._lock()
+        try:
+            for mtime, size, filepath in self._entries():
+                try:
+                    os.remove(filepath)
+                except OSError:
+                    pass
+        finally:
+            self._unlock(lockfile)
+
+    def stats(self):
+        '''
+        Get statistics of the cache.
+
+        Returns:
+        ---------
+        stats : dict
+                a dictionary containing the number of hits, misses, writes
+                and evictions (of this FnCache-object), as well as the number
+                of stored entries and their total size (in bytes)
+        '''
+        entries = self._entries()
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'entries': len(entries),
+                'size': sum(i[1] for i in entries)}
@@ -0,0 +1,224 @@
+"""
+Generation of python source-code for the numerical evaluation of the
+fn-coefficients.
+
+The generated source only depends on numpy, and can therefore be stored
+(e.g. within a FnCache) and re-compiled without the need of any further
+symbolic computations.
+"""
+
+import sympy as sp
+from sympy.printing.pycode import NumPyPrinter
+
+
+# the maximum number of terms of a sum that are printed in a single line
+# (python's compiler fails with a RecursionError for very long expressions)
+_MAX_TERMS = 200
+
+
+def _assignment(printer, target, expr):
+    '''
+    print the assignment "target = expr" (split into several lines
+    in case expr is a sum with a lot of terms)
+    '''
+    if not isinstance(expr, sp.Add) or len(expr.args) <= _MAX_TERMS:
+        return ['    ' + target + ' = ' + printer.doprint(expr)]
+
+    terms = expr.args
+    lines = []
+    for i in range(0, len(terms), _MAX_TERMS):
+        part = printer.doprint(sp.Add(*terms[i:i + _MAX_TERMS],
+                                      evaluate=False))
+        if i == 0:
+            lines += ['    ' + target + ' = ' + part]
+        else:
+            lines += ['    ' + target + ' = ' + target + ' + (' + part + ')']
+    return lines
+
+
+def fn_source(fn, variables, name='fnevals', cse='sympy'):
+    '''
+    Generate the source-code of a python-module that defines a function
+    to numerically evaluate the fn-coefficients.
+
+    A common-subexpression-elimination is performed for each
+    fn-coefficient, and the obtained replacements are evaluated as
+    local variables of the generated function.
+
+    Parameters:
+    ------------
+    fn : list(sympy expressions)
+         the fn-coefficients
+    variables : list(sympy.Symbol)
+                the arguments of the generated function
+                (i.e. theta_0, phi_0, theta_ex, phi_ex, *param_dict.keys())
+    name : str (default = 'fnevals')
+           the name of the generated function
+    cse : str or None (default = 'sympy')
+          the module used for the common-subexpression-elimination
+          ('sympy' or 'symengine'). If None, no common-subexpression-
+          elimination is performed.
+
+    Returns:
+    ---------
+    source : str
+             the source-code of the module
+    '''
+
+    printer = NumPyPrinter()
+
+    lines = ['import numpy',
+             '',
+             '',
+             'def ' + name + '(' + ', '.join(map(str, variables)) + '):']
+
+    # use a common generator to ensure unique names for the replacements
+    cse_symbols = sp.numbered_symbols('_x')
+
+    if cse == 'symengine':
+        from symengine import cse as cse_seng
+
+    results = []
+    for nf, fncoef in enumerate(fn):
+        if cse == 'sympy':
+            fn_repl, fn_csefun = sp.cse(sp.sympify(fncoef),
+                                        symbols=cse_symbols, order='none')
+        elif cse == 'symengine':
+            # symengine uses the same names for the replacements of each
+            # coefficient (this is no problem since the replacements are
+            # evaluated directly before the coefficient)
+            fn_repl, fn_csefun = cse_seng([fncoef])
+            fn_repl = [(sp.sympify(i), sp.sympify(j)) for i, j in fn_repl]
+            fn_csefun = [sp.sympify(fn_csefun[0])]
+        else:
+            fn_repl, fn_csefun = [], [sp.sympify(fncoef)]
+
+        lines += ['    # fn-coefficient ' + str(nf)]
+        for repl_symbol, repl_expr in fn_repl:
+            lines += _assignment(printer, str(repl_symbol), repl_expr)
+        lines += _assignment(printer, '_f' + str(nf), fn_csefun[0])
+
+        results += ['_f' + str(nf)]
+
+    lines += ['    return [' + ', '.join(results) + ']', '']
+
+    return '\n'.join(lines)
+
+
+def fused_fn_source(fn, variables, name='fnevals'):
+    '''
+    Generate the source-code of a python-module that defines a function
+    to numerically evaluate the fn-coefficients.
+
+    In contrast to fn_source(), a single (joint) common-subexpression-
+    elimination is performed for all fn-coefficients, i.e. subexpressions
+    that are shared by several coefficients are evaluated only once.
+    The generated function returns a stacked array of the shape
+    (number of fn-coefficients,) + (broadcasted shape of the arguments).
+
+    Parameters:
+    ------------
+    fn : list(sympy expressions)
+         the fn-coefficients
+    variables : list(sympy.Symbol)
+                the arguments of the generated function
+                (i.e. theta_0, phi_0, theta_ex, phi_ex, *param_dict.keys())
+    name : str (default = 'fnevals')
+           the name of the generated function
+
+    Returns:
+    ---------
+    source : str
+             the source-code of the module
+    '''
+
+    printer = NumPyPrinter()
+
+    args = ', '.join(map(str, variables))
+    lines = ['import numpy',
+             '',
+             '',
+             'def ' + name + '(' + args + '):',
+             '    _res = numpy.empty((' + str(len(fn)) + ',) + ' +
+             'numpy.broadcast(' + args + ').shape)']
+
+    fn_repl, fn_csefuns = sp.cse([sp.sympify(i) for i in fn],
+                                 symbols=sp.numbered_symbols('_x'),
+                                 order='none')
+
+    for repl_symbol, repl_expr in fn_repl:
+        lines += _assignment(printer, str(repl_symbol), repl_expr)
+
+    for nf, fn_csefun in enumerate(fn_csefuns):
+        lines += _assignment(printer, '_res[' + str(nf) + ']', fn_csefun)
+
+    lines += ['    return _res', '']
+
+    return '\n'.join(lines)
+
+
+def compile_source(source, name='fnevals'):
+    '''
+    Compile the source-code generated by fn_source() and return the
+    function that evaluates the fn-coefficients.
+
+    Parameters:
+    ------------
+    source : str
+             the source-code as returned by fn_source()
+    name : str (default = 'fnevals')
+           the name of the function defined in the source-code
+
+    Returns:
+    ---------
+    - : callable
+        the compiled function
+    '''
+
+    namespace = {}
+    exec(compile(source, '<rt1-' + name + '>', 'exec'), namespace)
+
+    return namespace[name]
+
+
+class SourceFnevals(object):
+    '''
+    A callable that evaluates the fn-coefficients based on the source-code
+    generated by fn_source() or fused_fn_source().
+
+    Only the source-code is stored (the compiled function is generated
+    lazily on the first call) and therefore the object can be pickled
+    (e.g. to send it to other processes) without the need to re-generate
+    the function from the symbolic fn-coefficients.
+
+    Parameters:
+    ------------
+    source : str
+             the source-code as returned by fn_source() or fused_fn_source()
+    name : str (default = 'fnevals')
+           the name of the function defined in the source-code
+    '''
+
+    def __init__(self, source, name='fnevals'):
+        self.source = source
+        self.name = name
+
+    def __getstate__(self):
+        # compiled functions are not pickleable and are therefore
+        # re-compiled after unpickling
+        state = self.__dict__.copy()
+        state.pop('_func', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def _get_func(self):
+        try:
+            return self._func
+        except AttributeError:
+            self._func = compile_source(self.source, self.name)
+            return self._func
+
+    def __call__(self, *args):
+        return self._get_func()(*args)
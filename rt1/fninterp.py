@@ -0,0 +1,292 @@
+"""
+Interpolation of the fn-coefficients of monostatic models.
+
+For the monostatic geometry (geometry='mono'), the fn-coefficients only
+depend on the incidence-angle theta_0 and the values of param_dict.
+The fn-coefficients are therefore tabulated on a Chebyshev-grid in theta_0
+(once for each set of parameter-values) and evaluated via Chebyshev-series.
+The number of grid-nodes is chosen such that the interpolation-error
+(checked against the exact evaluation for each table) is below a given
+tolerance.
+"""
+
+import threading
+
+import numpy as np
+from numpy.polynomial import chebyshev
+
+
+class ChebyshevFnevals(object):
+    '''
+    A callable that evaluates the fn-coefficients of a monostatic model
+    via Chebyshev-interpolation in theta_0. The call-signature is equal to
+    the _fnevals functions generated from the symbolic fn-coefficients:
+
+        fnevals(theta_0, phi_0, theta_ex, phi_ex, *param_dict.values())
+
+    and a stacked array of the shape (number of fn-coefficients,) +
+    (broadcasted shape of the arguments) is returned.
+    (phi_0, theta_ex and phi_ex are ignored, i.e. the object must only be
+    used for fn-coefficients of models with geometry='mono')
+
+    The interpolation-tables are generated for each unique set of
+    parameter-values. If the number of samples that share the same
+    parameter-values is lower than the number of grid-nodes, the
+    exact evaluation is used instead (since it is cheaper).
+
+    Each table is checked against the exact evaluation at the points
+    between the grid-nodes. If the tolerance is exceeded, the number of
+    grid-nodes of the table is doubled (up to max_nodes), and if the
+    tolerance can still not be reached, the fn-coefficients of the
+    associated samples are evaluated exactly.
+
+    Samples with incidence-angles outside of theta_range are always
+    evaluated exactly.
+
+    To use the interpolation, provide the object as _fnevals_input to an
+    RT1-object (or to Fits.monofit()), e.g.:
+
+        >>> fnevals = ChebyshevFnevals(R._fnevals, tol=1e-8)
+        >>> R = RT1(..., geometry='mono', _fnevals_input=fnevals)
+
+    Parameters:
+    ------------
+    fnevals : callable
+              the function used for the exact evaluation of the
+              fn-coefficients (i.e. the _fnevals function of an RT1-object
+              with geometry='mono' and lambda_backend != 'symengine')
+    tol : float (default = 1e-8)
+          the maximum absolute interpolation-error of the fn-coefficients
+    theta_range : tuple(float) (default = None)
+                  the range (min, max) of incidence-angles (in radians) used
+                  for the interpolation. If None, the range of the
+                  incidence-angles provided in the first call is used.
+    max_nodes : int (default = 128)
+                the maximum number of grid-nodes. If the tolerance can not
+                be reached, the fn-coefficients are evaluated exactly.
+                (the number of grid-nodes of the first call is used as
+                initial number of grid-nodes for all tables)
+    max_tables : int (default = 1000)
+                 the maximum number of stored interpolation-tables
+                 (if exceeded, all stored tables are discarded)
+    '''
+
+    def __init__(self, fnevals, tol=1e-8, theta_range=None, max_nodes=128,
+                 max_tables=1000):
+        self.fnevals = fnevals
+        self.tol = tol
+        self.theta_range = theta_range
+        self.max_nodes = max_nodes
+        self.max_tables = max_tables
+
+        # the initial number of grid-nodes of the tables (None if the
+        # interpolation is not yet initialized) and the maximum
+        # interpolation-error found in the initialization (None if the
+        # tolerance could not be reached)
+        self.n_nodes = None
+        self.error = None
+
+        self._tables = dict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # locks are not pickleable
+        state = self.__dict__.copy()
+        state.pop('_lock', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _exact(self, theta_0, params):
+        # exact evaluation of the fn-coefficients for 1D arrays of samples
+        fn = self.fnevals(theta_0, np.zeros_like(theta_0), theta_0,
+                          np.full_like(theta_0, np.pi), *params)
+        return np.array(np.broadcast_arrays(theta_0, *fn)[1:])
+
+    def _to_x(self, theta_0):
+        # map the incidence-angles to the interval [-1, 1]
+        tmin, tmax = self.theta_range
+        return (2. * theta_0 - (tmin + tmax)) / (tmax - tmin)
+
+    def _from_x(self, x):
+        tmin, tmax = self.theta_range
+        return 0.5 * ((tmax - tmin) * x + tmin + tmax)
+
+    def _tabulate(self, params, n_nodes):
+        # generate the chebyshev-coefficients for each set of parameters
+        # (params is a list of 1D arrays, one value for each table)
+        # the returned array has the shape (n_nodes, n_fn, n_tables)
+        x = chebyshev.chebpts1(n_nodes)
+        transform = np.linalg.inv(chebyshev.chebvander(x, n_nodes - 1))
+
+        ntables = len(params[0]) if len(params) > 0 else 1
+        theta_0 = np.tile(self._from_x(x), ntables)
+        values = self._exact(theta_0, [np.repeat(i, n_nodes)
+                                       for i in params])
+        values = values.reshape(-1, ntables, n_nodes)
+
+        return np.einsum('kj,ftj->kft', transform, values)
+
+    def _interpolate(self, coefs, theta_0, inverse):
+        # evaluate the chebyshev-series (inverse is the index of the table
+        # that is used for each sample)
+        vander = chebyshev.chebvander(self._to_x(theta_0),
+                                      coefs.shape[0] - 1)
+        res = np.empty(coefs.shape[1:2] + theta_0.shape)
+        if coefs.shape[2] == 1:
+            np.dot(coefs[:, :, 0].T, vander.T, out=res)
+            return res
+
+        # evaluate the samples of each table via a matrix-product
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[order], np.arange(coefs.shape[2] + 1))
+        for n in range(coefs.shape[2]):
+            idx = order[bounds[n]:bounds[n + 1]]
+            res[:, idx] = coefs[:, :, n].T.dot(vander[idx].T)
+        return res
+
+    def _check(self, coefs, params):
+        # the maximum interpolation-error of each table (evaluated at the
+        # extrema of the highest chebyshev-polynomial, which lie between
+        # the grid-nodes)
+        n_nodes, _, ntables = coefs.shape
+        x = chebyshev.chebpts2(n_nodes + 1)
+        check = np.tile(self._from_x(x), ntables)
+        inverse = np.repeat(np.arange(ntables), len(x))
+
+        exact = self._exact(check, [i[inverse] for i in params])
+        interp = self._interpolate(coefs, check, inverse)
+        error = np.abs(interp - exact).reshape(-1, ntables, len(x))
+        return error.max(axis=(0, 2))
+
+    def _tabulate_checked(self, params):
+        # generate the tables for each set of parameters and refine the
+        # tables that do not reach the tolerance (a list of the
+        # coefficients of each table is returned, None is used for tables
+        # that can not reach the tolerance with max_nodes grid-nodes)
+        ntables = len(params[0]) if len(params) > 0 else 1
+        tables = [None] * ntables
+        todo = np.arange(ntables)
+
+        n_nodes = self.n_nodes
+        while len(todo) > 0 and n_nodes <= self.max_nodes:
+            params_todo = [i[todo] for i in params]
+            coefs = self._tabulate(params_todo, n_nodes)
+            valid = self._check(coefs, params_todo) <= self.tol
+            for n in np.flatnonzero(valid):
+                tables[todo[n]] = coefs[:, :, n]
+            todo = todo[~valid]
+            n_nodes *= 2
+
+        return tables
+
+    def _initialize(self, theta_0, params):
+        # determine the number of grid-nodes required to reach the
+        # tolerance (for the first few parameter-sets of the first call)
+        if self.theta_range is None:
+            if theta_0.min() == theta_0.max():
+                return
+            self.theta_range = (theta_0.min(), theta_0.max())
+
+        params = [i[:10] for i in params]
+
+        n_nodes = 8
+        while n_nodes <= self.max_nodes:
+            # check the error between the grid-nodes of the next-finer grid
+            x = chebyshev.chebpts2(4 * n_nodes)
+            ntables = len(params[0]) if len(params) > 0 else 1
+            check = np.tile(self._from_x(x), ntables)
+            inverse = np.repeat(np.arange(ntables), len(x))
+
+            exact = self._exact(check, [i[inverse] for i in params])
+            interp = self._interpolate(self._tabulate(params, n_nodes),
+                                       check, inverse)
+
+            error = np.abs(interp - exact).max()
+            if error <= self.tol:
+                self.error = error
+                break
+            n_nodes *= 2
+        else:
+            n_nodes = 0
+
+        self.n_nodes = n_nodes
+
+    def __call__(self, theta_0, phi_0, theta_ex, phi_ex, *params):
+        args = np.broadcast_arrays(theta_0, *params)
+        shape = args[0].shape
+        theta_0 = np.ravel(args[0]).astype(float)
+        params = [np.ravel(i) for i in args[1:]]
+
+        if len(params) == 1:
+            unique, inverse = np.unique(params[0], return_inverse=True)
+            unique = [unique]
+        elif len(params) > 1:
+            # find the unique sets of parameter-values
+            unique, inverse = np.unique(np.column_stack(params), axis=0,
+                                        return_inverse=True)
+            inverse = np.ravel(inverse)
+            unique = list(unique.T)
+        else:
+            unique, inverse = [], np.zeros(theta_0.size, dtype=int)
+
+        if self.n_nodes is None:
+            with self._lock:
+                if self.n_nodes is None:
+                    self._initialize(theta_0, unique)
+
+        if not self.n_nodes:
+            return self._exact(theta_0, params).reshape((-1,) + shape)
+
+        tmin, tmax = self.theta_range
+        inside = (theta_0 >= tmin) & (theta_0 <= tmax)
+
+        # find the parameter-sets without interpolation-tables
+        ntables = len(unique[0]) if len(unique) > 0 else 1
+        keys = [np.array([i[n] for i in unique]).tobytes()
+                for n in range(ntables)]
+        tables = self._tables
+        missing = [n for n, key in enumerate(keys) if key not in tables]
+        if len(tables) + len(missing) > self.max_tables:
+            tables = dict()
+            missing = list(range(ntables))
+
+        # the generation (and the check) of the tables only pays off if
+        # the tables are used for more samples than there are grid-nodes
+        if 2 * len(missing) * self.n_nodes >= np.count_nonzero(inside):
+            return self._exact(theta_0, params).reshape((-1,) + shape)
+
+        if len(missing) > 0:
+            coefs = self._tabulate_checked([i[missing] for i in unique])
+            for n, i in enumerate(missing):
+                tables[keys[i]] = coefs[n]
+            self._tables = tables
+
+        # samples whose tables can not reach the tolerance are evaluated
+        # exactly as well
+        used = [tables[key] for key in keys]
+        failed = [n for n, i in enumerate(used) if i is None]
+        if len(failed) > 0:
+            inside &= ~np.isin(inverse, failed)
+        if not inside.any():
+            return self._exact(theta_0, params).reshape((-1,) + shape)
+
+        # (tables with less grid-nodes are padded with zeros)
+        n_coefs = max(i.shape[0] for i in used if i is not None)
+        n_fn = next(i.shape[1] for i in used if i is not None)
+        coefs = np.zeros((n_coefs, n_fn, len(used)))
+        for n, i in enumerate(used):
+            if i is not None:
+                coefs[:i.shape[0], :, n] = i
+
+        res = np.empty((n_fn, theta_0.size))
+        res[:, inside] = self._interpolate(coefs, theta_0[inside],
+                                           inverse[inside])
+        if not inside.all():
+            outside = ~inside
+            res[:, outside] = self._exact(theta_0[outside],
+                                          [i[outside] for i in params])
+
+        return res.reshape((-1,) + shape)
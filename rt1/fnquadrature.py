@@ -0,0 +1,179 @@
+"""
+Numerical evaluation of the fn-coefficients via quadrature.
+
+Instead of a symbolic expansion of the interaction-kernel, the integral of
+the product of the legendre-expansions of V and SRF over phi_s is evaluated
+using an (equidistant) Fourier-quadrature, and the coefficients of the
+resulting polynomial in cos(theta_s) are obtained via a Gauss-Legendre
+projection. Since all involved functions are (trigonometric) polynomials,
+the quadrature is exact (up to round-off errors) if the default number of
+quadrature-nodes is used.
+"""
+
+import numpy as np
+from numpy.polynomial import legendre
+import sympy as sp
+
+
+def _legcoef_source(S):
+    '''
+    the (srepr-strings of the) legendre-coefficients of a Volume or Surface
+    object for n = 0 ... ncoefs - 1
+    '''
+    n = sp.Symbol('n')
+    return [sp.srepr(sp.sympify(S.legcoefs).xreplace({n: i}).doit())
+            for i in range(S.ncoefs)]
+
+
+class QuadratureFnevals(object):
+    '''
+    A callable that numerically evaluates the fn-coefficients of the
+    interaction-term via quadrature. The call-signature is equal to the
+    _fnevals functions generated from the symbolic fn-coefficients:
+
+        fnevals(theta_0, phi_0, theta_ex, phi_ex, *param_dict.values())
+
+    and a stacked array of the shape (number of fn-coefficients,) +
+    (broadcasted shape of the arguments) is returned.
+
+    Parameters:
+    ------------
+    V : rt1.volume object
+        the volume-scattering phase-function
+    SRF : rt1.surface object
+          the surface BRDF
+    param_keys : list(str)
+                 the names of the parameters (in the order as they are
+                 provided to the evaluation function)
+    n_theta : int (default = None)
+              the number of Gauss-Legendre nodes used for the integration
+              over cos(theta_s). If None, the number of fn-coefficients is
+              used (which gives exact results for the truncated
+              legendre-expansions of V and SRF).
+    n_phi : int (default = None)
+            the number of nodes used for the integration over phi_s.
+            If None, the number of fn-coefficients is used (which gives
+            exact results for the truncated legendre-expansions of V and
+            SRF).
+    chunksize : int (default = None)
+                the maximum number of samples that are processed at once
+                (the peak memory-consumption is proportional to
+                chunksize * n_theta * n_phi). If None, the chunksize is
+                chosen such that chunksize * n_theta * n_phi <= 1e6
+    '''
+
+    def __init__(self, V, SRF, param_keys, n_theta=None, n_phi=None,
+                 chunksize=None):
+        self.param_keys = list(map(str, param_keys))
+
+        self.V_a = [float(i) for i in V.a]
+        self.SRF_a = [float(i) for i in SRF.a]
+
+        self.V_legcoefs = _legcoef_source(V)
+        self.SRF_legcoefs = _legcoef_source(SRF)
+
+        self.n_fn = V.ncoefs + SRF.ncoefs - 1
+
+        self.n_theta = self.n_fn if n_theta is None else int(n_theta)
+        self.n_phi = self.n_fn if n_phi is None else int(n_phi)
+        if chunksize is None:
+            chunksize = max(1, int(1e6 // (self.n_theta * self.n_phi)))
+        self.chunksize = chunksize
+
+        self._init_quadrature()
+
+    def __getstate__(self):
+        # the compiled functions are not pickleable and are therefore
+        # re-generated after unpickling
+        state = self.__dict__.copy()
+        for key in ['_V_legfunc', '_SRF_legfunc']:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def _init_quadrature(self):
+        # nodes and weights for the integration over cos(theta_s)
+        mu_s, w_s = legendre.leggauss(self.n_theta)
+
+        # matrix to project the values at the nodes on the
+        # legendre-polynomials (up to the degree n_fn - 1)
+        k = np.arange(self.n_fn)
+        proj = (legendre.legvander(mu_s, self.n_fn - 1) * w_s[:, np.newaxis]
+                * (2. * k + 1.) / 2.).T
+
+        # matrix to convert legendre-series into power-series
+        leg2poly = np.zeros((self.n_fn, self.n_fn))
+        for i in range(self.n_fn):
+            leg2poly[:i + 1, i] = legendre.leg2poly(np.eye(self.n_fn)[i])
+
+        self._transform = leg2poly.dot(proj)
+
+        self._mu_s = mu_s[:, np.newaxis, np.newaxis]
+        self._sin_s = np.sqrt(1. - self._mu_s**2)
+
+        phi_s = 2. * np.pi * np.arange(self.n_phi) / self.n_phi
+        self._cos_phi_s = np.cos(phi_s)[np.newaxis, :, np.newaxis]
+        self._sin_phi_s = np.sin(phi_s)[np.newaxis, :, np.newaxis]
+
+    def _legfunc(self, legcoefs):
+        # compile a function that returns the legendre-coefficients
+        args = list(map(sp.Symbol, self.param_keys))
+        funcs = [sp.lambdify(args, sp.sympify(i), modules=['numpy'])
+                 for i in legcoefs]
+        return lambda *params: [f(*params) for f in funcs]
+
+    def _get_legfuncs(self):
+        try:
+            return self._V_legfunc, self._SRF_legfunc
+        except AttributeError:
+            self._V_legfunc = self._legfunc(self.V_legcoefs)
+            self._SRF_legfunc = self._legfunc(self.SRF_legcoefs)
+            return self._V_legfunc, self._SRF_legfunc
+
+    def _evaluate(self, theta_0, phi_0, theta_ex, phi_ex, params):
+        # evaluate the fn-coefficients for 1D arrays of samples
+        V_legfunc, SRF_legfunc = self._get_legfuncs()
+        nsamples = len(theta_0)
+        V_c = np.broadcast_arrays(np.empty(nsamples),
+                                  *V_legfunc(*params))[1:]
+        SRF_c = np.broadcast_arrays(np.empty(nsamples),
+                                    *SRF_legfunc(*params))[1:]
+
+        # scattering-angles of V (with respect to pi - theta_0 to correct
+        # for backscattering) and SRF (see legexpansion())
+        a = self.V_a
+        x_V = (-a[0] * np.cos(theta_0) * self._mu_s
+               + np.sin(theta_0) * self._sin_s
+               * (a[1] * np.cos(phi_0) * self._cos_phi_s
+                  + a[2] * np.sin(phi_0) * self._sin_phi_s))
+
+        a = self.SRF_a
+        x_SRF = (a[0] * self._mu_s * np.cos(theta_ex)
+                 + self._sin_s * np.sin(theta_ex)
+                 * (a[1] * self._cos_phi_s * np.cos(phi_ex)
+                    + a[2] * self._sin_phi_s * np.sin(phi_ex)))
+
+        kernel = (legendre.legval(x_V, V_c, tensor=False) *
+                  legendre.legval(x_SRF, SRF_c, tensor=False))
+
+        # integral over phi_s (for each node of cos(theta_s))
+        kernel = 2. * np.pi * kernel.mean(axis=1)
+
+        return self._transform.dot(kernel)
+
+    def __call__(self, theta_0, phi_0, theta_ex, phi_ex, *params):
+        args = np.broadcast_arrays(theta_0, phi_0, theta_ex, phi_ex,
+                                   *params)
+        shape = args[0].shape
+        args = [np.ravel(i) for i in args]
+
+        nsamples = args[0].size
+        res = np.empty((self.n_fn, nsamples))
+        for i in range(0, nsamples, self.chunksize):
+            sl = slice(i, i + self.chunksize)
+            res[:, sl] = self._evaluate(*[j[sl] for j in args[:4]],
+                                        params=[j[sl] for j in args[4:]])
+
+        return res.reshape((self.n_fn,) + shape)
@@ -0,0 +1,256 @@
+"""
+Evaluation of the fn-coefficients via tensor-contraction.
+
+The fn-coefficients are (apart from the powers of cos(theta_s) that define
+the index of the coefficient) sparse multivariate polynomials in a small set
+of generators (e.g. cos(theta_0), sin(phi_ex), or parameters like the
+asymmetry-parameter of a HenyeyGreenstein function). Instead of evaluating
+the (lengthy) symbolic expressions, the polynomials are represented by
+a matrix of the exponents of all appearing monomials and a dense matrix of
+numerical coefficients. The fn-coefficients are then obtained from tables
+of the powers of the generators and a single matrix-product.
+"""
+
+import numpy as np
+import sympy as sp
+
+
+class TensorFnevals(object):
+    '''
+    A callable that evaluates the fn-coefficients via a contraction of
+    the (numerical) coefficient-matrix of the fn-polynomials with the
+    values of the monomials. The call-signature is equal to the _fnevals
+    functions generated from the symbolic fn-coefficients:
+
+        fnevals(theta_0, phi_0, theta_ex, phi_ex, *param_dict.values())
+
+    and a stacked array of the shape (number of fn-coefficients,) +
+    (broadcasted shape of the arguments) is returned.
+
+    Use from_poly() or from_fn() to generate the object.
+
+    Parameters:
+    ------------
+    generators : list(str)
+                 the (srepr-strings of the) generators of the polynomials
+    exponents : array-like
+                the exponents of the generators for each monomial
+                (shape = (number of monomials, number of generators))
+    coefficients : array-like
+                   the coefficients of the monomials for each fn-coefficient
+                   (shape = (number of fn-coefficients, number of monomials))
+    variables : list(str)
+                the names of the arguments of the function
+                (i.e. theta_0, phi_0, theta_ex, phi_ex, *param_dict.keys())
+    chunksize : int (default = None)
+                the maximum number of samples that are processed at once
+                (the peak memory-consumption is proportional to
+                chunksize * number of monomials). If None, the chunksize is
+                chosen such that chunksize * number of monomials <= 1e6
+    '''
+
+    def __init__(self, generators, exponents, coefficients, variables,
+                 chunksize=None):
+        self.generators = list(generators)
+        self.exponents = np.asarray(exponents, dtype=int).reshape(
+            -1, len(self.generators))
+        self.coefficients = np.asarray(coefficients, dtype=float).reshape(
+            -1, len(self.exponents))
+        self.variables = list(map(str, variables))
+
+        if chunksize is None:
+            chunksize = max(1, int(1e6 // max(1, len(self.exponents))))
+        self.chunksize = chunksize
+
+    @classmethod
+    def from_poly(cls, expr, variables, n_fn=None, chunksize=None):
+        '''
+        Generate the tensor-representation of the fn-coefficients from the
+        polynomial returned by RT1._calc_interaction_expansion()
+        (no symbolic simplifications are required).
+
+        Parameters:
+        ------------
+        expr : sympy.polys.rings.PolyElement
+               sparse polynomial that represents the fn-coefficients
+               (output of RT1._calc_interaction_expansion())
+        variables : list(sympy.Symbol)
+                    the arguments of the evaluation-function
+        n_fn : int (default = None)
+               the number of fn-coefficients. If None, the highest
+               appearing power of cos(theta_s) + 1 is used.
+        chunksize : int (default = None)
+                    see TensorFnevals
+
+        Returns:
+        ---------
+        - : TensorFnevals
+        '''
+        theta_s = sp.Symbol('theta_s')
+
+        ring = expr.ring
+        i_cos = ring.symbols.index(sp.cos(theta_s))
+
+        # the factor 2 * pi results from the definition of the
+        # fn-coefficients (see RT1._extract_coefficients())
+        terms = [(monom[i_cos], monom[:i_cos] + monom[i_cos + 1:],
+                  2. * np.pi * float(ring.domain.to_sympy(coef)))
+                 for monom, coef in expr.iterterms()]
+
+        return cls._from_terms(
+            terms, [i for n, i in enumerate(ring.symbols) if n != i_cos],
+            variables, chunksize, n_fn)
+
+    @classmethod
+    def from_fn(cls, fn, variables, chunksize=None):
+        '''
+        Generate the tensor-representation of the fn-coefficients from
+        the symbolic fn-coefficients.
+
+        (the conversion of the symbolic expressions into polynomials can
+        be slow for long fn-coefficients, use from_poly() if possible)
+
+        Parameters:
+        ------------
+        fn : list(sympy expressions)
+             the fn-coefficients
+        variables : list(sympy.Symbol)
+                    the arguments of the evaluation-function
+        chunksize : int (default = None)
+                    see TensorFnevals
+
+        Returns:
+        ---------
+        - : TensorFnevals
+        '''
+        polys, opt = sp.parallel_poly_from_expr(
+            [sp.sympify(i) for i in fn])
+
+        terms = [(n, monom, float(coef))
+                 for n, poly in enumerate(polys)
+                 for monom, coef in poly.terms()]
+
+        return cls._from_terms(terms, opt.gens, variables, chunksize,
+                               n_fn=len(fn))
+
+    @classmethod
+    def _from_terms(cls, terms, generators, variables, chunksize=None,
+                    n_fn=None):
+        # terms is a list of (index of fn, exponents, coefficient) tuples
+
+        # generators that do not depend on any variable (e.g. pi) are
+        # absorbed in the coefficients
+        const = [n for n, i in enumerate(generators)
+                 if len(i.free_symbols) == 0]
+        constvals = [float(generators[n]) for n in const]
+        keep = [n for n in range(len(generators)) if n not in const]
+
+        monoms = dict()
+        entries = []
+        for nf, monom, coef in terms:
+            for n, val in zip(const, constvals):
+                coef = coef * val**monom[n]
+            monom = tuple(monom[n] for n in keep)
+            entries += [(nf, monoms.setdefault(monom, len(monoms)), coef)]
+
+        if n_fn is None:
+            n_fn = max([nf for nf, _, _ in entries] + [-1]) + 1
+
+        coefficients = np.zeros((n_fn, len(monoms)))
+        for nf, nm, coef in entries:
+            coefficients[nf, nm] += coef
+
+        exponents = np.zeros((len(monoms), len(keep)), dtype=int)
+        for monom, nm in monoms.items():
+            exponents[nm] = monom
+
+        return cls([sp.srepr(generators[n]) for n in keep], exponents,
+                   coefficients, variables, chunksize)
+
+    def diff(self, key):
+        '''
+        Generate the tensor-representation of the derivatives of the
+        fn-coefficients with respect to the provided variable.
+
+        Parameters:
+        ------------
+        key : str
+              the name of the variable
+
+        Returns:
+        ---------
+        - : TensorFnevals or None
+            the derivatives of the fn-coefficients (None is returned if
+            the variable appears within a generator, e.g. exp(key), since
+            the derivative is then no longer a polynomial in the
+            generators)
+        '''
+        symbol = sp.Symbol(key)
+        gens = [sp.sympify(i) for i in self.generators]
+        if any(symbol in i.free_symbols and i != symbol for i in gens):
+            return None
+
+        exponents = self.exponents.copy()
+        coefficients = np.zeros_like(self.coefficients)
+        if symbol in gens:
+            ng = gens.index(symbol)
+            coefficients = self.coefficients * exponents[:, ng]
+            exponents[:, ng] = np.maximum(exponents[:, ng] - 1, 0)
+
+        return TensorFnevals(self.generators, exponents, coefficients,
+                             self.variables, self.chunksize)
+
+    def __getstate__(self):
+        # the compiled functions are not pickleable and are therefore
+        # re-generated after unpickling
+        state = self.__dict__.copy()
+        state.pop('_genfuncs', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def _get_genfuncs(self):
+        try:
+            return self._genfuncs
+        except AttributeError:
+            args = list(map(sp.Symbol, self.variables))
+            self._genfuncs = [sp.lambdify(args, sp.sympify(i),
+                                          modules=['numpy'])
+                              for i in self.generators]
+            return self._genfuncs
+
+    def _evaluate(self, args):
+        # evaluate the fn-coefficients for 1D arrays of samples
+        nsamples = len(args[0])
+
+        monoms = np.ones((len(self.exponents), nsamples))
+        for func, exponents in zip(self._get_genfuncs(), self.exponents.T):
+            maxexp = exponents.max()
+            if maxexp == 0:
+                continue
+
+            # table of the powers 0 ... maxexp of the generator
+            powers = np.empty((maxexp + 1, nsamples))
+            powers[0] = 1.
+            powers[1] = func(*args)
+            for i in range(2, maxexp + 1):
+                np.multiply(powers[i - 1], powers[1], out=powers[i])
+
+            monoms *= powers[exponents]
+
+        return self.coefficients.dot(monoms)
+
+    def __call__(self, theta_0, phi_0, theta_ex, phi_ex, *params):
+        args = np.broadcast_arrays(theta_0, phi_0, theta_ex, phi_ex,
+                                   *params)
+        shape = args[0].shape
+        args = [np.ravel(i).astype(float) for i in args]
+
+        nsamples = args[0].size
+        res = np.empty((len(self.coefficients), nsamples))
+        for i in range(0, nsamples, self.chunksize):
+            sl = slice(i, i + self.chunksize)
+            res[:, sl] = self._evaluate([j[sl] for j in args])
+
+        return res.reshape((len(self.coefficients),) + shape)
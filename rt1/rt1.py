@@ -6,22 +6,31 @@ References
 ----------
 Quast & Wagner (2016): doi:10.1364/AO.55.005379
 """
+import copy
+import threading
+from multiprocessing.pool import ThreadPool
+
 import numpy as np
 
 from scipy.special import expi
 from scipy.special import expn
 
 import sympy as sp
+from sympy.polys.rings import sring, PolyRing
 # import time
 
+from .fnevals import fn_source, fused_fn_source, SourceFnevals
+from .fncache import FnCache
+from .fnquadrature import QuadratureFnevals
+from .fntensor import TensorFnevals
+
 try:
-    # if symengine is available, use it to perform series-expansions
+    # symengine is only required for lambda_backend = 'symengine'
     # this try-exept is necessary since symengine does currently not
     # build correctly with conda using a python 2.7 environment
-    from symengine import expand
     from symengine import Lambdify as lambdify_seng
 except ImportError:
-    from sympy import expand
+    pass
     # print('symengine could not be imported fn-function generation')
 
 
@@ -66,6 +75,9 @@ class RT1(object):
                Note that once the _fnevals function is provided, the
                fn-coefficients are no longer needed and have no effect on the
                calculated results!
+               (for monostatic models, a rt1.fninterp.ChebyshevFnevals
+               object can be used to evaluate the fn-coefficients via
+               interpolation in theta_0)
 
     geometry : str (default = 'vvvv')
         4 character string specifying which components of the angles should
@@ -101,15 +113,67 @@ class RT1(object):
                      fn-coefficients.
 
                      TODO(update this) possible values are:
-                         - 'sympy' :  sympy.lambdify is used to compile
-                           the _fnevals function
+                         - 'sympy' :  the source of a (numpy-based)
+                           evaluation-function is generated without
+                           common-subexpression-elimination
                          - 'symengine' : symengine.LambdifyCSE is used to
                            compile the _fnevals function. This results in
                            considerable speedup for long fn-coefficients
-                         - 'cse' : sympy.lambdify is used together with
-                           sympy.cse to generate a fast evaluation-function
+                         - 'cse_symengine_sympy' : symengine.cse is used to
+                           generate the source of a (numpy-based)
+                           evaluation-function
+                         - 'cse' : sympy.cse is used to generate the
+                           source of a fast (numpy-based) evaluation-function
+                         - 'cse_fused' : a single sympy.cse is performed for
+                           all fn-coefficients (i.e. subexpressions shared by
+                           several coefficients are evaluated only once) and
+                           the generated function returns a stacked array
+                         - 'numeric' : the fn-coefficients are evaluated
+                           numerically via quadrature (no symbolic
+                           computations are performed, see
+                           rt1.fnquadrature.QuadratureFnevals). To control
+                           the accuracy (i.e. the number of quadrature-nodes)
+                           provide a QuadratureFnevals object as
+                           _fnevals_input.
+                         - 'tensor' : the fn-coefficients are represented
+                           by a (numerical) matrix of polynomial-coefficients
+                           and the exponents of the associated monomials.
+                           All coefficients are evaluated at once via
+                           a matrix-product with the values of the
+                           monomials (see rt1.fntensor.TensorFnevals)
+
+                     All backends provide pickleable _fnevals functions
+                     (the source-based functions store only the generated
+                     source which is re-compiled after unpickling, see
+                     rt1.fnevals.SourceFnevals) and therefore RT1-objects
+                     can be sent to other processes (e.g. for
+                     multiprocessing).
     int_Q : bool (default = True)
             indicator whether the interaction-term should be calculated or not
+    fn_cache : rt1.fncache.FnCache or str (default = None)
+               a persistent cache (or the path to the directory of a cache)
+               used to store the fn-coefficients and the source of the
+               generated _fnevals functions. If a cache-entry is found
+               for the model-signature of the RT1-object, all symbolic
+               computations are skipped.
+               (the generated source is not stored for
+               lambda_backend = 'symengine' and 'numeric'. The cache is
+               not used if fn_input or _fnevals_input is provided)
+    eval_cache : bool (default = False)
+                 indicator whether the parameter-independent parts of the
+                 surface-, volume- and interaction-contribution (i.e. the
+                 brdf, the phase-function and the interaction-integrals)
+                 should be cached. (the cosines and attenuation-factors
+                 are always shared by all methods, see _geometry())
+                 The cached values are re-used as long as the values they
+                 depend on (angles, tau and param_dict) are unchanged, and
+                 therefore evaluations that only change omega, NormBRDF,
+                 bsf or I0 (which enter the model linearly) only require a
+                 few multiplications.
+                 (the cache is shared by copies of the RT1-object, chunks
+                 that are evaluated by a thread-pool use separate caches.
+                 The number of cache-hits and misses is stored in
+                 eval_cache_info)
     verbosity : int
             select the verbosity level of the module to get status-reports
                 - 0 : print nothing
@@ -118,10 +182,25 @@ class RT1(object):
                 - >=3 : print all
     """
 
+    # the maximum number of samples that are processed at once in the
+    # evaluation of the interaction-contribution (see _calc_Fint())
+    _Fint_chunksize = 50000
+
+    # the default number of samples that are processed at once by each
+    # thread if a thread-pool is used (see _evaluate_chunks())
+    _thread_chunksize = 2 ** 15
+
+    # the angle-dependent quantities (brdf, p and the fn-coefficients) are
+    # only evaluated for the unique combinations of their arguments if the
+    # number of unique combinations is at most _dedup_threshold * number of
+    # samples (see _evaluate_unique())
+    _dedup_threshold = 0.5
+
     def __init__(self, I0, t_0, t_ex, p_0, p_ex, V=None, SRF=None,
                  fn_input=None, _fnevals_input=None, geometry='vvvv',
                  bsf=0., param_dict={},
-                 lambda_backend='cse', int_Q=True, verbosity = 1):
+                 lambda_backend='cse', int_Q=True, fn_cache=None,
+                 eval_cache=False, verbosity = 1):
 
         assert isinstance(geometry, str), ('ERROR: geometry must be ' +
                                            'a 4-character string')
@@ -142,6 +221,29 @@ class RT1(object):
 
         self.fn_input = fn_input
         self._fnevals_input = _fnevals_input
+        # indicator whether fn-coefficients or _fnevals functions have been
+        # assigned explicitly (the fn-cache is then no longer used)
+        self._fn_provided = False
+
+        if isinstance(fn_cache, str):
+            fn_cache = FnCache(fn_cache)
+        self.fn_cache = fn_cache
+
+        # functions to evaluate the derivatives of the fn-coefficients
+        # (see _get_dfnevals())
+        self._dfnevals = dict()
+
+        if eval_cache is True:
+            self._eval_cache = _EvalCache()
+        else:
+            self._eval_cache = None
+
+        # the number of samples and the number of actually performed
+        # evaluations of angle-dependent quantities (see dedup_info)
+        self._dedup_stats = dict(samples=0, evaluations=0)
+
+        # the shared angle- and attenuation-terms (see _geometry())
+        self._geom = _Geometry()
 
         self._set_t_0(t_0)
         self._set_t_ex(t_ex)
@@ -210,6 +312,171 @@ class RT1(object):
         if self.verbosity >= v:
             print(msg)
 
+    def _get_eval_cache_info(self):
+        if self._eval_cache is None:
+            return None
+        hits, misses = self._eval_cache.info()
+        return dict(hits=hits, misses=misses)
+
+    eval_cache_info = property(_get_eval_cache_info)
+
+    def _get_dedup_info(self):
+        stats = self._dedup_stats
+        return dict(stats, ratio=(stats['samples'] /
+                                  max(stats['evaluations'], 1)))
+
+    dedup_info = property(_get_dedup_info,
+                          doc='the number of samples and the number of ' +
+                          'evaluations of angle-dependent quantities ' +
+                          '(brdf, p and fn-coefficients) and their ratio ' +
+                          '(see _evaluate_unique())')
+
+    def _evaluate_unique(self, func, args):
+        '''
+        evaluate func(*args) only for the unique combinations of the
+        (broadcasted) arguments and scatter the results back to the samples
+
+        Since datasets usually contain only a small number of distinct
+        incidence-angles, the evaluation of angle-dependent quantities can
+        be restricted to the unique combinations of angles and parameters.
+        If the number of unique combinations exceeds
+        _dedup_threshold * number of samples, func is evaluated directly.
+
+        Parameters:
+        ------------
+        func : callable
+               the function to evaluate. It must return an array
+               (with the samples along the last axis) or a list of arrays
+        args : list(array_like)
+               the arguments of the function
+
+        Returns:
+        ---------
+        - : array_like or list(array_like)
+            the result of func(*args) (with the broadcasted shape of args)
+        '''
+        bargs = np.broadcast_arrays(*args)
+        shape = bargs[0].shape
+        nsamples = bargs[0].size
+
+        stats = self._dedup_stats
+        stats['samples'] += nsamples
+
+        if nsamples < 2:
+            stats['evaluations'] += nsamples
+            return func(*args)
+
+        # (the uniqueness is first checked for a small subset of the
+        # samples to avoid the search for unique combinations if the
+        # uniqueness is high)
+        maxunique = self._dedup_threshold * nsamples
+        nprobe = min(nsamples, 1024)
+        if (nprobe < nsamples and _unique_combinations(
+                [np.ravel(i)[:nprobe] for i in bargs],
+                self._dedup_threshold * nprobe) is None):
+            found = None
+        else:
+            found = _unique_combinations([np.ravel(i) for i in bargs],
+                                         maxunique)
+
+        if found is None:
+            stats['evaluations'] += nsamples
+            return func(*args)
+
+        first, inverse = found
+        nunique = len(first)
+        unique = np.column_stack([np.ravel(i)[first] for i in bargs])
+
+        stats['evaluations'] += nunique
+        self.prv(3, 'evaluation of ' + str(nunique) + ' unique ' +
+                 'combinations for ' + str(nsamples) + ' samples')
+
+        def scatter(res):
+            res = np.asarray(res)
+            if res.ndim == 0:
+                res = np.broadcast_to(res, (nunique,))
+            return res[..., inverse].reshape(res.shape[:-1] + shape)
+
+        res = func(*unique.T)
+        if isinstance(res, (list, tuple)):
+            return [scatter(i) for i in res]
+        return scatter(res)
+
+    def _get_cached(self, name, deps, func):
+        '''
+        evaluate func() or get the result from the evaluation-cache
+        (see eval_cache)
+
+        Parameters:
+        ------------
+        name : str
+               the name of the cached value
+        deps : list
+               the values the result depends on. A cached result is only
+               used if all values are equal to the values used to generate it
+        func : callable
+               a function (without arguments) that returns the result
+        '''
+        cache = self._eval_cache
+        if cache is None:
+            return func()
+
+        # (copies of the RT1-object share the cache and might be
+        # evaluated concurrently, e.g. via evaluate())
+        with cache.lock:
+            entry = cache.entries.get(name, None)
+            if entry is not None and _deps_equal(entry[0], deps):
+                cache.hits += 1
+                return entry[1]
+            cache.misses += 1
+
+        val = func()
+        deps = [np.copy(i) if isinstance(i, np.ndarray) else i for i in deps]
+        with cache.lock:
+            cache.entries[name] = (deps, val)
+        return val
+
+    def _drop_cached(self, name):
+        # remove a value from the evaluation-cache (if it exists)
+        cache = self._eval_cache
+        if cache is not None:
+            with cache.lock:
+                cache.entries.pop(name, None)
+
+    def _angle_deps(self):
+        # the values that angle-dependent results depend on
+        return [self.t_0, self.t_ex, self.p_0, self.p_ex]
+
+    def _param_deps(self):
+        # the values that results depending on param_dict depend on
+        return ([tuple(self.param_dict.keys())] +
+                list(self.param_dict.values()))
+
+    def _use_fn_cache(self):
+        # the fn-cache is only used if the fn-coefficients are obtained
+        # from the interaction-expansion (the model-signature used as
+        # cache-key does not cover provided fn-coefficients or functions)
+        return (self.fn_cache is not None and self.fn_input is None and
+                self._fnevals_input is None and not self._fn_provided)
+
+    def _get_fn_cache_entry(self):
+        # load the entry of the persistent fn-cache (if a cache is used)
+        if not self._use_fn_cache():
+            return None
+        try:
+            return self.__fn_cache_entry
+        except AttributeError:
+            self.__fn_cache_entry = self.fn_cache.get(self.fn_cache.key(self))
+            return self.__fn_cache_entry
+
+    def _update_fn_cache_entry(self, **kwargs):
+        # add the provided items to the entry of the persistent fn-cache
+        if not self._use_fn_cache():
+            return
+        entry = dict(self._get_fn_cache_entry() or {}, **kwargs)
+        self.fn_cache.put(self.fn_cache.key(self), entry)
+        self.__fn_cache_entry = entry
+
     def _get_fn(self):
         try:
             return self.__fn
@@ -222,7 +489,14 @@ class RT1(object):
         # of the fn-coefficients for evaluation
         # only evaluate fn-coefficients if _fnevals funcions are not
         # already available!
+        entry = None
         if fn is None and self.int_Q is True:
+            entry = self._get_fn_cache_entry()
+
+        if entry is not None and 'fn' in entry:
+            self.prv(1, 'using fn-coefficients from fn_cache')
+            self.__fn = [sp.sympify(i) for i in entry['fn']]
+        elif fn is None and self.int_Q is True:
             self.prv(1, 'evaluating fn-coefficients...')
 
             import timeit
@@ -240,9 +514,14 @@ class RT1(object):
             self.prv(2,
                      'coefficients extracted, it took ' +
                      str(toc - tic) + ' sec')
+
+            self._update_fn_cache_entry(
+                fn=[sp.srepr(sp.sympify(i)) for i in self.__fn])
         else:
             self.prv(3, 'using provided fn-coefficients')
             self.__fn = fn
+            if fn is not None:
+                self._fn_provided = True
 
     fn = property(_get_fn, _set_fn)
 
@@ -256,7 +535,18 @@ class RT1(object):
         return self.__fnevals
 
     def _set_fnevals(self, _fnevals):
-        if _fnevals is None and self.int_Q is True:
+        entry = None
+        if (_fnevals is None and self.int_Q is True and
+                self.lambda_backend != 'numeric'):
+            entry = self._get_fn_cache_entry()
+
+        if entry is not None and 'source' in entry:
+            self.prv(1, 'using _fnevals functions from fn_cache')
+            self.__fnevals = SourceFnevals(entry['source'])
+        elif entry is not None and 'tensor' in entry:
+            self.prv(1, 'using _fnevals functions from fn_cache')
+            self.__fnevals = entry['tensor']
+        elif _fnevals is None and self.int_Q is True:
             self.prv(1, 'generation of _fnevals functions...')
             import timeit
             tic = timeit.default_timer()
@@ -267,7 +557,15 @@ class RT1(object):
 
             # use symengine's Lambdify if symengine has been used within
             # the fn-coefficient generation
-            if self.lambda_backend == 'symengine':
+            if self.lambda_backend == 'numeric':
+                self.prv(1, 'numerical quadrature')
+
+                # the fn-coefficients are evaluated numerically
+                # (no symbolic computations are required)
+                self.__fnevals = QuadratureFnevals(self.V, self.SRF,
+                                                   self.param_dict.keys())
+
+            elif self.lambda_backend == 'symengine':
                 self.prv(1,
                          'symengine currently only working with dev-version!!')
                 # set lambdify module
@@ -279,257 +577,78 @@ class RT1(object):
             elif self.lambda_backend == 'cse':
                 self.prv(1, 'cse - sympy')
 
-                # define a generator function to use deferred vectors for cse
-                def defgen(name='defvec'):
-                    x = sp.DeferredVector(name)
-                    n = 0
-                    while(True):
-                        yield x[n]
-                        n += 1
-
-                variables = sp.var(('theta_0', 'phi_0', 'theta_ex', 'phi_ex') +
-                                   tuple(map(str, self.param_dict.keys())))
-
-                tic = timeit.default_timer()
-                # convert the equations to sympy formulas
-                # (needed if symengine has been used to expand the products)
-                funs = list(map(sp.sympify, self.fn))
-                toc = timeit.default_timer()
-                self.prv(2, 'sympifying took ' + str(toc-tic))
-
-                # initialize arrasy that store the cse-functions and variables
-                fn_cse_funs = []
-                fn_cse_repfuncs = []
-                fn_cse_vars = []
-
-                # initialize a deferred vector and an associated generator
-
-                for nf, fncoef in enumerate(funs):
-                    defvecgen = defgen('defvec')
-
-                    # evaluate cse functions and variables for the i'th coef.
-                    fn_repl, fn_csefun = sp.cse(fncoef, symbols=defvecgen,
-                                                order='none')
-                    self.prv(2,
-                             'fn_repl has ' + str(len(fn_repl)) + ' elements')
-                    # store for later use
-                    fn_cse_funs = fn_cse_funs + [fn_csefun[0]]
-
-                    fn_funcs = []
-                    cse_variables = []  # list(variables)
-                    for i, ff in enumerate(fn_repl):
-                        # use a deferred vector in lambdify to avoid exceeding
-                        # allowed maximum number of arguments
-                        defvec = sp.DeferredVector('defvec')
-                        symbs = [defvec] + list(variables)
-                        fn_funcs.append(sp.lambdify(symbs, ff[1],
-                                                    modules='numpy'))
-                        cse_variables.append(ff[0])
-
-                    fn_cse_repfuncs = fn_cse_repfuncs + [fn_funcs]
-                    fn_cse_vars = fn_cse_vars + [cse_variables]
-                    self.prv(2, 'cse of coefficient ' + str(nf) + '/' +
-                          str(len(funs)) + ' finished')
-
-                ifuncs = []
-                for n in range(len(fn_cse_funs)):
-                    # use a deferred vector in lambdify to avoid exceeding
-                    # allowed maximum number of arguments
-                    defvec = sp.DeferredVector('defvec')
-                    symbs = [defvec] + list(variables)
-                    ifunc = sp.lambdify(symbs, fn_cse_funs[n],
-                                        modules='numpy')
-                    ifuncs = ifuncs + [ifunc]
-
-                # define a function that evaluates the i'th fn-coefficient
-                def fneval(*variables):
-                    sol = []
-                    for n in range(len(fn_cse_funs)):
-                        xs = []
-                        i = 0
-                        for f in fn_cse_repfuncs[n]:
-                            # broadcast arrays to ensure correct shape
-                            xscalc = np.broadcast_arrays(f(xs, *variables),
-                                                         variables[0])[0]
-                            xs = xs + [xscalc]
-                            i = i + 1
-                        sol = sol + [ifuncs[n](xs, *variables)]
-                    return sol
-
-                self.__fnevals = fneval
+                # generate the source of a function that evaluates the
+                # fn-coefficients (using sympy.cse for each coefficient)
+                source = fn_source(self.fn, variables)
 
-            elif self.lambda_backend == 'sympy':
-                self.prv(1, 'sympy')
-                # set lambdify module
-                lambdify = sp.lambdify
+                self.__fnevals = SourceFnevals(source)
 
-                sympy_fn = list(map(sp.sympify, self.fn))
+                # store the generated source in the fn-cache
+                self._update_fn_cache_entry(source=source)
 
-                self.__fnevals = lambdify((variables),
-                                          sp.sympify(sympy_fn),
-                                          modules=["numpy", "sympy"],
-                                          dummify=False)
+            elif self.lambda_backend == 'cse_fused':
+                self.prv(1, 'joint cse - sympy')
 
-                self.__fnevals.__doc__ = ('''
-                                    A function to numerically evaluate the
-                                    fn-coefficients a for given set of
-                                    incidence angles and parameter-values
-                                    as defined in the param_dict dict.
+                # generate the source of a function that evaluates all
+                # fn-coefficients (using a single sympy.cse for all
+                # coefficients) and returns a stacked array
+                source = fused_fn_source(self.fn, variables)
 
-                                    The call-signature is:
-                                        RT1-object._fnevals(theta_0, phi_0, \
-                                        theta_ex, phi_ex, *param_dict.values())
-                                    ''')
+                self.__fnevals = SourceFnevals(source)
 
-            elif self.lambda_backend == 'cse_symengine_sympy':
-                '''
-                sympy's cse functionality is used to avoid sympifying the whole
-                fn-coefficient array.
+                # store the generated source in the fn-cache
+                self._update_fn_cache_entry(source=source)
 
-                symengines lambdify is used since it turns out to be superior
-                in terms of computational speed compared to symengines
-                currently available Lambdify function.
-                '''
+            elif self.lambda_backend == 'tensor':
+                self.prv(1, 'polynomial-tensor')
 
-                self.prv(1,
-                         'use symengines cse and sympys lambdify with numpy')
-                variables = sp.var(('theta_0', 'phi_0', 'theta_ex', 'phi_ex') +
-                                   tuple(map(str, self.param_dict.keys())))
-
-                from symengine import cse as cse_seng
-                funs = self.fn
-
-                # initialize array that store the cse-functions and variables
-                fn_cse_funs = []  # resulting cse-function for each coefficient
-                fn_cse_repfuncs = []  # replacement functions for each coef.
-                for nf, fncoef in enumerate(funs):
-                    # evaluate cse functions and variables for the i'th coef.
-                    fn_repl, fn_csefun = cse_seng([fncoef])
-
-                    self.prv(2,
-                             'fn_repl has ' + str(len(fn_repl)) + ' elements')
-
-                    # generate lambda-functions for replacements
-                    fn_rfuncs = {}
-                    defvec_subs = {}
-                    for i, repl in enumerate(fn_repl):
-                        defvec = sp.DeferredVector('defvec')
-                        defvec_subs[sp.sympify(repl[0])] = defvec[i]
-                        # replace xn's with deferred vector elements
-                        funcreplaced = sp.sympify(
-                                repl[1]).xreplace(defvec_subs)
-                        symbs = [defvec] + list(variables)
-                        fn_rfuncs[defvec[i]] = sp.lambdify(
-                            symbs,
-                            funcreplaced,
-                            modules=['numpy'])
-
-                    fn_cse_repfuncs += [fn_rfuncs]
-
-                    # generate lambda-functions for cse_functions
-                    fn_csefun_defvec = sp.sympify(
-                            fn_csefun[0]).xreplace(defvec_subs)
-                    funargs = [defvec] + list(variables)
-                    fn_cse_funs += [sp.lambdify(funargs,
-                                                fn_csefun_defvec,
-                                                modules=['numpy'])]
-
-                    self.prv(2, 'cse of coefficient ' + str(nf) + '/' +
-                             str(len(funs)) + ' finished')
-
-                def fneval(*variables):
-                    sol = []
-                    for n, fn_cse_fun in enumerate(fn_cse_funs):
-                        replvec = []
-                        for key in fn_cse_repfuncs[n]:
-                            replvec += [fn_cse_repfuncs[n][key](
-                                replvec, *variables)]
-                        sol += [fn_cse_fun(replvec, *variables)]
-                    return sol
-
-                self.__fnevals = fneval
-
-            elif self.lambda_backend == 'cse_seng_sp_newlambdify':
+                # the coefficient-matrix is obtained directly from the
+                # sparse polynomial of the interaction-expansion (if the
+                # fn-coefficients have not been provided explicitly)
+                if self.fn_input is None:
+                    self.__fnevals = TensorFnevals.from_poly(
+                        self._calc_interaction_expansion(), variables,
+                        n_fn=self.SRF.ncoefs + self.V.ncoefs - 1)
+                else:
+                    self.__fnevals = TensorFnevals.from_fn(self.fn,
+                                                           variables)
+
+                # store the generated object in the fn-cache
+                self._update_fn_cache_entry(tensor=self.__fnevals)
+
+            elif self.lambda_backend == 'sympy':
+                self.prv(1, 'sympy')
+
+                # generate the source of a function that evaluates the
+                # fn-coefficients (without common-subexpression-elimination)
+                source = fn_source(self.fn, variables, cse=None)
+
+                self.__fnevals = SourceFnevals(source)
+
+                # store the generated source in the fn-cache
+                self._update_fn_cache_entry(source=source)
+
+            elif self.lambda_backend in ['cse_symengine_sympy',
+                                         'cse_seng_sp_newlambdify']:
                 '''
-                sympy's cse functionality is used to avoid sympifying the whole
-                fn-coefficient array.
+                symengine's cse functionality is used to avoid sympifying the
+                whole fn-coefficient array.
 
-                a customly defined lambdify-function is used since the
-                functions generated with sympy's lambdify with the option
-                modules = ['numpy'] are not pickleable.
-                (necessary for multiprocessing purposes)
+                (the generated source is compiled with python's compiler,
+                the name 'cse_seng_sp_newlambdify' is kept for backward
+                compatibility)
                 '''
 
-                # define a function for lambdification
-                def newlambdify(args, funs):
-                    from sympy.printing.lambdarepr import NumPyPrinter
-                    from sympy.utilities.lambdify import lambdastr
-                    funcstr = lambdastr(args, funs, printer=NumPyPrinter)
+                self.prv(1, 'use symengines cse and python-source')
 
-                    funcstr = funcstr.replace(
-                            'pi', 'np.pi').replace(
-                            'sin', 'np.sin').replace(
-                            'cos', 'np.cos').replace(
-                            'sqrt', 'np.sqrt')
+                # generate the source of a function that evaluates the
+                # fn-coefficients (using symengine.cse for each coefficient)
+                source = fn_source(self.fn, variables, cse='symengine')
 
-                    return eval(funcstr)
+                self.__fnevals = SourceFnevals(source)
 
-                self.prv(1,
-                         'use symengines cse and sympys lambdify with ' +
-                         'manually defined lambdify function')
-                variables = sp.var(('theta_0', 'phi_0', 'theta_ex', 'phi_ex') +
-                                   tuple(map(str, self.param_dict.keys())))
-
-                from symengine import cse as cse_seng
-                funs = self.fn
-
-                # initialize array that store the cse-functions and variables
-                fn_cse_funs = []  # resulting cse-function for each coefficient
-                fn_cse_repfuncs = []  # replacement functions for each coef.
-                for nf, fncoef in enumerate(funs):
-                    # evaluate cse functions and variables for the i'th coef.
-                    fn_repl, fn_csefun = cse_seng([fncoef])
-
-                    self.prv(2,
-                             'fn_repl has ' + str(len(fn_repl)) + ' elements')
-
-                    # generate lambda-functions for replacements
-                    fn_rfuncs = {}
-                    defvec_subs = {}
-                    for i, repl in enumerate(fn_repl):
-                        defvec = sp.DeferredVector('defvec')
-                        defvec_subs[sp.sympify(repl[0])] = defvec[i]
-                        # replace xn's with deferred vector elements
-                        funcreplaced = sp.sympify(
-                                repl[1]).xreplace(defvec_subs)
-                        symbs = [defvec] + list(variables)
-                        fn_rfuncs[defvec[i]] = newlambdify(
-                            symbs,
-                            funcreplaced)
-
-                    fn_cse_repfuncs += [fn_rfuncs]
-
-                    # generate lambda-functions for cse_functions
-                    fn_csefun_defvec = sp.sympify(
-                            fn_csefun[0]).xreplace(defvec_subs)
-                    funargs = [defvec] + list(variables)
-                    fn_cse_funs += [newlambdify(funargs,
-                                                fn_csefun_defvec)]
-
-                    self.prv(2, 'cse of coefficient ' + str(nf) + '/' +
-                             str(len(funs)) + ' finished')
-
-                def fneval(*variables):
-                    sol = []
-                    for n, fn_cse_fun in enumerate(fn_cse_funs):
-                        replvec = []
-                        for key in fn_cse_repfuncs[n]:
-                            replvec += [fn_cse_repfuncs[n][key](
-                                replvec, *variables)]
-                        sol += [fn_cse_fun(replvec, *variables)]
-                    return sol
-
-                self.__fnevals = fneval
+                # store the generated source in the fn-cache
+                self._update_fn_cache_entry(source=source)
 
             else:
                 self.prv(1, 'lambda_backend "' + self.lambda_backend +
@@ -543,6 +662,8 @@ class RT1(object):
         else:
             self.prv(3, 'using provided _fnevals-functions')
             self.__fnevals = _fnevals
+            if _fnevals is not None:
+                self._fn_provided = True
 
     _fnevals = property(_get_fnevals, _set_fnevals)
 
@@ -554,6 +675,7 @@ class RT1(object):
         if np.isscalar(t_0):
             t_0 = np.array([t_0])
         self.__t_0 = t_0
+        self._geom.reset()
         # if geometry is mono, set t_ex to t_0
         if self.geometry == 'mono':
             self._set_t_ex(t_0)
@@ -572,6 +694,7 @@ class RT1(object):
             if np.isscalar(t_ex):
                 t_ex = np.array([t_ex])
         self.__t_ex = t_ex
+        self._geom.reset()
     t_ex = property(_get_t_ex, _set_t_ex)
 
     def _get_p_0(self):
@@ -603,12 +726,19 @@ class RT1(object):
     p_ex = property(_get_p_ex, _set_p_ex)
 
     # calculate cosines of incident- and exit angle
+    def _geometry(self):
+        '''
+        get the (lazily evaluated) angle- and attenuation-terms for the
+        current angles and tau (see _Geometry)
+        '''
+        return self._geom.update(self.t_0, self.t_ex, self.V.tau)
+
     def _get_mu_0(self):
-        return np.cos(self.t_0)
+        return self._geometry().mu_0
     _mu_0 = property(_get_mu_0)
 
     def _get_mu_ex(self):
-        return np.cos(self.t_ex)
+        return self._geometry().mu_ex
     _mu_ex = property(_get_mu_ex)
 
     def _get_bsf(self):
@@ -625,24 +755,25 @@ class RT1(object):
 
     def _extract_coefficients(self, expr):
         """
-        extract Fn coefficients from given forumula.
+        extract Fn coefficients from given polynomial.
 
-        This is done by collecting the terms of expr with respect to powers
-        of cos(theta_s) and simplifying the gained coefficients by applying
-        a simple trigonometric identity.
+        Since the polynomial is (apart from the integration-variable
+        theta_s) only given in terms of powers of cos(theta_s), the
+        fn-coefficients are directly obtained as the coefficients of the
+        associated powers of cos(theta_s).
 
         Parameters
         ----------
 
-        expr : sympy expression
-               prepared sympy-expression to be used for extracting
-               the fn-coefficients (output of _calc_interaction_expansion())
+        expr : sympy.polys.rings.PolyElement
+               sparse polynomial to be used for extracting the
+               fn-coefficients (output of _calc_interaction_expansion())
 
         Returns
         --------
         fn : list(sympy expressions)
              A list of sympy expressions that represent the fn-coefficients
-             associated with the given input-equation (expr).
+             associated with the given input-polynomial (expr).
 
         """
 
@@ -650,33 +781,24 @@ class RT1(object):
 
         N_fn = self.SRF.ncoefs + self.V.ncoefs - 1
 
-        fn = []
-
-        # find f_0 coefficient
-        repl0 = dict([[sp.cos(theta_s), 0]])
-        fn = fn + [expr.xreplace(repl0)]
-
-        # find f_1 coefficient
-        repl1 = dict([[sp.cos(theta_s)**i, 0] for i in list(range(N_fn, 0, -1))
-                     if i != 1] + [[sp.cos(theta_s), 1]])
-        fn = fn + [expr.xreplace(repl1) - fn[0]]
-
-        for n in np.arange(2, N_fn, dtype=int):
-            repln = dict([[sp.cos(theta_s)**int(n), 1]])
-            fn = fn + [(expr.xreplace(repln)).xreplace(repl0) - fn[0]]
-
-#        # alternative way of extracting the coefficients:
-#        theta_s = sp.Symbol('theta_s')
-#        # collect terms with equal powers of cos(theta_s)
-#        expr_sort = sp.collect(expr, sp.cos(theta_s), evaluate=False)
-#
-#        # convert generated dictionary to list of coefficients
-#        # the use of  .get() is necessary for getting the dict-values since
-#        # otherwise coefficients that are actually 0. would not appear
-#        #  in the list of fn-coefficients
-#
-#        fn = [expr_sort.get(sp.cos(theta_s) ** n, 0.)
-#              for n in range(self.SRF.ncoefs + self.V.ncoefs - 1)]
+        ring = expr.ring
+        i_cos = ring.symbols.index(sp.cos(theta_s))
+
+        # collect the terms with equal powers of cos(theta_s)
+        # (the factor 2 * pi results from the definition of the
+        # fn-coefficients since the integral over phi_s is evaluated as the
+        # mean-value over 0 ... 2*pi, see _integrate_0_2pi_phis())
+        # (since the monomials are unique, the terms are combined without
+        # further evaluation to avoid costly symbolic simplifications)
+        terms = [[] for n in range(N_fn)]
+        for monom, coef in expr.iterterms():
+            terms[monom[i_cos]] += [
+                sp.Mul(ring.domain.to_sympy(coef),
+                       *[symbol**power for i, (symbol, power)
+                         in enumerate(zip(ring.symbols, monom))
+                         if power > 0 and i != i_cos], evaluate=False)]
+
+        fn = [2 * sp.pi * sp.Add(*i, evaluate=False) for i in terms]
 
         return fn
 
@@ -688,19 +810,20 @@ class RT1(object):
 
         The approach is as follows:
 
-            1. Expand the Legrende coefficents of the surface and volume
-               phase functions
+            1. Represent the Legrende expansions of the surface and volume
+               phase functions as sparse multivariate polynomials with
+               cos(theta_s), sin(theta_s), cos(phi_s), sin(phi_s)
+               (and all other appearing functions) as generators
+               and evaluate their product
             2. Apply the function _integrate_0_2pi_phis() to evaluate
                the integral
             3. Replace remaining sin(theta_s) terms in the Legrende polynomials
                by cos(theta_s) to prepare for fn-coefficient extraction
-            4. Expand again to ensure that a fully expanded expression
-               is returned (to be used as input in _extract_coefficients() )
 
         Returns
         --------
-        res : sympy expression
-              A fully expanded expression that can be used as
+        res : sympy.polys.rings.PolyElement
+              A sparse polynomial that can be used as
               input for _extract_coefficients()
 
         """
@@ -709,119 +832,496 @@ class RT1(object):
 
         volexp = self.V.legexpansion(self.t_0, self.t_ex,
                                       self.p_0, self.p_ex,
-                                      self.geometry).doit()
+                                      self.geometry)
 
         brdfexp = self.SRF.legexpansion(self.t_0, self.t_ex,
                                         self.p_0, self.p_ex,
-                                        self.geometry).doit()
+                                        self.geometry)
+
+        theta_s = sp.Symbol('theta_s')
+        phi_s = sp.Symbol('phi_s')
+
+        # split the expansions into the legendre-coefficients and the
+        # arguments of the legendre-polynomials to avoid the symbolic
+        # expansion of the legendre-polynomials
+        volsplit = self._split_legexpansion(volexp)
+        brdfsplit = self._split_legexpansion(brdfexp)
+
+        if volsplit is None or brdfsplit is None:
+            exprs = [volexp.doit(), brdfexp.doit()]
+        else:
+            exprs = ([volsplit[1], brdfsplit[1]] +
+                     volsplit[0] + brdfsplit[0])
+
+        # convert the expressions to sparse polynomials
+        ring, polys = sring(exprs)
+
+        # ensure that all functions of theta_s and phi_s are generators
+        # of the polynomial-ring (even if they do not appear in the
+        # expansions)
+        missing = tuple(i for i in [sp.cos(theta_s), sp.sin(theta_s),
+                                    sp.cos(phi_s), sp.sin(phi_s)]
+                        if i not in ring.symbols)
+        if len(missing) > 0:
+            newring = PolyRing(ring.symbols + missing, ring.domain,
+                               ring.order)
+            polys = [
+                newring.from_dict(dict((monom + (0,) * len(missing), coef)
+                                       for monom, coef in i.iterterms()))
+                for i in polys]
+            ring = newring
+
+        if volsplit is None or brdfsplit is None:
+            volpoly, brdfpoly = polys
+        else:
+            nvol = len(volsplit[0])
+            volpoly = self._legendre_series(polys[2:2 + nvol], polys[0])
+            brdfpoly = self._legendre_series(polys[2 + nvol:], polys[1])
 
         # preparation of the product of p*BRDF for coefficient retrieval
         # this is the eq.23. and would need to be integrated from 0 to 2pi
-        fPoly = expand(2 * sp.pi * volexp * brdfexp)
+        fPoly = volpoly * brdfpoly
 
         # do integration of eq. 23
         expr = self._integrate_0_2pi_phis(fPoly)
 
-        # now we do still simplify the expression to be able to express
-        # things as power series of cos(theta_s)
-        theta_s = sp.Symbol('theta_s')
-        replacements = [(sp.sin(theta_s) ** i,
-                         expand((1. - sp.cos(theta_s) ** 2)
-                                ** sp.Rational(i, 2)))
-                        for i in range(1, self.SRF.ncoefs + self.V.ncoefs - 1)
-                        if i % 2 == 0]
+        # now we do still replace sin(theta_s)**(2 i) by
+        # (1 - cos(theta_s)**2)**i to be able to express things as
+        # power series of cos(theta_s)
+        i_cos = ring.symbols.index(sp.cos(theta_s))
+        i_sin = ring.symbols.index(sp.sin(theta_s))
+
+        binomials = dict()
+        res = dict()
+        for monom, coef in expr.iterterms():
+            i = monom[i_sin]
+            # odd powers of sin(theta_s) are always associated with odd
+            # powers of sin(phi_s) or cos(phi_s) and therefore vanish
+            assert i % 2 == 0, 'odd powers of sin(theta_s) remained'
+
+            if i not in binomials:
+                binomials[i] = [ring.domain.convert((-1)**k *
+                                                    sp.binomial(i // 2, k))
+                                for k in range(i // 2 + 1)]
+
+            monom = list(monom)
+            monom[i_sin] = 0
+            ncos = monom[i_cos]
+            for k, binomial in enumerate(binomials[i]):
+                monom[i_cos] = ncos + 2 * k
+                newmonom = tuple(monom)
+                res[newmonom] = (res.get(newmonom, ring.domain.zero)
+                                 + coef * binomial)
+
+        return ring.from_dict(res)
+
+    def _split_legexpansion(self, expr):
+        """
+        Split a legendre-expansion of the form
+        Sum(c_n * legendre(n, x), (n, 0, N)) (as returned by the
+        legexpansion() functions of the Volume and Surface classes) into
+        the legendre-coefficients c_n and the argument x
+
+        Parameters
+        ----------
+        expr : sympy.Sum
+               the legendre-expansion
+
+        Returns
+        -------
+        coefs, x : list(sympy expressions), sympy expression
+                   the legendre-coefficients (for n = 0 ... N) and
+                   the argument of the legendre-polynomials.
+                   If expr is not of the expected form, None is returned.
+        """
+
+        if not isinstance(expr, sp.Sum) or len(expr.limits) != 1:
+            return None
 
-        res = expand(expr.xreplace(dict(replacements)))
+        n, n0, n1 = expr.limits[0]
+        legpolys = expr.function.atoms(sp.legendre)
+        if (len(legpolys) != 1 or n0 != 0 or
+                not isinstance(n1, (int, sp.Integer))):
+            return None
+
+        legpoly = legpolys.pop()
+        if legpoly.args[0] != n or n in legpoly.args[1].free_symbols:
+            return None
+
+        # the legendre-polynomial must be a factor of the summand
+        factors = list(sp.Mul.make_args(expr.function))
+        if legpoly not in factors:
+            return None
+        factors.remove(legpoly)
+        coef = sp.Mul(*factors)
+
+        coefs = [coef.xreplace({n: i}).doit() for i in range(int(n1) + 1)]
+
+        return coefs, legpoly.args[1]
+
+    def _legendre_series(self, coefs, x):
+        """
+        Evaluate the series Sum(c_n * legendre(n, x)) for sparse polynomials
+        c_n and x using the recurrence-relation of the legendre-polynomials
+
+        Parameters
+        ----------
+        coefs : list(sympy.polys.rings.PolyElement)
+                the legendre-coefficients c_n
+        x : sympy.polys.rings.PolyElement
+            the argument of the legendre-polynomials
+
+        Returns
+        -------
+        res : sympy.polys.rings.PolyElement
+              the polynomial representation of the series
+        """
+
+        ring = x.ring
+        convert = ring.domain.convert
+        res = ring.zero
+        legpoly, legpoly_prev = ring.one, ring.zero
+        for n, coef in enumerate(coefs):
+            if n > 0:
+                # n P_n = (2n - 1) x P_(n-1) - (n - 1) P_(n-2)
+                legpoly, legpoly_prev = (
+                    legpoly * x * convert(sp.Rational(2 * n - 1, n))
+                    - legpoly_prev * convert(sp.Rational(n - 1, n)),
+                    legpoly)
+            if coef:
+                res += coef * legpoly
 
         return res
 
-    def _cosintegral(self, i):
+    def _cosintegral(self, i, j=0):
         """
-        Analytical solution to the integral of cos(x)**i
+        Analytical solution to the mean-value of cos(x)**i * sin(x)**j
         in the inteVal 0 ... 2*pi
 
         Parameters
         ----------
         i : scalar(int)
-            Power of the cosine function to be integrated, i.e.  cos(x)^i
+            Power of the cosine function to be integrated
+        j : scalar(int) (default = 0)
+            Power of the sine function to be integrated
 
         Returns
         -------
-        - : float
-              Numerical value of the integral of cos(x)^i
-              in the inteVal 0 ... 2*pi
+        - : sympy.Rational
+              Numerical value of the integral of cos(x)^i * sin(x)^j
+              in the inteVal 0 ... 2*pi divided by 2*pi
         """
 
-        if i % 2 == 0:
-            return (2 ** (-i)) * sp.binomial(i, i * sp.Rational(1, 2))
+        if i % 2 == 0 and j % 2 == 0:
+            return (sp.factorial2(i - 1) * sp.factorial2(j - 1)
+                    / sp.factorial2(i + j))
         else:
             # for odd exponents result is always zero
-            return 0.
+            return sp.S.Zero
 
     def _integrate_0_2pi_phis(self, expr):
         """
-        Perforn symbolic integration of a pre-expanded power-series
+        Perforn symbolic integration of a polynomial
         in sin(phi_s) and cos(phi_s) over the variable phi_s
         in the inteVal 0 ... 2*pi
 
-        The approach is as follows:
+        Since the integral of each monomial cos(phi_s)^i * sin(phi_s)^j is
+        known analytically (see _cosintegral()), the integration
+        is performed by a simple lookup of the integrals associated with
+        the powers of cos(phi_s) and sin(phi_s) for each term of expr.
 
-            1. Replace all appearing sin(phi_s)^odd with 0 since the
-               integral vanishes
-            2. Replace all remaining sin(phi_s)^even with their representation
-               in terms of cos(phi_s)
-            3. Replace all cos(phi_s)^i terms with _cosintegral(i)
-            4. Expand the gained solution for further processing
+        Note: the result is divided by 2 * pi (i.e. the mean-value with
+        respect to phi_s is returned)!
 
         Parameters
         ----------
-        expr : sympy expression
-               pre-expanded product of the legendre-expansions of
-               V.legexpansion() and SRF.legexpansion()
+        expr : sympy.polys.rings.PolyElement
+               product of the legendre-expansions of
+               V.legexpansion() and SRF.legexpansion() represented as
+               a sparse polynomial
 
         Returns
         -------
-        res : sympy expression
-              resulting symbolic expression that results from integrating
+        res : sympy.polys.rings.PolyElement
+              resulting polynomial that results from integrating
               expr over the variable phi_s in the inteVal 0 ... 2*pi
+              (divided by 2 * pi)
         """
 
         phi_s = sp.Symbol('phi_s')
 
-        # replace first all odd powers of sin(phi_s) as these are
-        # all zero for the integral
-        replacements1 = [(sp.sin(phi_s) ** i, 0.)
-                         for i in range(1, self.SRF.ncoefs +
-                                        self.V.ncoefs + 1) if i % 2 == 1]
+        ring = expr.ring
+        i_cos = ring.symbols.index(sp.cos(phi_s))
+        i_sin = ring.symbols.index(sp.sin(phi_s))
+
+        integrals = dict()
+        res = dict()
+        for monom, coef in expr.iterterms():
+            key = (monom[i_cos], monom[i_sin])
+            if key not in integrals:
+                integrals[key] = ring.domain.convert(self._cosintegral(*key))
+            if not integrals[key]:
+                continue
+
+            monom = list(monom)
+            monom[i_cos] = 0
+            monom[i_sin] = 0
+            monom = tuple(monom)
+            res[monom] = (res.get(monom, ring.domain.zero)
+                          + coef * integrals[key])
+
+        return ring.from_dict(res)
+
+    def _copy(self):
+        # get a (shallow) copy of the model whose parameters can be changed
+        # without affecting the original object
+        if self.int_Q is True:
+            # compile the _fnevals function (if necessary) such that it is
+            # shared by all copies
+            self._fnevals
+        R = copy.copy(self)
+        R.V = copy.copy(self.V)
+        R.SRF = copy.copy(self.SRF)
+        # (copies might be evaluated concurrently for different angles)
+        R._geom = _Geometry()
+        return R
+
+    def _select_rows(self, rows):
+        # get a copy of the model that contains only the selected rows
+        # of the angles and the parameters
+        R = self._copy()
+        shape = np.shape(self.t_0)
+
+        def select(val):
+            # select the rows of angles and parameters that are given for
+            # each row (i.e. arrays with the same number of dimensions as
+            # t_0 and one value per row), all other values (e.g. arrays
+            # that are given for each column) are broadcasted as they are
+            if _has_rows(val, shape):
+                return np.asarray(val)[rows]
+            return val
+
+        def select_axis(val):
+            # the setter-functions for tau, omega, NormBRDF and bsf add an
+            # axis to the arrays, i.e. the first axis always refers to the
+            # rows of t_0 (squeezing the arrays is therefore necessary
+            # before they are assigned to the copy)
+            if np.size(val) > 1 and np.shape(val)[0] == shape[0]:
+                return np.squeeze(np.asarray(val)[rows])
+            return np.squeeze(val)
+
+        R.t_0 = self.t_0[rows]
+        R.p_0 = select(self.p_0)
+        R.t_ex = select(self.t_ex)
+        R.p_ex = select(self.p_ex)
+
+        R.V.tau = select_axis(self.V.tau)
+        R.V.omega = select_axis(self.V.omega)
+        R.SRF.NormBRDF = select_axis(self.SRF.NormBRDF)
+        R.bsf = select_axis(self.bsf)
+
+        R.param_dict = dict((key, select(val))
+                            for key, val in self.param_dict.items())
+        return R
+
+    def _evaluate_chunks(self, func, workers=None, chunksize=None):
+        '''
+        evaluate func(R) on chunks of rows of the model (see _select_rows())
+        using a thread-pool and write the results into preallocated arrays
 
-        # then substitute the sine**2 by 1-cos**2
-        replacements1 = (replacements1 +
-                         [(sp.sin(phi_s) ** i,
-                           expand((1. -
-                                   sp.cos(phi_s) ** 2) ** sp.Rational(i, 2)))
-                          for i in range(2, self.SRF.ncoefs +
-                                         self.V.ncoefs + 1) if i % 2 == 0])
+        Parameters:
+        ------------
+        func : callable
+               a function that returns a list of arrays for a given RT1-object
+        workers : int (default = None)
+                  the number of threads (if None, os.cpu_count() is used)
+        chunksize : int (default = None)
+                    the (approximate) number of samples that are processed
+                    at once by each thread. If None, _thread_chunksize is used
 
-        res = expand(expr.xreplace(dict(replacements1)))
+        Returns:
+        ---------
+        out : list
+              a list of the combined results
+        '''
+        if chunksize is None:
+            chunksize = self._thread_chunksize
+
+        # split the rows into chunks of (at most) chunksize samples
+        nrows = len(self.t_0)
+        rowsize = max(1, np.size(self.t_0) // nrows)
+        step = max(1, int(chunksize) // rowsize)
+        slices = [slice(i, i + step) for i in range(0, nrows, step)]
+
+        # the chunks are evaluated concurrently and therefore each chunk
+        # uses a separate evaluation-cache and separate dedup-statistics
+        # (the statistics are added to the statistics of the model after
+        # all chunks are evaluated)
+        if self._eval_cache is not None:
+            caches = self._eval_cache.get_chunks(len(slices))
+        stats = [dict(samples=0, evaluations=0) for sl in slices]
+
+        def evaluate(n):
+            R = self._select_rows(slices[n])
+            R._dedup_stats = stats[n]
+            if self._eval_cache is not None:
+                R._eval_cache = caches[n]
+            res = func(R)
+            # broadcast scalar results (e.g. Ivol for tau = 0) to the
+            # shape of the chunk
+            shape = np.broadcast(*res).shape
+            return [np.broadcast_to(i, shape) for i in res]
+
+        # the first chunk is evaluated in advance to compile all required
+        # functions only once and to get the shape of the outputs
+        res = evaluate(0)
+        out = [np.empty((nrows,) + i.shape[1:], dtype=np.result_type(i, 1.))
+               for i in res]
+
+        def work(n, res=None):
+            if res is None:
+                res = evaluate(n)
+            for o, r in zip(out, res):
+                o[slices[n]] = r
+
+        work(0, res)
+
+        if len(slices) > 1:
+            pool = ThreadPool(workers)
+            try:
+                pool.map(work, range(1, len(slices)))
+            finally:
+                pool.close()
+                pool.join()
+
+        for key in self._dedup_stats:
+            self._dedup_stats[key] += sum(i[key] for i in stats)
+
+        return out
+
+    def evaluate(self, angles=None, params=None, workers=None,
+                 chunksize=None):
+        """
+        Evaluate the model for the provided angles and parameters without
+        changing the attributes of the RT1-object.
 
-        # replacements need to be done simultaneously, otherwise all
-        # remaining sin(phi_s)**even will be replaced by 0
+        Since the object is not modified, evaluate() can be called
+        concurrently (e.g. from several threads) on the same RT1-object.
+        (the _fnevals function is compiled on the first call if necessary
+        and is shared by all evaluations)
 
-        # integrate the cosine terms
-        replacements3 = [(sp.cos(phi_s) ** i, self._cosintegral(i))
-                         for i in range(1, self.SRF.ncoefs +
-                                        self.V.ncoefs + 1)]
+        Parameters
+        ----------
+        angles : tuple(array_like), optional (default = None)
+                 the angles (t_0, t_ex, p_0, p_ex) at which the model is
+                 evaluated. (if geometry is 'mono', t_ex and p_ex have no
+                 effect on the results). If None, the angles of the
+                 RT1-object are used.
+        params : dict, optional (default = None)
+                 a dictionary containing the values of the parameters.
+                 The keys 'I0', 'tau', 'omega', 'NormBRDF' and 'bsf' are
+                 assigned in the same way as the corresponding attributes
+                 (e.g. V.tau), all other keys are used to update param_dict.
+                 Parameters that are not provided are taken from the
+                 RT1-object.
+        workers, chunksize : int, optional (default = None)
+                             the number of threads and the number of samples
+                             processed at once by each thread (see calc())
 
-        res = expand(res.xreplace(dict(replacements3)))
-        return res
+        Returns
+        -------
+        Itot, Isurf, Ivol, Iint : array_like(float)
+                                  the total scattered intensity and the
+                                  individual contributions (see calc())
+        """
+        R = self._copy()
+
+        if angles is not None:
+            R.t_0, R.t_ex, R.p_0, R.p_ex = angles
+
+        if params is not None:
+            params = dict(params)
+            if 'I0' in params:
+                R.I0 = params.pop('I0')
+            if 'tau' in params:
+                R.V.tau = params.pop('tau')
+            if 'omega' in params:
+                R.V.omega = params.pop('omega')
+            if 'NormBRDF' in params:
+                R.SRF.NormBRDF = params.pop('NormBRDF')
+            if 'bsf' in params:
+                R.bsf = params.pop('bsf')
+            R.param_dict = dict(list(self.param_dict.items()) +
+                                list(params.items()))
+
+        return R.calc(workers=workers, chunksize=chunksize)
+
+    def calc_stream(self, chunks, out=None, workers=None, chunksize=None):
+        """
+        A generator to evaluate the model for a sequence of chunks of
+        angles and parameters (e.g. for forward-simulations whose inputs
+        and results do not fit into memory).
+
+        The chunks are evaluated one after the other using evaluate() and
+        therefore the peak memory-consumption is bounded by the size of
+        the chunks. (see iter_chunks() to generate chunks from (memory-
+        mapped) arrays)
+
+        Parameters
+        ----------
+        chunks : iterable
+                 an iterable that yields tuples of the form (angles, params)
+                 (see evaluate() for details)
+        out : tuple(array_like), optional (default = None)
+              a tuple of 4 arrays (e.g. memory-mapped arrays obtained via
+              np.lib.format.open_memmap) to store the results
+              (Itot, Isurf, Ivol, Iint). The results of the chunks are
+              written consecutively along the first axis.
+        workers, chunksize : int, optional (default = None)
+                             the number of threads and the number of samples
+                             processed at once by each thread (see calc())
+
+        Yields
+        ------
+        Itot, Isurf, Ivol, Iint : array_like(float)
+                                  the results of each chunk
+                                  (if out is provided, views of the
+                                  corresponding parts of the output-arrays
+                                  are returned)
+        """
+        start = 0
+        for angles, params in chunks:
+            res = self.evaluate(angles, params, workers=workers,
+                                chunksize=chunksize)
+
+            if out is not None:
+                stop = start + len(res[0])
+                for o, r in zip(out, res):
+                    o[start:stop] = r
+                res = tuple(o[start:stop] for o in out)
+                start = stop
+
+            yield res
 
-    def calc(self):
+    def calc(self, workers=None, chunksize=None):
         """
         Perform actual calculation of bistatic scattering at top of the
         random volume (z=0) for the specified geometry. For details please
         have a look at the documentation:
         (http://rt1.readthedocs.io/en/latest/theory.html#first-order-solution-to-the-rte)
 
+        Parameters
+        ----------
+        workers : int, optional (default = None)
+                  if provided, the rows of the angle- and parameter-arrays
+                  are split into chunks that are evaluated on a thread-pool
+                  with the given number of threads. (most of the evaluation
+                  releases the GIL and therefore runs in parallel)
+                  If None, all samples are evaluated at once.
+        chunksize : int, optional (default = None)
+                    the (approximate) number of samples that are evaluated
+                    at once by each thread (only used if workers is
+                    provided). If None, RT1._thread_chunksize is used.
 
         Returns
         -------
@@ -838,6 +1338,10 @@ class RT1(object):
                Interaction contribution
         """
 
+        if workers is not None:
+            return tuple(self._evaluate_chunks(lambda R: R.calc(),
+                                               workers, chunksize))
+
         # the following if query ensures that volume- and interaction-terms
         # are only calculated if tau > 0.
         # (to avoid nan-values from invalid function-evaluations)
@@ -858,53 +1362,23 @@ class RT1(object):
             # calculate surface-term (valid for any tau-value)
             Isurf = self.surface()
 
-            # store initial parameter-values
-            old_t_0 = self.t_0
-            old_p_0 = self.p_0
-            old_t_ex = self.t_ex
-            old_p_ex = self.p_ex
-
-            old_tau = self.V._get_tau()
-            old_omega = self.V._get_omega()
-            old_NN = self.SRF._get_NormBRDF()
-
             # set mask for tau > 0.
-            mask = old_tau > 0.
+            mask = self.V.tau > 0.
             valid_index = np.where(mask)
             inval_index = np.where(~mask)
 
-            # set parameter-values to valid values for calculation
-            self.t_0 = old_t_0[valid_index[0]]
-            self.p_0 = old_p_0[valid_index[0]]
-            self.t_ex = old_t_ex[valid_index[0]]
-            self.p_ex = old_p_ex[valid_index[0]]
-
-            # squeezing the arrays is necessary since the setter-function for
-            # tau, omega and NormBRDF automatically adds an axis to the arrays!
-            self.V.tau = np.squeeze(old_tau[valid_index[0]])
-            if np.array(self.V.omega).size != 1:
-                self.V.omega = np.squeeze(old_omega[valid_index[0]])
-            if np.array(self.SRF.NormBRDF).size != 1:
-                self.SRF.NormBRDF = np.squeeze(old_NN[valid_index[0]])
-
             # calculate volume and interaction term where tau-values are valid
-            _Ivol = self.volume()
-            if self.int_Q is True:
-                _Iint = self.interaction()
+            # (a copy of the model is used to avoid changing the attributes)
+            if len(valid_index[0]) > 0:
+                if np.all(mask):
+                    R_valid = self
+                else:
+                    R_valid = self._select_rows(valid_index[0])
+                _Ivol = R_valid.volume()
+                if self.int_Q is True:
+                    _Iint = R_valid.interaction()
             else:
-                _Iint = np.full_like(self.t_0, 0.)
-
-            # reset parameter values to old values
-            self.t_0 = old_t_0
-            self.p_0 = old_p_0
-            self.t_ex = old_t_ex
-            self.p_ex = old_p_ex
-
-            # squeezing the arrays is necessary since the setter-function for
-            # tau, omega and NormBRDF automatically add an axis to the arrays!
-            self.V.tau = np.squeeze(old_tau)
-            self.V.omega = np.squeeze(old_omega)
-            self.SRF.NormBRDF = np.squeeze(old_NN)
+                _Ivol, _Iint = 0., 0.
 
             # combine calculated volume-contributions for valid tau-values
             # with zero-arrays for invalid tau-values
@@ -923,6 +1397,58 @@ class RT1(object):
 
         return Isurf + Ivol + Iint, Isurf, Ivol, Iint
 
+    def _brdf(self):
+        # the values of the brdf
+        return self._get_cached(
+            'brdf', [self.SRF._func] + self._angle_deps() + self._param_deps(),
+            lambda: self._evaluate_scatter(self.SRF.brdf))
+
+    def _p(self):
+        # the values of the volume-scattering phase-function
+        return self._get_cached(
+            'p', [self.V._func] + self._angle_deps() + self._param_deps(),
+            lambda: self._evaluate_scatter(self.V.p))
+
+    def _evaluate_scatter(self, func):
+        # evaluate the brdf or the phase-function for the unique
+        # combinations of the angles and the values of param_dict
+        keys = list(self.param_dict.keys())
+        return self._evaluate_unique(
+            lambda t_0, t_ex, p_0, p_ex, *params: func(
+                t_0, t_ex, p_0, p_ex, param_dict=dict(zip(keys, params))),
+            [self.t_0, self.t_ex, self.p_0, self.p_ex] +
+            list(self.param_dict.values()))
+
+    def _scatter_derivatives(self, name, keys):
+        '''
+        evaluate the derivatives of the brdf (name = 'brdf') or the
+        phase-function (name = 'p') with respect to the provided keys of
+        param_dict (the function-value is obtained in the same pass and
+        stored in the evaluation-cache, see Scatter._get_diff_lambda())
+
+        Returns:
+        ---------
+        - : dict
+            the derivatives with respect to the keys
+        '''
+        S = self.SRF if name == 'brdf' else self.V
+        deps = [S._func] + self._angle_deps() + self._param_deps()
+
+        def evaluate():
+            func = S._get_diff_lambda(keys, self.param_dict.keys())
+            return self._evaluate_unique(
+                func, [self.t_0, self.t_ex, self.p_0, self.p_ex] +
+                list(self.param_dict.values()))
+
+        res = self._get_cached('d' + name, deps + [tuple(keys)], evaluate)
+        self._get_cached(name, deps, lambda: res[0])
+
+        return dict(zip(keys, res[1:]))
+
+    def _attenuation(self):
+        # the attenuation-factor exp(-tau/mu_0 - tau/mu_ex)
+        return self._geometry().attenuation
+
     def surface(self):
         """
         Numerical evaluation of the surface-contribution
@@ -935,14 +1461,9 @@ class RT1(object):
             given set of parameters
         """
         # bare soil contribution
-        I_bs = (self.I0 * self._mu_0
-                 * self.SRF.brdf(self.t_0, self.t_ex,
-                                 self.p_0, self.p_ex,
-                                 param_dict=self.param_dict))
+        I_bs = self.I0 * self._mu_0 * self._brdf()
 
-
-        Isurf = (np.exp(-(self.V.tau / self._mu_0) -
-                        (self.V.tau / self._mu_ex))) * I_bs
+        Isurf = self._attenuation() * I_bs
 
         return self.SRF.NormBRDF * ((1. - self.bsf) * Isurf + self.bsf * I_bs)
 
@@ -979,16 +1500,18 @@ class RT1(object):
                                  self.p_0, self.p_ex,
                                  param_dict=self.param_dict)
 
+        g = self._geometry()
+
         # vegetated soil contribution
         I_vegs_slope = (self.I0
-                        * np.exp(-(2*self.V.tau / self._mu_0))
-                        * (self._mu_0 * brdf_slope
-                           - (2 * self.V.tau / self._mu_0 + 1)
-                           * np.sin(self.t_0) * brdf_val))
+                        * g.exp2_0
+                        * (g.mu_0 * brdf_slope
+                           - (2 * self.V.tau * g.inv_mu_0 + 1)
+                           * g.sin_0 * brdf_val))
 
         # bare soil contribution
-        I_bs_slope = self.I0 * (self._mu_0 * brdf_slope
-                                - np.sin(self.t_0) * brdf_val)
+        I_bs_slope = self.I0 * (g.mu_0 * brdf_slope
+                                - g.sin_0 * brdf_val)
 
         I_slope = self.SRF.NormBRDF * (
                 (1. - self.bsf) * I_vegs_slope
@@ -998,14 +1521,15 @@ class RT1(object):
             return I_slope
         else:
             I_val = self.surface()
+            g = self._geometry()
             if sig0 is True and dB is False:
-                return 4. * np.pi * (self._mu_0 * I_slope
-                                     - np.sin(self.t_0) * I_val)
+                return 4. * np.pi * (g.mu_0 * I_slope
+                                     - g.sin_0 * I_val)
             elif sig0 is False and dB is True:
                 return 10./np.log(10) * I_slope / I_val
             elif sig0 is True and dB is True:
                 return 10./np.log(10) * (I_slope / I_val
-                                 - np.tan(self.t_0))
+                                 - g.tan_0)
 
     def surface_curv(self, dB=False, sig0=False):
         """
@@ -1046,20 +1570,22 @@ class RT1(object):
                                  self.p_0, self.p_ex,
                                  param_dict=self.param_dict)
 
+        g = self._geometry()
+
         # vegetated soil contribution
         I_vegs_curv = (self.I0
-                       * np.exp(-(2. * self.V.tau / self._mu_0)) * (
-                self._mu_0 * brdf_curv -
-                2. * np.sin(self.t_0) * brdf_slope * (
-                        2. * self.V.tau / self._mu_0 + 1.)
-                + (4. * self.V.tau**2 / self._mu_0**3
-                   * np.sin(self.t_0)**2
-                   - 2. * self.V.tau - self._mu_0) * brdf_val ))
+                       * g.exp2_0 * (
+                g.mu_0 * brdf_curv -
+                2. * g.sin_0 * brdf_slope * (
+                        2. * self.V.tau * g.inv_mu_0 + 1.)
+                + (4. * self.V.tau**2 * g.inv_mu_0**3
+                   * g.sin_0**2
+                   - 2. * self.V.tau - g.mu_0) * brdf_val ))
 
         # bare soil contribution
-        I_bs_curv = self.I0 * ( self._mu_0 * brdf_curv
-                                - 2. * np.sin(self.t_0) * brdf_slope
-                                - self._mu_0 * brdf_val )
+        I_bs_curv = self.I0 * ( g.mu_0 * brdf_curv
+                                - 2. * g.sin_0 * brdf_slope
+                                - g.mu_0 * brdf_val )
 
         I_curv = self.SRF.NormBRDF * (
                 (1. - self.bsf) * I_vegs_curv
@@ -1070,18 +1596,19 @@ class RT1(object):
         else:
             I_slope = self.surface_slope(dB=False, sig0=False)
             I_val = self.surface()
+            g = self._geometry()
             if sig0 is True and dB is False:
-                return 4. * np.pi * (self._mu_0 * I_curv
-                                     - 2. * np.sin(self.t_0)
+                return 4. * np.pi * (g.mu_0 * I_curv
+                                     - 2. * g.sin_0
                                      * I_slope
-                                     - self._mu_0 * I_val )
+                                     - g.mu_0 * I_val )
             elif sig0 is False and dB is True:
                 return 10./np.log(10) * (I_curv / I_val
                                  - I_slope**2 / I_val**2 )
             elif sig0 is True and dB is True:
                 return 10./np.log(10) * (I_curv / I_val
                                  - I_slope**2 / I_val**2
-                                 - self._mu_0**(-2))
+                                 - g.inv_mu_0**2)
 
     def volume(self):
         """
@@ -1094,12 +1621,8 @@ class RT1(object):
             Numerical value of the volume-contribution for the
             given set of parameters
         """
-        vol = ((self.I0 * self.V.omega *
-                 self._mu_0 / (self._mu_0 + self._mu_ex))
-                * (1. - np.exp(-(self.V.tau / self._mu_0) -
-                               (self.V.tau / self._mu_ex)))
-                * self.V.p(self.t_0, self.t_ex, self.p_0, self.p_ex,
-                            param_dict=self.param_dict))
+        vol = ((self.I0 * self.V.omega * self._geometry().mu_ratio)
+               * (1. - self._attenuation()) * self._p())
 
         return (1. - self.bsf) * vol
 
@@ -1138,26 +1661,29 @@ class RT1(object):
                          self.p_0, self.p_ex,
                          param_dict=self.param_dict)
 
+        g = self._geometry()
+
         # volume contribution
         I_slope = (1. - self.bsf) * self.I0 * self.V.omega / 2. * (
-                (np.exp(-(2 * self.V.tau / self._mu_0)) * 2 *
-                 self.V.tau * np.sin(self.t_0) / self._mu_0**2
+                (g.exp2_0 * 2 *
+                 self.V.tau * g.sin_0 * g.inv_mu_0**2
                  ) * p_val
-                 + (1. - np.exp(-(2*self.V.tau / self._mu_0))
+                 + (1. - g.exp2_0
                  ) * p_slope )
 
         if sig0 is False and dB is False:
             return I_slope
         else:
             I_val = self.volume()
+            g = self._geometry()
             if sig0 is True and dB is False:
-                return 4. * np.pi * (self._mu_0 * I_slope
-                                     - np.sin(self.t_0) * I_val)
+                return 4. * np.pi * (g.mu_0 * I_slope
+                                     - g.sin_0 * I_val)
             elif sig0 is False and dB is True:
                 return 10./np.log(10) * I_slope / I_val
             elif sig0 is True and dB is True:
                 return 10./np.log(10) * (I_slope / I_val
-                                 - np.tan(self.t_0))
+                                 - g.tan_0)
 
     def volume_curv(self, dB=False, sig0=False):
         """
@@ -1198,17 +1724,19 @@ class RT1(object):
                                  self.p_0, self.p_ex,
                                  param_dict=self.param_dict)
 
+        g = self._geometry()
+
         I_curv = (1. - self.bsf) * self.I0 * self.V.omega / 2. * (
-                np.exp(-(2 * self.V.tau / self._mu_0)) * (
-                        2 * self.V.tau / self._mu_0**3) * (
-                                np.sin(self.t_0)**2 + 1.
-                                - 2. * self.V.tau / self._mu_0
-                                * np.sin(self.t_0)**2) * p_val
-                        + (np.exp(-(2 * self.V.tau / self._mu_0)) *
-                           4. * self.V.tau / self._mu_0**2
-                           * np.sin(self.t_0)) * p_slope
+                g.exp2_0 * (
+                        2 * self.V.tau * g.inv_mu_0**3) * (
+                                g.sin_0**2 + 1.
+                                - 2. * self.V.tau * g.inv_mu_0
+                                * g.sin_0**2) * p_val
+                        + (g.exp2_0 *
+                           4. * self.V.tau * g.inv_mu_0**2
+                           * g.sin_0) * p_slope
                         + (1 -
-                           np.exp(-(2 * self.V.tau / self._mu_0))
+                           g.exp2_0
                            ) * p_curv )
 
 
@@ -1232,18 +1760,19 @@ class RT1(object):
         else:
             I_slope = self.volume_slope(dB=False, sig0=False)
             I_val = self.volume()
+            g = self._geometry()
             if sig0 is True and dB is False:
-                return 4. * np.pi * (self._mu_0 * I_curv
-                                     - 2. * np.sin(self.t_0)
+                return 4. * np.pi * (g.mu_0 * I_curv
+                                     - 2. * g.sin_0
                                      * I_slope
-                                     - self._mu_0 * I_val )
+                                     - g.mu_0 * I_val )
             elif sig0 is False and dB is True:
                 return 10./np.log(10) * (I_curv / I_val
                                  - I_slope**2 / I_val**2 )
             elif sig0 is True and dB is True:
                 return 10./np.log(10) * (I_curv / I_val
                                  - I_slope**2 / I_val**2
-                                 - self._mu_0**(-2))
+                                 - g.inv_mu_0**2)
 
     def tot_slope(self, sig0=False, dB=False):
         '''
@@ -1274,14 +1803,15 @@ class RT1(object):
             return I_slope
         else:
             I_val = (self.volume() + self.surface())
+            g = self._geometry()
             if sig0 is True and dB is False:
-                return 4. * np.pi * (self._mu_0 * I_slope
-                                     - np.sin(self.t_0) * I_val)
+                return 4. * np.pi * (g.mu_0 * I_slope
+                                     - g.sin_0 * I_val)
             elif sig0 is False and dB is True:
                 return 10./np.log(10) * I_slope / I_val
             elif sig0 is True and dB is True:
                 return 10./np.log(10) * (I_slope / I_val
-                                 - np.tan(self.t_0))
+                                 - g.tan_0)
 
     def tot_curv(self, sig0=False, dB=False):
         '''
@@ -1314,20 +1844,26 @@ class RT1(object):
             I_slope = (self.volume_slope(dB=False, sig0=False) +
                        self.surface_slope(dB=False, sig0=False))
             I_val = (self.volume() + self.surface())
+            g = self._geometry()
             if sig0 is True and dB is False:
-                return 4. * np.pi * (self._mu_0 * I_curv
-                                     - 2. * np.sin(self.t_0)
+                return 4. * np.pi * (g.mu_0 * I_curv
+                                     - 2. * g.sin_0
                                      * I_slope
-                                     - self._mu_0 * I_val )
+                                     - g.mu_0 * I_val )
             elif sig0 is False and dB is True:
                 return 10./np.log(10) * (I_curv / I_val
                                  - I_slope**2 / I_val**2 )
             elif sig0 is True and dB is True:
                 return 10./np.log(10) * (I_curv / I_val
                                  - I_slope**2 / I_val**2
-                                 - self._mu_0**(-2))
+                                 - g.inv_mu_0**2)
 
 
+    def _Fint_deps(self):
+        # the values that the interaction-integrals depend on
+        return ([self._fnevals, self.V.tau] + self._angle_deps() +
+                self._param_deps())
+
     def interaction(self):
         """
         Numerical evaluation of the interaction-contribution
@@ -1340,16 +1876,80 @@ class RT1(object):
             the given set of parameters
         """
 
-        Fint1 = self._calc_Fint(self._mu_0, self._mu_ex, self.p_0, self.p_ex)
-        Fint2 = self._calc_Fint(self._mu_ex, self._mu_0, self.p_ex, self.p_0)
+        def Fint():
+            Fint1, Fint2 = self._calc_Fint_pair()
+            g = self._geometry()
+            return g.exp_ex * Fint1 + g.exp_0 * Fint2
+
+        # the interaction-integrals do not depend on omega and NormBRDF
+        Fint = self._get_cached('Fint', self._Fint_deps(), Fint)
 
-        Iint = (self.I0 * self._mu_0 * self.V.omega *
-                (np.exp(-self.V.tau / self._mu_ex) * Fint1 +
-                 np.exp(-self.V.tau / self._mu_0) * Fint2))
+        Iint = self.I0 * self._mu_0 * self.V.omega * Fint
 
         return self.SRF.NormBRDF * (1. - self.bsf) * Iint
 
-    def _calc_Fint(self, mu1, mu2, phi1, phi2):
+    def _calc_Fint_pair(self, derivatives=None):
+        '''
+        evaluate F_int(mu_0, mu_ex, p_0, p_ex) and
+        F_int(mu_ex, mu_0, p_ex, p_0) as required for the
+        interaction-contribution
+
+        If the two results are identical (i.e. for equal incidence- and
+        exit-angles in the monostatic geometry, where the fn-coefficients
+        only depend on theta_0), F_int is evaluated only once. Otherwise
+        both terms are evaluated in a single call of _calc_Fint() (such
+        that the fn-coefficients are evaluated in a single pass and the
+        exponential integrals of tau are shared) unless the number of
+        samples exceeds the chunksize of _calc_Fint().
+
+        Parameters
+        -----------
+        derivatives : list(str), optional (default = None)
+                      see _calc_Fint()
+
+        Returns
+        --------
+        Fint1, Fint2 : array_like(float) or tuple
+                       the two F_int terms (or tuples (S, dS) if
+                       derivatives is provided, see _calc_Fint())
+        '''
+        mu_0, mu_ex = self._mu_0, self._mu_ex
+
+        if np.array_equal(mu_0, mu_ex) and (
+                self.geometry == 'mono' or
+                np.array_equal(self.p_0, self.p_ex)):
+            res = self._calc_Fint(mu_0, mu_ex, self.p_0, self.p_ex,
+                                  derivatives, name='fn1')
+            return res, res
+
+        shape = np.broadcast(mu_0, mu_ex, self.p_0, self.p_ex,
+                             self.V.tau, *self.param_dict.values()).shape
+
+        if 2 * np.prod(shape) > self._Fint_chunksize:
+            # (the joint evaluation would be split into chunks anyway)
+            return (self._calc_Fint(mu_0, mu_ex, self.p_0, self.p_ex,
+                                    derivatives, name='fn1'),
+                    self._calc_Fint(mu_ex, mu_0, self.p_ex, self.p_0,
+                                    derivatives, name='fn2'))
+
+        def stack(a, b):
+            return np.stack([np.broadcast_to(a, shape),
+                             np.broadcast_to(b, shape)])
+
+        res = self._calc_Fint(stack(mu_0, mu_ex), stack(mu_ex, mu_0),
+                              stack(self.p_0, self.p_ex),
+                              stack(self.p_ex, self.p_0),
+                              derivatives, name='fn12')
+
+        if derivatives is None:
+            return res[0], res[1]
+
+        S, dS = res
+        return ((S[0], dict((key, val[0]) for key, val in dS.items())),
+                (S[1], dict((key, val[1]) for key, val in dS.items())))
+
+    def _calc_Fint(self, mu1, mu2, phi1, phi2, derivatives=None,
+                   name=None):
         """
         Numerical evaluation of the F_int() function used in the definition
         of the interaction-contribution
@@ -1365,43 +1965,273 @@ class RT1(object):
                first azimuth-angle argument in radians
         phi2 : array_like(float)
                second azimuth-angle argument in radians
+        derivatives : list(str), optional (default = None)
+                      a list of parameter-names ('tau' or keys of
+                      param_dict) for which the derivatives of F_int
+                      should be evaluated as well
+        name : str, optional (default = None)
+               if provided, the evaluated fn-coefficients are stored in the
+               evaluation-cache with the given name (see eval_cache)
+               (e.g. to re-use them for the evaluation of the jacobian).
+               To limit the memory-consumption, the fn-coefficients are
+               only cached if they are evaluated in a single chunk
+               (i.e. for at most _Fint_chunksize samples)
 
         Returns
         --------
         S : array_like(float)
             Numerical value of F_int for the given set of parameters
+        dS : dict
+             the derivatives of F_int with respect to the parameters
+             provided in derivatives (only returned if derivatives
+             is not None)
         """
 
-        # evaluate fn-coefficients
-        if self.lambda_backend == 'symengine':
-            args = np.broadcast_arrays(np.arccos(mu1), phi1, np.arccos(mu2),
-                                       phi2, *self.param_dict.values())
-            # to correct for 0 dimensional arrays if a fn-coefficient
-            # is identical to 0 (in a symbolic manner)
-            fn = np.broadcast_arrays(*self._fnevals(args))
+        tau = np.asarray(self.V.tau)
+        args = np.broadcast_arrays(mu1, mu2, phi1, phi2, tau,
+                                   *self.param_dict.values())
+        shape = args[0].shape
+        S = np.empty(shape)
+
+        # ensure that there is an axis that can be split into chunks
+        shape1 = shape if len(shape) > 0 else (1,)
+        S1 = S.reshape(shape1)
+        args = [np.broadcast_to(i, shape1) for i in args]
+        expn_tau = None
+
+        if derivatives is not None:
+            dS = dict((key, np.empty(shape)) for key in derivatives)
+            dS1 = dict((key, val.reshape(shape1)) for key, val in dS.items())
+            dfnevals = dict((key, self._get_dfnevals(key))
+                            for key in derivatives if key != 'tau')
+        else:
+            dS1 = dict()
+
+        # the fn-coefficients and the series-terms are evaluated in chunks
+        # along the first axis to limit the peak memory-consumption
+        rowsize = int(np.prod(shape1[1:]))
+        nrows = max(1, int(self._Fint_chunksize // max(rowsize, 1)))
+
+        if name is not None and shape1[0] > nrows:
+            # (a previously cached value is no longer valid)
+            self._drop_cached(name)
+            name = None
+
+        for i in range(0, shape1[0], nrows):
+            sl = slice(i, i + nrows)
+            mu1_i, mu2_i, phi1_i, phi2_i, tau_i = [j[sl] for j in args[:5]]
+            params_i = [j[sl] for j in args[5:]]
+
+            fnargs = [np.arccos(mu1_i), phi1_i,
+                      np.arccos(mu2_i), phi2_i] + params_i
+
+            def evaluate_fn():
+                # evaluate fn-coefficients
+                if self.lambda_backend == 'symengine':
+                    fn = self._evaluate_unique(
+                        lambda *args: self._fnevals(list(args)), fnargs)
+                else:
+                    fn = self._evaluate_unique(self._fnevals, fnargs)
+                # to correct for 0 dimensional arrays if a fn-coefficient
+                # is identical to 0 (in a symbolic manner)
+                return np.broadcast_arrays(mu1_i, *fn)[1:]
+
+            if name is None:
+                fn = evaluate_fn()
+            else:
+                # the fn-coefficients do not depend on tau
+                fn = self._get_cached(
+                    name,
+                    [self._fnevals, mu1_i, mu2_i, phi1_i, phi2_i] + params_i,
+                    evaluate_fn)
+
+            if expn_tau is None:
+                nmax = len(fn)
+                # the exponential integrals E_(k+1)(tau) only depend on tau
+                # and are therefore evaluated only once for all k
+                # (on the shape of tau)
+                k = np.arange(1., nmax + 1.).reshape(
+                    (-1,) + (1,) * len(shape1))
+                expn_tau = np.broadcast_to(expn(k + 1., tau),
+                                           (nmax,) + shape1)
+                if 'tau' in dS1:
+                    # dE_(k+1)(tau)/dtau = - E_k(tau)
+                    dexpn_tau = np.broadcast_to(-expn(k, tau),
+                                                (nmax,) + shape1)
+
+            exp_i = np.exp(-tau_i / mu1_i)
+            log_i = np.log(mu1_i / (1. - mu1_i))
+            expi_i = expi(tau_i / mu1_i - tau_i)
+            hlp1 = exp_i * log_i - expi(-tau_i) + exp_i * expi_i
+
+            # powers of mu1 for n = 1 ... nmax
+            mu = np.cumprod(np.broadcast_to(mu1_i, (nmax,) + mu1_i.shape),
+                            axis=0)
+
+            # the sums over k for all n are obtained as prefix-sums
+            S2 = np.cumsum((expn_tau[:, sl] - exp_i / k) / mu, axis=0)
+
+            S1[sl] = np.sum(fn * mu * (S2 + hlp1), axis=0)
+
+            for key, dS1_key in dS1.items():
+                if key == 'tau':
+                    # (the terms exp(-tau) / tau of the derivatives of
+                    # expi(-tau) and exp_i * expi_i cancel)
+                    dhlp1 = - exp_i / mu1_i * (log_i + expi_i)
+                    dS2 = np.cumsum((dexpn_tau[:, sl] + exp_i / (k * mu1_i))
+                                    / mu, axis=0)
+                    dS1_key[sl] = np.sum(fn * mu * (dS2 + dhlp1), axis=0)
+                else:
+                    dfn = self._evaluate_unique(dfnevals[key], fnargs)
+                    dfn = np.broadcast_arrays(mu1_i, *dfn)[1:]
+                    dS1_key[sl] = np.sum(dfn * mu * (S2 + hlp1), axis=0)
+
+        if derivatives is not None:
+            return S, dS
+
+        return S
+
+    def _get_dfnevals(self, key):
+        '''
+        get a function that evaluates the derivatives of the
+        fn-coefficients with respect to the provided key of param_dict
+        (the call-signature is equal to the signature of _fnevals for
+        lambda_backends other than 'symengine')
+
+        If the fn-coefficients are available, the symbolic derivatives are
+        compiled (and stored in the fn_cache if used). For
+        lambda_backend = 'tensor' the derivatives of the polynomials are
+        evaluated directly from the coefficient-matrix. Otherwise the
+        derivatives are obtained by central differences of _fnevals.
+        (to avoid the evaluation of the fn-coefficients, e.g. if _fnevals
+        has been provided as input or if lambda_backend is 'numeric')
+        '''
+        try:
+            return self._dfnevals[key]
+        except KeyError:
+            pass
+
+        # use the fn-coefficients only if they are already available
+        try:
+            fn = self.__fn
+        except AttributeError:
+            fn = self.fn_input
+        if (self.lambda_backend == 'numeric' or
+                not isinstance(fn, (list, tuple))):
+            fn = None
+
+        dfnevals = None
+        if self.lambda_backend == 'tensor' and isinstance(self._fnevals,
+                                                          TensorFnevals):
+            dfnevals = self._fnevals.diff(key)
+
+        entry = self._get_fn_cache_entry()
+        if dfnevals is not None:
+            self.prv(2, 'using the polynomial-tensor derivatives of the ' +
+                     'fn-coefficients with respect to ' + key)
+        elif entry is not None and 'dsource_' + key in entry:
+            self.prv(2, 'using derivatives of the fn-coefficients for ' +
+                     key + ' from fn_cache')
+            dfnevals = SourceFnevals(entry['dsource_' + key])
+        elif fn is not None:
+            self.prv(2, 'generation of the derivatives of the ' +
+                     'fn-coefficients with respect to ' + key)
+            variables = sp.var(('theta_0', 'phi_0', 'theta_ex', 'phi_ex') +
+                               tuple(map(str, self.param_dict.keys())))
+            try:
+                # symengine is considerably faster for the differentiation
+                # of the (long) fn-coefficients
+                import symengine
+                dfn = [symengine.diff(symengine.sympify(i),
+                                      symengine.Symbol(key)) for i in fn]
+                source = fn_source(dfn, variables, cse='symengine')
+            except ImportError:
+                dfn = [sp.diff(sp.sympify(i), sp.Symbol(key)) for i in fn]
+                source = fn_source(dfn, variables)
+            dfnevals = SourceFnevals(source)
+            self._update_fn_cache_entry(**{'dsource_' + key: source})
         else:
-            args = np.broadcast_arrays(np.arccos(mu1), phi1, np.arccos(mu2),
-                                       phi2, *self.param_dict.values())
-            # to correct for 0 dimensional arrays if a fn-coefficient
-            # is identical to 0 (in a symbolic manner)
-            fn = np.broadcast_arrays(*self._fnevals(*args))
+            dfnevals = _CentralDifference(
+                self._fnevals, 4 + list(self.param_dict.keys()).index(key),
+                self.lambda_backend == 'symengine')
 
-        nmax = len(fn)
+        self._dfnevals[key] = dfnevals
+        return dfnevals
 
-        hlp1 = (np.exp(-self.V.tau / mu1) * np.log(mu1 / (1. - mu1))
-                - expi(-self.V.tau) + np.exp(-self.V.tau / mu1)
-                * expi(self.V.tau / mu1 - self.V.tau))
+    def _dinteraction(self, param_list):
+        """
+        Numerical evaluation of the derivatives of the
+        interaction-contribution with respect to the parameters
 
-        S2 = np.array([np.sum(mu1 ** (-k) * (expn(k + 1., self.V.tau) -
-                                             np.exp(-self.V.tau / mu1) / k)
-                              for k in range(1, (n + 1) + 1))
-                       for n in range(nmax)])
+        Parameters
+        -----------
+        param_list : list(str)
+                     the names of the parameters ('omega', 'tau',
+                     'NormBRDF', 'bsf' or keys of param_dict)
 
-        mu = np.array([mu1 ** (n + 1) for n in range(nmax)])
+        Returns
+        --------
+        dIint : list(array_like(float))
+                Numerical values of dIint/dkey for each key of param_list
+        """
 
-        S = np.sum(fn * mu * (S2 + hlp1), axis=0)
+        keys = [key for key in param_list
+                if key == 'tau' or key in self.param_dict]
 
-        return S
+        (Fint1, dFint1), (Fint2, dFint2) = self._calc_Fint_pair(keys)
+
+        g = self._geometry()
+        exp_ex, exp_0 = g.exp_ex, g.exp_0
+        Fint = exp_ex * Fint1 + exp_0 * Fint2
+        # store the interaction-integrals (e.g. for the normalization of
+        # the jacobian in dB)
+        self._get_cached('Fint', self._Fint_deps(), lambda: Fint)
+
+        I_0 = self.I0 * self._mu_0
+
+        dIint = []
+        for key in param_list:
+            if key == 'omega':
+                dIint += [self.SRF.NormBRDF * (1. - self.bsf) * I_0 * Fint]
+            elif key == 'NormBRDF':
+                dIint += [self.V.omega * (1. - self.bsf) * I_0 * Fint]
+            elif key == 'bsf':
+                dIint += [- self.SRF.NormBRDF * self.V.omega * I_0 * Fint]
+            elif key in dFint1:
+                dFint = exp_ex * dFint1[key] + exp_0 * dFint2[key]
+                if key == 'tau':
+                    dFint = dFint - (exp_ex * Fint1 * g.inv_mu_ex +
+                                     exp_0 * Fint2 * g.inv_mu_0)
+
+                dIint += [self.SRF.NormBRDF * (1. - self.bsf) *
+                          self.V.omega * I_0 * dFint]
+            else:
+                dIint += [0.]
+
+        return dIint
+
+    def _dinteraction_valid(self, param_list):
+        # evaluate the derivatives of the interaction-contribution only
+        # for tau > 0. (see calc())
+        if self.V.tau.shape == (1,):
+            if self.V.tau > 0.:
+                return self._dinteraction(param_list)
+            else:
+                return [0. for key in param_list]
+
+        mask = self.V.tau > 0.
+        if np.all(mask):
+            return self._dinteraction(param_list)
+
+        valid_index = np.where(mask)[0]
+        dIint = [np.zeros_like(self.t_0) for key in param_list]
+        if len(valid_index) > 0:
+            R_valid = self._select_rows(valid_index)
+            for dI, dI_valid in zip(dIint,
+                                    R_valid._dinteraction(param_list)):
+                dI[valid_index] = dI_valid
+
+        return dIint
 
     def _dvolume_dtau(self):
         """
@@ -1413,13 +2243,11 @@ class RT1(object):
                Numerical value of dIvol/dtau for the given set of parameters
         """
 
+        g = self._geometry()
         dvdt = (self.I0 * self.V.omega
-                * (self._mu_0 / (self._mu_0 + self._mu_ex))
-                * ((1. / self._mu_0 + 1. / self._mu_ex**(-1))
-                   * np.exp(- self.V.tau / self._mu_0 -
-                            self.V.tau / self._mu_ex))
-                * self.V.p(self.t_0, self.t_ex, self.p_0, self.p_ex,
-                            self.param_dict))
+                * g.mu_ratio
+                * (g.inv_mu_sum * self._attenuation())
+                * self._p())
 
         return (1. - self.bsf) * dvdt
 
@@ -1433,12 +2261,8 @@ class RT1(object):
                Numerical value of dIvol/domega for the given set of parameters
         """
 
-        dvdo = ((self.I0 * self._mu_0 / (self._mu_0 + self._mu_ex)) *
-                (
-                1. - np.exp(-(self.V.tau / self._mu_0) -
-                            (self.V.tau / self._mu_ex))
-                ) * self.V.p(self.t_0, self.t_ex, self.p_0, self.p_ex,
-                              self.param_dict))
+        dvdo = ((self.I0 * self._geometry().mu_ratio) *
+                (1. - self._attenuation()) * self._p())
 
         return (1. - self.bsf) * dvdo
 
@@ -1452,12 +2276,8 @@ class RT1(object):
                Numerical value of dIvol/domega for the given set of parameters
         """
 
-        vol = ((self.I0 * self.V.omega *
-                 self._mu_0 / (self._mu_0 + self._mu_ex))
-                * (1. - np.exp(-(self.V.tau / self._mu_0) -
-                               (self.V.tau / self._mu_ex)))
-                * self.V.p(self.t_0, self.t_ex, self.p_0, self.p_ex,
-                            param_dict=self.param_dict))
+        vol = ((self.I0 * self.V.omega * self._geometry().mu_ratio)
+               * (1. - self._attenuation()) * self._p())
 
         return  - vol
 
@@ -1487,12 +2307,10 @@ class RT1(object):
         """
 
         dsdt = (self.I0
-                * (- 1. / self._mu_0 - 1. / self._mu_ex)
-                * np.exp(- self.V.tau / self._mu_0
-                         - self.V.tau / self._mu_ex)
+                * (- self._geometry().inv_mu_sum)
+                * self._attenuation()
                 * self._mu_0
-                * self.SRF.brdf(self.t_0, self.t_ex, self.p_0, self.p_ex,
-                                self.param_dict))
+                * self._brdf())
 
         # Incorporate BRDF-normalization factor
         dsdt = self.SRF.NormBRDF * (1. - self.bsf) * dsdt
@@ -1523,15 +2341,9 @@ class RT1(object):
                Numerical value of dIsurf/dR for the given set of parameters
         """
 
-        I_bs = (self.I0 * self._mu_0
-                 * self.SRF.brdf(self.t_0, self.t_ex,
-                                 self.p_0, self.p_ex,
-                                 param_dict=self.param_dict))
-
+        I_bs = self.I0 * self._mu_0 * self._brdf()
 
-        Isurf = (np.exp(-(self.V.tau / self._mu_0) -
-                                  (self.V.tau / self._mu_ex))
-                 ) * I_bs
+        Isurf = self._attenuation() * I_bs
 
         return ((1. - self.bsf) * Isurf + self.bsf * I_bs)
 
@@ -1547,82 +2359,55 @@ class RT1(object):
             given set of parameters
         """
         # bare soil contribution
-        I_bs = (self.I0 * self._mu_0
-                 * self.SRF.brdf(self.t_0, self.t_ex,
-                                 self.p_0, self.p_ex,
-                                 param_dict=self.param_dict))
-
+        I_bs = self.I0 * self._mu_0 * self._brdf()
 
-        Isurf = (np.exp(-(self.V.tau / self._mu_0) -
-                                  (self.V.tau / self._mu_ex))
-                 ) * I_bs * np.ones_like(self.t_0)
+        Isurf = self._attenuation() * I_bs * np.ones_like(self.t_0)
 
         return self.SRF.NormBRDF * (I_bs - Isurf)
 
 
     # define functions that evaluate the derivatives with
     # respect to the defined parameters
-    def _d_surface_ddummy(self, key):
+    def _d_surface_ddummy(self, key, dbrdf=None):
         '''
-        Generation of a function that evaluates the derivative of the
-        surface-contribution with respect to the provided key
+        Numerical evaluation of the derivative of the surface-contribution
+        with respect to the provided key
 
         Parameters:
         ------------
         key : string
-
+              the name of the parameter
+        dbrdf : array_like(float) (default = None)
+                the derivative of the brdf with respect to key
+                (if None, it is evaluated via _scatter_derivatives())
 
         Returns:
         --------
         - : array_like(float)
             Numerical value of dIsurf/dkey for the given set of parameters
         '''
-        theta_0 = sp.Symbol('theta_0')
-        theta_ex = sp.Symbol('theta_ex')
-        phi_0 = sp.Symbol('phi_0')
-        phi_ex = sp.Symbol('phi_ex')
-
-        args = (theta_0, theta_ex, phi_0, phi_ex) + tuple(
-            self.param_dict.keys())
-
-        dummyd = sp.lambdify(args,
-                             sp.diff(self.SRF._func, sp.Symbol(key)),
-                             modules=["numpy", "sympy"])
-
-        dI_bs = (self.I0 * self._mu_0
-                 * dummyd(self.t_0, self.t_ex,
-                                 self.p_0, self.p_ex,
-                                 **self.param_dict))
+        if dbrdf is None:
+            dbrdf = self._scatter_derivatives('brdf', [key])[key]
 
+        dI_bs = self.I0 * self._mu_0 * dbrdf
 
-        dI_s = (np.exp(-(self.V.tau / self._mu_0) -
-                                  (self.V.tau / self._mu_ex))) * dI_bs
+        dI_s = self._attenuation() * dI_bs
 
         return self.SRF.NormBRDF * ((1. - self.bsf) * dI_s + self.bsf * dI_bs)
 
-    def _d_volume_ddummy(self, key):
-        theta_0 = sp.Symbol('theta_0')
-        theta_ex = sp.Symbol('theta_ex')
-        phi_0 = sp.Symbol('phi_0')
-        phi_ex = sp.Symbol('phi_ex')
-
-        args = (theta_0, theta_ex, phi_0, phi_ex) + tuple(
-            self.param_dict.keys())
-
-        dummyd = sp.lambdify(args,
-                             sp.diff(self.V._func, sp.Symbol(key)),
-                             modules=["numpy", "sympy"])
+    def _d_volume_ddummy(self, key, dp=None):
+        # (see _d_surface_ddummy())
+        if dp is None:
+            dp = self._scatter_derivatives('p', [key])[key]
 
         dIvol = (self.I0 * self.V.omega
-                 * self._mu_0 / (self._mu_0 + self._mu_ex)
-                 * (1. - np.exp(-(self.V.tau / self._mu_0) -
-                                (self.V.tau / self._mu_ex)))
-                 * dummyd(self.t_0, self.t_ex, self.p_0, self.p_ex,
-                          **self.param_dict))
+                 * self._geometry().mu_ratio
+                 * (1. - self._attenuation()) * dp)
         return (1. - self.bsf) * dIvol
 
     def jacobian(self, dB=False, sig0=False,
-                 param_list=['omega', 'tau', 'NormBRDF']):
+                 param_list=['omega', 'tau', 'NormBRDF'], workers=None,
+                 chunksize=None):
         '''
         Returns the jacobian of the total backscatter with respect
         to the parameters provided in param_list.
@@ -1631,9 +2416,10 @@ class RT1(object):
         The jacobian can be evaluated for measurements in linear or dB
         units, and for either intensity- or sigma_0 values.
 
-        Note:
-            The contribution of the interaction-term is currently
-            not considered in the calculation of the jacobian!
+        If int_Q is True, the contribution of the interaction-term is
+        considered as well. (the derivatives of the fn-coefficients with
+        respect to the keys of param_dict are obtained as described in
+        _get_dfnevals())
 
         Parameters:
         -------------
@@ -1659,6 +2445,10 @@ class RT1(object):
                      possible values are: 'omega', 'tau' 'NormBRDF' and
                      any string corresponding to a sympy.Symbol used in the
                      definition of V or SRF
+        workers, chunksize : int (default = None)
+                             the number of threads and the number of samples
+                             that are evaluated at once by each thread
+                             (see calc())
 
         Returns:
         ---------
@@ -1667,34 +2457,344 @@ class RT1(object):
               omega, tau and NormBRDF
         '''
 
+        if workers is not None:
+            return self._evaluate_chunks(
+                lambda R: R.jacobian(dB=dB, sig0=sig0, param_list=param_list),
+                workers, chunksize)
+
+        if self._eval_cache is None:
+            # use a temporary evaluation-cache to share the intermediate
+            # results (brdf, p, attenuation, ...) of all derivatives and
+            # the model-value required for the normalization
+            R = self._copy()
+            R._eval_cache = _EvalCache()
+            R._geom = self._geom
+            return R.jacobian(dB=dB, sig0=sig0, param_list=param_list)
+
+        # evaluate the derivatives of the brdf and the phase-function with
+        # respect to all keys of param_dict in a single pass
+        keys = [key for key in param_list if key in self.param_dict]
+        if len(keys) > 0:
+            dbrdf = self._scatter_derivatives('brdf', keys)
+            dp = self._scatter_derivatives('p', keys)
+
+        if self.int_Q is True:
+            dIint = self._dinteraction_valid(param_list)
+        else:
+            dIint = [0. for key in param_list]
+
         if sig0 is True and dB is False:
-            norm = 4. * np.pi * np.cos(self.t_0)
+            norm = 4. * np.pi * self._mu_0
         elif dB is True:
-            norm = 10. / (np.log(10.) * (self.surface()
-                                         + self.volume()))
+            norm = 10. / (np.log(10.) * self.calc()[0])
         else:
             norm = 1.
 
         jac = []
-        for key in param_list:
+        for key, dIint_key in zip(param_list, dIint):
 
             if key == 'omega':
                 jac += [(self._dsurface_domega() +
-                                    self._dvolume_domega()) * norm]
+                         self._dvolume_domega() + dIint_key) * norm]
             elif key == 'tau':
                 jac += [(self._dsurface_dtau() +
-                                  self._dvolume_dtau()) * norm]
+                         self._dvolume_dtau() + dIint_key) * norm]
             elif key == 'NormBRDF':
                 jac += [(self._dsurface_dR() +
-                                       self._dvolume_dR()) * norm]
+                         self._dvolume_dR() + dIint_key) * norm]
             elif key == 'bsf':
                 jac += [(self._dsurface_dbsf() +
-                             self._dvolume_dbsf()) * norm]
+                         self._dvolume_dbsf() + dIint_key) * norm]
             elif key in self.param_dict:
-                jac += [(self._d_surface_ddummy(key) +
-                             self._d_volume_ddummy(key)) * norm]
+                jac += [(self._d_surface_ddummy(key, dbrdf[key]) +
+                         self._d_volume_ddummy(key, dp[key]) +
+                         dIint_key) * norm]
             else:
                 assert False, 'error in jacobian calculation... ' + str(key) \
                               + ' is not in param_dict'
 
         return jac
+
+
+class _EvalCache(object):
+    '''
+    a cache of intermediate results of the model-evaluation
+    (see RT1._get_cached()). The cached values are not pickled.
+
+    The chunks of rows evaluated by a thread-pool use separate caches
+    (see RT1._evaluate_chunks()) which are stored in the list "chunks".
+    '''
+
+    def __init__(self):
+        self.entries = dict()
+        self.hits = 0
+        self.misses = 0
+        self.chunks = []
+        self.lock = threading.Lock()
+
+    def get_chunks(self, n):
+        # get the caches for n chunks of rows (the caches are re-generated
+        # if the number of chunks changes to avoid keeping stale entries)
+        with self.lock:
+            if len(self.chunks) != n:
+                self.chunks = [_EvalCache() for i in range(n)]
+            return self.chunks
+
+    def info(self):
+        # the number of cache-hits and misses (including the chunks)
+        hits, misses = self.hits, self.misses
+        for i in self.chunks:
+            chunk_hits, chunk_misses = i.info()
+            hits += chunk_hits
+            misses += chunk_misses
+        return hits, misses
+
+    def __getstate__(self):
+        # locks are not pickleable
+        state = self.__dict__.copy()
+        state['entries'] = dict()
+        state['chunks'] = []
+        state.pop('lock', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+
+class _Geometry(object):
+    '''
+    the (lazily evaluated) angle- and attenuation-terms of the
+    model-evaluation (cosines, sines, reciprocals and attenuation-factors)
+    that are shared by all methods of an RT1-object (see RT1._geometry())
+
+    The terms are discarded by the setter-functions of the angles (see
+    reset()) and the terms that depend on tau are discarded if a new
+    tau-array is assigned (the setter of V.tau always generates a new
+    array). The arrays are not compared, and therefore in-place
+    modifications of the arrays are only detected if the modified arrays
+    are assigned again (e.g. R.t_0 = R.t_0).
+    '''
+
+    # the terms that depend on tau
+    _tau_terms = ['exp_0', 'exp_ex', 'exp2_0', 'attenuation']
+
+    def __init__(self):
+        self.t_0 = None
+        self.t_ex = None
+        self.tau = None
+        self.values = dict()
+
+    def __getstate__(self):
+        return dict(t_0=None, t_ex=None, tau=None, values=dict())
+
+    def reset(self):
+        # discard all terms (called if the angles are changed)
+        self.values = dict()
+
+    def update(self, t_0, t_ex, tau):
+        # discard the terms that depend on tau if tau has been changed
+        if tau is not self.tau:
+            for key in self._tau_terms:
+                self.values.pop(key, None)
+        self.t_0, self.t_ex, self.tau = t_0, t_ex, tau
+        return self
+
+    def _get(self, name, func):
+        try:
+            return self.values[name]
+        except KeyError:
+            val = self.values[name] = func()
+            return val
+
+    # cosines, sines and reciprocals of the angles
+    mu_0 = property(lambda self: self._get(
+        'mu_0', lambda: np.cos(self.t_0)))
+    mu_ex = property(lambda self: self._get(
+        'mu_ex', lambda: np.cos(self.t_ex)))
+    sin_0 = property(lambda self: self._get(
+        'sin_0', lambda: np.sin(self.t_0)))
+    tan_0 = property(lambda self: self._get(
+        'tan_0', lambda: self.sin_0 / self.mu_0))
+    inv_mu_0 = property(lambda self: self._get(
+        'inv_mu_0', lambda: 1. / self.mu_0))
+    inv_mu_ex = property(lambda self: self._get(
+        'inv_mu_ex', lambda: 1. / self.mu_ex))
+    # 1/mu_0 + 1/mu_ex
+    inv_mu_sum = property(lambda self: self._get(
+        'inv_mu_sum', lambda: self.inv_mu_0 + self.inv_mu_ex))
+    # mu_0 / (mu_0 + mu_ex)
+    mu_ratio = property(lambda self: self._get(
+        'mu_ratio', lambda: self.mu_0 / (self.mu_0 + self.mu_ex)))
+
+    # attenuation-factors
+    exp_0 = property(lambda self: self._get(
+        'exp_0', lambda: np.exp(-self.tau * self.inv_mu_0)))
+    exp_ex = property(lambda self: self._get(
+        'exp_ex', lambda: np.exp(-self.tau * self.inv_mu_ex)))
+    # exp(-2 tau / mu_0) (used for the monostatic slopes and curvatures)
+    exp2_0 = property(lambda self: self._get(
+        'exp2_0', lambda: self.exp_0 ** 2))
+    # exp(-tau / mu_0 - tau / mu_ex)
+    attenuation = property(lambda self: self._get(
+        'attenuation', lambda: self.exp_0 * self.exp_ex))
+
+
+class _CentralDifference(object):
+    '''
+    evaluate the derivatives of the fn-coefficients with respect to one
+    of the parameters by central differences of the _fnevals function
+
+    Parameters:
+    ------------
+    fnevals : callable
+              the _fnevals function
+    index : int
+            the index of the argument of the parameter
+    list_input : bool
+                 indicator if fnevals expects a single list of arguments
+                 (i.e. for lambda_backend = 'symengine')
+    '''
+
+    def __init__(self, fnevals, index, list_input=False):
+        self.fnevals = fnevals
+        self.index = index
+        self.list_input = list_input
+
+    def _eval(self, args):
+        if self.list_input:
+            return self.fnevals(args)
+        return self.fnevals(*args)
+
+    def __call__(self, *args):
+        args = list(np.broadcast_arrays(*args))
+        val = args[self.index]
+        h = np.finfo(float).eps ** (1. / 3.) * np.maximum(1., np.abs(val))
+
+        args[self.index] = val + h
+        fn_p = np.broadcast_arrays(val, *self._eval(args))[1:]
+        args[self.index] = val - h
+        fn_m = np.broadcast_arrays(val, *self._eval(args))[1:]
+
+        return [(i - j) / (2. * h) for i, j in zip(fn_p, fn_m)]
+
+
+def _unique_combinations(args, maxunique):
+    '''
+    find the unique combinations of the values of the provided 1D arrays
+
+    The unique combinations are identified by successively combining the
+    indices of the unique values of each array into a single integer
+    (which is considerably faster than searching for unique rows).
+
+    Parameters:
+    ------------
+    args : list(array_like)
+           1D arrays of equal length
+    maxunique : float
+                the search is stopped as soon as the number of unique
+                combinations exceeds maxunique
+
+    Returns:
+    ---------
+    first : array_like(int)
+            the index of the first occurrence of each unique combination
+    inverse : array_like(int)
+              the index of the unique combination of each sample
+    (None is returned if the number of unique combinations
+    exceeds maxunique)
+    '''
+    inverse = np.zeros(len(args[0]), dtype=np.int64)
+    first = np.zeros(1, dtype=np.int64)
+    for arg in args:
+        if not any(arg.strides):
+            # (the array contains only a single value)
+            continue
+        vals, idx = np.unique(arg, return_inverse=True)
+        code = inverse * len(vals) + np.ravel(idx)
+        code, first, inverse = np.unique(code, return_index=True,
+                                         return_inverse=True)
+        inverse = np.ravel(inverse)
+        if len(first) > maxunique:
+            return None
+
+    return first, inverse
+
+
+def _deps_equal(deps1, deps2):
+    # check if the dependencies of a cached value are unchanged
+    if len(deps1) != len(deps2):
+        return False
+    for i, j in zip(deps1, deps2):
+        if i is j:
+            continue
+        if isinstance(i, np.ndarray) or isinstance(j, np.ndarray):
+            if np.shape(i) != np.shape(j) or not np.array_equal(i, j):
+                return False
+        elif not i == j:
+            return False
+    return True
+
+
+def _has_rows(val, shape):
+    # check if val provides a value for each row of an array with the
+    # given shape (i.e. if val has the same number of dimensions and the
+    # same length of the first axis)
+    return (np.size(val) > 1 and np.ndim(val) == len(shape)
+            and np.shape(val)[0] == shape[0])
+
+
+def iter_chunks(angles, params=None, rows=10000):
+    """
+    Generate chunks of (angles, params) from arrays of angles and parameters
+    as required by RT1.calc_stream()
+
+    Only the selected rows of the arrays are loaded into memory, and
+    therefore memory-mapped arrays (e.g. obtained via
+    np.load(..., mmap_mode='r')) can be used to process datasets that do
+    not fit into memory.
+
+    Parameters
+    ----------
+    angles : tuple(array_like)
+             the angles (t_0, t_ex, p_0, p_ex)
+    params : dict, optional (default = None)
+             a dictionary of parameter-values (see RT1.evaluate()).
+             The values of 'tau', 'omega', 'NormBRDF' and 'bsf' are split
+             into chunks if their first axis matches the number of rows of
+             t_0 (as for the corresponding attributes, e.g. V.tau). All
+             other arrays (and the angles) are split into chunks if they
+             have the same number of dimensions as t_0 and one value for
+             each row. All remaining values (e.g. arrays given for each
+             column of t_0) are used for all chunks.
+    rows : int (default = 10000)
+           the number of rows of each chunk
+
+    Yields
+    ------
+    angles, params : tuple, dict
+                     the angles and parameters of each chunk
+    """
+    if params is None:
+        params = dict()
+
+    shape = np.shape(angles[0])
+    nrows = shape[0]
+
+    def select(val, sl, key=None):
+        if key in ['tau', 'omega', 'NormBRDF', 'bsf']:
+            # (the setter-functions add an axis to the arrays, i.e. the
+            # first axis always refers to the rows of t_0)
+            has_rows = np.size(val) > 1 and np.shape(val)[0] == nrows
+        else:
+            has_rows = _has_rows(val, shape)
+
+        if has_rows:
+            return np.array(val[sl])
+        return val
+
+    for i in range(0, nrows, rows):
+        sl = slice(i, i + rows)
+        yield (tuple(select(val, sl) for val in angles),
+               dict((key, select(val, sl, key))
+                    for key, val in params.items()))
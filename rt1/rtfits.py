@@ -12,13 +12,272 @@ from matplotlib.ticker import MultipleLocator, FormatStrFormatter
 
 from scipy.optimize import least_squares
 from scipy.stats import linregress
-from scipy.sparse import vstack
-from scipy.sparse import csr_matrix, isspmatrix
+from scipy.sparse import csr_matrix, diags
 
 from .scatter import Scatter
 from .rt1 import RT1
 
 import copy  # used to copy objects
+from functools import partial
+
+
+class _ModelParams(object):
+    '''
+    Compiled representation of the (possibly symbolic) definitions of
+    tau, omega and NormBRDF of an RT1-object.
+
+    The functions to evaluate tau, omega and NormBRDF (and their derivatives)
+    are compiled only once, and the parameter-values are bound to (shallow)
+    copies of the RT1-object, i.e. neither the RT1-object nor the V and SRF
+    objects are altered.
+
+    Parameters:
+    ------------
+    V : RT1.volume class object
+        the volume-scattering phase-function
+    SRF : RT1.surface class object
+          the surface BRDF
+    '''
+
+    def __init__(self, V, SRF):
+        # the (symbolic) definitions of tau, omega and NormBRDF
+        self.exprs = {}
+        # the symbols used in the definitions
+        self.symbols = {}
+        # compiled functions to evaluate the definitions
+        self.funcs = {}
+        # compiled functions to evaluate the derivatives (generated lazily)
+        self.dfuncs = {}
+
+        for name, val in [['tau', V.tau], ['omega', V.omega],
+                          ['NormBRDF', SRF.NormBRDF]]:
+            try:
+                symbs = list(val[0].free_symbols)
+            except Exception:
+                continue
+            self.exprs[name] = val[0]
+            self.symbols[name] = symbs
+            self.funcs[name] = sp.lambdify(symbs, val[0], modules=['numpy'])
+
+        # the symbols that are only used in the definitions of tau, omega
+        # and NormBRDF (and must therefore not be passed to R.param_dict)
+        angset = {'phi_ex', 'phi_0', 'theta_0', 'theta_ex'}
+        vsymb = set(map(str, V._func.free_symbols)) - angset
+        srfsymb = set(map(str, SRF._func.free_symbols)) - angset
+
+        toNlist = set()
+        for symbs in self.symbols.values():
+            toNlist = toNlist | set(map(str, symbs))
+        self.exclude = ((toNlist - vsymb - srfsymb) |
+                        {'omega', 'tau', 'NormBRDF', 'bsf'})
+
+    def bind(self, R, res_dict):
+        '''
+        get a copy of the RT1-object that uses the provided parameter-values
+
+        Parameters:
+        ------------
+        R : RT1-object
+            the rt1-object for which the parameters shall be set
+        res_dict : dict
+                   a dictionary containing all parameter-values
+
+        Returns:
+        ---------
+        R : RT1-object
+            a (shallow) copy of the RT1-object with the parameter-values
+            of res_dict (V and SRF are shallow copies as well)
+        '''
+        # make sure that the _fnevals function is evaluated before copying
+        # (to avoid re-generating it for each copy)
+        R._fnevals
+
+        V = copy.copy(R.V)
+        SRF = copy.copy(R.SRF)
+
+        # update the numeric representations of omega, tau and NormBRDF
+        # based on the values for the used symbols provided in res_dict
+        for name, S in [['tau', V], ['omega', V], ['NormBRDF', SRF]]:
+            if name in self.funcs:
+                setattr(S, name, self.funcs[name](
+                    *[res_dict[str(i)] for i in self.symbols[name]]))
+            elif name in res_dict:
+                setattr(S, name, res_dict[name])
+
+        # (the copy uses separate angle- and attenuation-terms)
+        R = R._copy()
+        R.V = V
+        R.SRF = SRF
+
+        if 'bsf' in res_dict:
+            R.bsf = res_dict['bsf']
+
+        # remove all unwanted symbols that are NOT needed for evaluation
+        # of the fn-coefficients from res_dict to generate a dict that
+        # can be used as R.param_dict input. (i.e. "omega", "tau", "NormBRDF"
+        # "bsf" and the symbols used to define them must be removed)
+        # (and ensure that the keys of the dict are strings)
+        R.param_dict = dict([[str(key), np.expand_dims(val, 1)]
+                             for key, val in res_dict.items()
+                             if str(key) not in self.exclude])
+
+        return R
+
+    def d_inner(self, name, key, res_dict):
+        '''
+        evaluate the derivative of the definition of tau, omega or NormBRDF
+        with respect to the given parameter
+
+        Parameters:
+        ------------
+        name : str
+               'tau', 'omega' or 'NormBRDF'
+        key : str
+              the name of the parameter
+        res_dict : dict
+                   a dictionary containing all parameter-values
+
+        Returns:
+        ---------
+        - : array-like
+            the derivative d name / d key
+        '''
+        symbs = self.symbols[name]
+        if (name, key) not in self.dfuncs:
+            # use the symbol-object of the expression (to ensure that
+            # symbols with assumptions are differentiated correctly)
+            symb = [i for i in symbs if str(i) == key][0]
+            self.dfuncs[(name, key)] = sp.lambdify(
+                symbs, sp.diff(self.exprs[name], symb), modules=['numpy'])
+
+        return self.dfuncs[(name, key)](*[res_dict[str(i)] for i in symbs])
+
+
+class ParameterLayout(object):
+    '''
+    The mapping between the (concatenated) parameter-vector used by
+    scipy's least_squares function and the parameter-values of the
+    individual measurements.
+
+    The layout is generated once for each fit and is shared by the
+    evaluation of the residuals, the jacobian and the assembly of the
+    results.
+
+    Parameters:
+    ------------
+    order : list(str)
+            the names of the fitted parameters (in the order as they appear
+            in the parameter-vector)
+    param_dyn_dict : dict
+                     a dictionary containing a list of (unique) integers for
+                     each parameter, specifying which of the fitted values
+                     is used for each measurement (see Fits.monofit())
+    param_dict : dict (default = None)
+                 a dictionary containing the start-values of the parameters
+                 (used to set up the start-value vector)
+    bounds_dict : dict (default = None)
+                  a dictionary containing the boundaries of the parameters
+                  (used to set up the boundary vectors)
+    '''
+
+    def __init__(self, order, param_dyn_dict, param_dict=None,
+                 bounds_dict=None):
+        self.order = list(order)
+
+        # the slices of the parameter-vector that correspond to the
+        # individual parameters
+        self.slices = {}
+        # the index of the value of the parameter-vector that is used
+        # for each measurement and each parameter
+        # (this is also the column-index of the jacobian)
+        columns = []
+
+        count = 0
+        for key in self.order:
+            # the fitted values are assigned to the (sorted) unique values
+            uniques, inverse = np.unique(param_dyn_dict[key],
+                                         return_inverse=True)
+            self.slices[key] = slice(count, count + len(uniques))
+            columns += [inverse + count]
+            count = count + len(uniques)
+
+        self.nparams = count
+        if len(columns) > 0:
+            self.columns = np.stack(columns, axis=1)
+        else:
+            self.columns = np.empty((0, 0), dtype=int)
+
+        if param_dict is not None:
+            # setup the start-value array as needed for the fit
+            self.startvals = np.empty(self.nparams)
+            for key in self.order:
+                startvals = np.atleast_1d(param_dict[key])
+                assert len(startvals) == len(np.unique(param_dyn_dict[key])), (
+                    'the number of start-values for ' + str(key) +
+                    ' does not match the number of unique values of ' +
+                    'param_dyn_dict[' + str(key) + ']')
+                self.startvals[self.slices[key]] = startvals
+
+        if bounds_dict is not None:
+            # generate the boundary conditions as needed for the fit
+            self.bounds = (np.empty(self.nparams), np.empty(self.nparams))
+            for key in self.order:
+                for i in [0, 1]:
+                    bound = np.atleast_1d(bounds_dict[key][i])
+                    assert len(bound) == len(np.unique(param_dyn_dict[key])), (
+                        'the number of boundaries for ' + str(key) +
+                        ' does not match the number of unique values of ' +
+                        'param_dyn_dict[' + str(key) + ']')
+                    self.bounds[i][self.slices[key]] = bound
+
+    def unpack(self, params, rows=None):
+        '''
+        get the values of the parameters for each measurement
+
+        Parameters:
+        ------------
+        params : array-like
+                 the parameter-vector
+        rows : array-like(int) (default = None)
+               if provided, the values are returned for the given
+               measurement-indices (e.g. for each observation)
+
+        Returns:
+        ---------
+        res_dict : dict
+                   a dictionary containing the parameter-values for each
+                   measurement
+        '''
+        columns = self.columns if rows is None else self.columns[rows]
+        values = np.asarray(params)[columns]
+
+        return dict((key, values[:, i]) for i, key in enumerate(self.order))
+
+    def jac_pattern(self, rows):
+        '''
+        the sparsity-pattern of the jacobian
+
+        Each measurement depends on exactly one value of each fitted
+        parameter, i.e. each row of the jacobian has exactly len(order)
+        non-zero elements whose positions are fixed by param_dyn_dict.
+
+        Parameters:
+        ------------
+        rows : array-like(int)
+               the index of the measurement that corresponds to each row
+               of the jacobian
+
+        Returns:
+        ---------
+        jac_pattern : scipy.sparse.csr_matrix
+                      a sparse matrix with ones at the positions of the
+                      non-zero elements of the jacobian
+        '''
+        indices = self.columns[rows].ravel()
+        indptr = np.arange(0, indices.size + 1, len(self.order))
+
+        return csr_matrix((np.ones(indices.size), indices, indptr),
+                          shape=(len(rows), self.nparams))
 
 
 class Fits(Scatter):
@@ -102,6 +361,40 @@ class Fits(Scatter):
 
 
 
+    def _ragged_dataset(self, dataset):
+        '''
+        get the incidence-angles and data-values of a dataset in a ragged
+        (CSR-like) layout, i.e. as flat arrays of all values together with
+        the offsets of the individual measurements
+
+        Parameters:
+        ------------
+        dataset: array-like
+                 input-dataset as list of the shape:
+                     [[inc_0, data_0], [inc_1, data_2], ...]
+
+        Returns:
+        ---------
+        offsets : array-like(int)
+                  the values of the i'th measurement are given by
+                  flat[offsets[i]:offsets[i + 1]]
+        inc : array-like
+              the flat array of incidence-angles
+        data : array-like
+               the flat array of data-values
+        '''
+
+        inc = [np.asarray(val[0], dtype=float).ravel() for val in dataset]
+        data = [np.asarray(val[1], dtype=float).ravel() for val in dataset]
+
+        lengths = [len(i) for i in inc]
+        assert lengths == [len(i) for i in data], (
+            'the number of incidence-angles and data-values must be equal')
+
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(int)
+
+        return offsets, np.concatenate(inc), np.concatenate(data)
+
     def _preparedata(self, dataset):
         '''
         prepare data such that it is applicable to least_squres fitting
@@ -142,32 +435,31 @@ class Fits(Scatter):
         N : int
             number of measurements that have been provided within the dataset
         '''
-        # save number of datasets
-        N = len(dataset)
+        # get incidence-angles and data-values in a ragged layout
+        offsets, inc_flat, data_flat = self._ragged_dataset(dataset)
 
-        # get incidence-angles and data-values into separate lists
-        inc, data = [], []
-        for i, val in enumerate(dataset):
-            inc = inc + [val[0]]
-            data = data + [val[1]]
+        # save number of datasets
+        N = len(offsets) - 1
+        lengths = np.diff(offsets)
 
         # rectangularize numpy array by adding nan-values
         # (necessary because numpy can only deal with rectangular arrays)
-        maxLen = np.max(np.array([len(j) for i, j in enumerate(inc)]))
-        for i, j in enumerate(inc):
-            if len(j) < maxLen:
-                inc[i] = np.append(inc[i],
-                                   np.tile(np.nan, maxLen - len(inc[i])))
-                data[i] = np.append(data[i],
-                                    np.tile(np.nan, maxLen - len(data[i])))
+        maxLen = np.max(lengths)
+        rows = np.repeat(np.arange(N), lengths)
+        cols = np.arange(len(data_flat)) - np.repeat(offsets[:-1], lengths)
+
+        inc = np.full((N, maxLen), np.nan)
+        inc[rows, cols] = inc_flat
+        data = np.full((N, maxLen), np.nan)
+        data[rows, cols] = data_flat
 
         # generate a mask to be able to re-create the initial datset
         mask = np.isnan(data)
 
         # concatenate data-matrix to 1d-array
         # (necessary since least_squares can only deal with 1d arrays)
-        data = np.concatenate(data)
-        inc = np.concatenate(inc)
+        data = data.ravel()
+        inc = inc.ravel()
 
         # prepare data to avoid nan-values
         #      since numpy only supports rectangular arrays, and least_squares
@@ -182,29 +474,28 @@ class Fits(Scatter):
         #      weighting-matrix is provided that can be used to correct for
         #      the unwanted duplicates.
 
-        weights = np.ones_like(data)
-        i = 0
+        # each valid value forms a group together with the following
+        # nan-values (leading nan-values are assigned to the first group)
+        valid = ~np.isnan(data)
+        group = np.maximum(np.cumsum(valid) - 1, 0)
 
-        while i < len(data):
-            if np.isnan(data[i]):
-                j = 0
-                while np.isnan(data[i + j]):
-                    data[i + j] = data[i + j - 1]
-                    inc[i + j] = inc[i + j - 1]
-                    j = j + 1
-                    if i + j >= len(data):
-                        break
-                # the weights are calculated as one over the square-root of
-                # the number of repetitions in order to cancel out the
-                # repeated measurements in the sum of SQUARED residuals.
-                weights[i - 1: i + j] = 1. / np.sqrt(float(j + 1))
-            i = i + 1
+        if np.any(valid):
+            # repeat the valid value of each group
+            repeat_index = np.flatnonzero(valid)[group]
+            data = data[repeat_index]
+            inc = inc[repeat_index]
 
-        inc = np.array(np.split(inc, N))
+        # the weights are calculated as one over the square-root of
+        # the number of repetitions in order to cancel out the
+        # repeated measurements in the sum of SQUARED residuals.
+        weights = 1. / np.sqrt(np.bincount(group)[group])
+
+        inc = inc.reshape(N, maxLen)
 
         return inc, data, weights, N, mask
 
-    def _calc_model(self, R, res_dict, return_components=False):
+    def _calc_model(self, R, res_dict, return_components=False,
+                    model_params=None):
         '''
         function to calculate the model-results (intensity or sigma_0) based
         on the provided parameters in linear-units or dB
@@ -220,6 +511,9 @@ class Fits(Scatter):
                             indicator if the individual components or only
                             the total backscattered radiation are returned
                             (useful for quick evaluation of a model)
+        model_params : _ModelParams (default = None)
+                       the compiled definitions of tau, omega and NormBRDF
+                       (if None, they are compiled from R.V and R.SRF)
         Returns:
         ----------
         model_calc : the output of R.calc() (as intensity or sigma_0)
@@ -227,87 +521,12 @@ class Fits(Scatter):
                      defined in the rtfits-class.
         '''
 
-        # store original V and SRF
-        orig_V = copy.deepcopy(R.V)
-        orig_SRF = copy.deepcopy(R.SRF)
-
-        # check if tau, omega or NormBRDF is given in terms of sympy-symbols
-        # and generate a function to evaluate the symbolic representation
-        try:
-            tausymb = R.V.tau[0].free_symbols
-            taufunc = sp.lambdify(tausymb, R.V.tau[0],
-                                  modules=['numpy'])
-        except Exception:
-            tausymb = set()
-            taufunc = None
-        try:
-            omegasymb = R.V.omega[0].free_symbols
-            omegafunc = sp.lambdify(omegasymb, R.V.omega[0],
-                                    modules=['numpy'])
-        except Exception:
-            omegasymb = set()
-            omegafunc = None
-        try:
-            Nsymb = R.SRF.NormBRDF[0].free_symbols
-            Nfunc = sp.lambdify(Nsymb, R.SRF.NormBRDF[0],
-                                modules=['numpy'])
-        except Exception:
-            Nsymb = set()
-            Nfunc = None
-
-        # a list of all symbols used to define tau, omega and NormBRDF
-        toNlist = set(map(str, list(tausymb) + list(omegasymb) + list(Nsymb)))
-
-        # update the numeric representations of omega, tau and NormBRDF
-        # based on the values for the used symbols provided in res_dict
-        if omegafunc is None:
-            if 'omega' in res_dict:
-                R.V.omega = res_dict['omega']
-        else:
-            R.V.omega = omegafunc(*[res_dict[str(i)] for i in omegasymb])
-
-        if taufunc is None:
-            if 'tau' in res_dict:
-                R.V.tau = res_dict['tau']
-        else:
-            R.V.tau = taufunc(*[res_dict[str(i)] for i in tausymb])
-
-        if Nfunc is None:
-            if 'NormBRDF' in res_dict:
-                R.SRF.NormBRDF = res_dict['NormBRDF']
-        else:
-            R.SRF.NormBRDF = Nfunc(*[res_dict[str(i)] for i in Nsymb])
-
-        if 'bsf' in res_dict:
-            R.bsf = res_dict['bsf']
-
-        # remove all unwanted symbols that are NOT needed for evaluation
-        # of the fn-coefficients from res_dict to generate a dict that
-        # can be used as R.param_dict input. (i.e. "omega", "tau", "NormBRDF"
-        # and the symbols used to define them must be removed)
+        if model_params is None:
+            model_params = _ModelParams(R.V, R.SRF)
 
-        # symbols used to define the functions
-        angset = {'phi_ex', 'phi_0', 'theta_0', 'theta_ex'}
-        vsymb = set(map(str, R.V._func.free_symbols)) - angset
-        srfsymb = set(map(str, R.SRF._func.free_symbols)) - angset
-
-        param_fn = res_dict.copy()
-        param_fn.pop('omega', None)
-        param_fn.pop('tau', None)
-        param_fn.pop('NormBRDF', None)
-        param_fn.pop('bsf', None)
-        # vsymb and srfsymb must be subtracted in case the same symbol is used
-        # for omega, tau or NormBRDF definition and in the function definiton
-        for i in set(toNlist - vsymb - srfsymb):
-            param_fn.pop(str(i), None)
+        # get a copy of R that uses the parameter-values of res_dict
+        R = model_params.bind(R, res_dict)
 
-        # ensure that the keys of the dict are strings and not sympy-symbols
-        strparam_fn = dict([[str(key),
-                             np.expand_dims(param_fn[key], 1)]
-                            for i, key in enumerate(param_fn.keys())])
-
-        # set the param-dict to the newly generated dict
-        R.param_dict = strparam_fn
         # calculate total backscatter-values
         if return_components is True:
             model_calc = R.calc()
@@ -323,14 +542,11 @@ class Fits(Scatter):
             # convert the calculated results to dB
             model_calc = 10. * np.log10(model_calc)
 
-        # restore V and SRF to original values
-        R.V = orig_V
-        R.SRF = orig_SRF
-
         return model_calc
 
     # function to evaluate the jacobian
-    def _calc_jac(self, R, res_dict, param_dyn_dict, order):
+    def _calc_jac(self, R, res_dict, param_dyn_dict, order,
+                  model_params=None, jac_pattern=None, weights=None):
         '''
         function to evaluate the jacobian in the shape as required
         by scipy's least_squares function
@@ -342,253 +558,88 @@ class Fits(Scatter):
         res_dict : dict
                    a dictionary containing all parameter-values that should
                    be updated before calling R.jac()
+        param_dyn_dict : dict
+                         see monofit()
+        order : list(str)
+                the names of the fitted parameters
+        model_params : _ModelParams (default = None)
+                       the compiled definitions of tau, omega and NormBRDF
+                       (if None, they are compiled from R.V and R.SRF)
+        jac_pattern : scipy.sparse.csr_matrix (default = None)
+                      the sparsity-pattern of the jacobian as returned by
+                      ParameterLayout.jac_pattern() (if None, it is
+                      generated)
+        weights : array-like (default = None)
+                  the weighting-factors of the residuals (i.e. of the rows
+                  of the jacobian)
         Returns:
         --------
-        jac : array_like(float)
+        jac : array_like(float) or scipy.sparse.csr_matrix
               the jacobian corresponding to the fit-parameters in the
               shape applicable to scipy's least_squres-function
+              (a sparse matrix is returned if any parameter is fitted with
+              more than one value)
         '''
 
-        # store original V and SRF
-        orig_V = copy.deepcopy(R.V)
-        orig_SRF = copy.deepcopy(R.SRF)
-
-#        # set omega, tau and NormBRDF-values to input
-#        if 'omega' in res_dict:
-#            R.V.omega = res_dict['omega']
-#        if 'tau' in res_dict:
-#            R.V.tau = res_dict['tau']
-#        if 'NormBRDF' in res_dict:
-#            R.SRF.NormBRDF = res_dict['NormBRDF']
-
-        # check if tau, omega or NormBRDF is given in terms of sympy-symbols
-        try:
-            tausymb = R.V.tau[0].free_symbols
-            taufunc = sp.lambdify(tausymb, R.V.tau[0],
-                                  modules=['numpy'])
-        except Exception:
-            tausymb = set()
-            taufunc = None
-        try:
-            omegasymb = R.V.omega[0].free_symbols
-            omegafunc = sp.lambdify(omegasymb, R.V.omega[0],
-                                    modules=['numpy'])
-        except Exception:
-            omegasymb = set()
-            omegafunc = None
-        try:
-            Nsymb = R.SRF.NormBRDF[0].free_symbols
-            Nfunc = sp.lambdify(Nsymb, R.SRF.NormBRDF[0],
-                                modules=['numpy'])
-        except Exception:
-            Nsymb = set()
-            Nfunc = None
-
-        toNlist = set(map(str, list(tausymb) + list(omegasymb) + list(Nsymb)))
-
-        # update the numeric representations of omega, tau and NormBRDF
-        # based on the values for the used symbols provided in res_dict
-        if omegafunc is None:
-            if 'omega' in res_dict:
-                R.V.omega = res_dict['omega']
-        else:
-            R.V.omega = omegafunc(*[res_dict[str(i)] for i in omegasymb])
-
-        if taufunc is None:
-            if 'tau' in res_dict:
-                R.V.tau = res_dict['tau']
-        else:
-            R.V.tau = taufunc(*[res_dict[str(i)] for i in tausymb])
-
-        if Nfunc is None:
-            if 'NormBRDF' in res_dict:
-                R.SRF.NormBRDF = res_dict['NormBRDF']
-        else:
-            R.SRF.NormBRDF = Nfunc(*[res_dict[str(i)] for i in Nsymb])
-
-        if 'bsf' in res_dict:
-            R.bsf = res_dict['bsf']
-
-        # remove all unwanted symbols that are NOT needed for evaluation
-        # of the fn-coefficients from res_dict to generate a dict that
-        # can be used as R.param_dict input (i.e. "omega", "tau", "NormBRDF",
-        # "bsf" and the symbols used to define them must be removed)
-
-        # symbols used in the definitions of the functions
-        angset = {'phi_ex', 'phi_0', 'theta_0', 'theta_ex'}
-        vsymb = set(map(str, R.V._func.free_symbols)) - angset
-        srfsymb = set(map(str, R.SRF._func.free_symbols)) - angset
-
-        param_fn = res_dict.copy()
-        param_fn.pop('omega', None)
-        param_fn.pop('tau', None)
-        param_fn.pop('NormBRDF', None)
-        param_fn.pop('bsf', None)
-
-        for i in set(toNlist - vsymb - srfsymb):
-            param_fn.pop(str(i), None)
-
-        # ensure that the keys of the dict are strings
-        strparam_fn = dict([[str(key),
-                             np.expand_dims(param_fn[key], 1)]
-                            for i, key in enumerate(param_fn.keys())])
+        if model_params is None:
+            model_params = _ModelParams(R.V, R.SRF)
 
-        # set the param-dict to the newly generated dict
-        R.param_dict = strparam_fn
+        # get a copy of R that uses the parameter-values of res_dict
+        R = model_params.bind(R, res_dict)
 
-        neworder = [o for o in order]
+        shape = np.atleast_2d(R.t_0).shape
+        if jac_pattern is None:
+            jac_pattern = ParameterLayout(order, param_dyn_dict).jac_pattern(
+                np.repeat(np.arange(shape[0]), shape[1]))
 
         # if tau, omega or NormBRDF have been provided in terms of symbols,
-        # remove the symbols that are intended to be fitted (that are also
-        # in param_dyn_dict) and replace them by 'omega', 'tau' and 'NormBRDF'
-        # so that calling R.jacobian will calculate the "outer" derivative
-        if len(tausymb) != 0:
-            for i in map(str, tausymb) & param_dyn_dict.keys():
-                neworder[neworder.index(i)] = 'tau'
-        if len(omegasymb) != 0:
-            for i in map(str, omegasymb) & param_dyn_dict.keys():
-                neworder[neworder.index(i)] = 'omega'
-        if len(Nsymb) != 0:
-            for i in map(str, Nsymb) & param_dyn_dict.keys():
-                neworder[neworder.index(i)] = 'NormBRDF'
+        # replace the symbols that are intended to be fitted by 'omega', 'tau'
+        # and 'NormBRDF' so that calling R.jacobian will calculate the
+        # "outer" derivative
+        inner = dict()
+        for name in ['tau', 'omega', 'NormBRDF']:
+            for i in (set(map(str, model_params.symbols.get(name, [])))
+                      & set(order)):
+                inner[i] = name
+        neworder = [inner.get(key, key) for key in order]
 
         # calculate the jacobian based on neworder
         # (evaluating only "outer" derivatives with respect to omega,
         # tau and NormBRDF)
-
         jac = R.jacobian(sig0=self.sig0, dB=self.dB,
                          param_list=neworder)
 
-        # generate a scipy.sparse matrix that represents the jacobian for all
-        # the individual parameters according to jac_dyn_dict
-        # (this is needed to avoid memory overflows for very large jacobians)
-        newjacdict = {}
+        # the non-zero elements of each row of the jacobian
+        # (in the order of the columns defined by jac_pattern)
+        data = np.empty((shape[0] * shape[1], len(order)))
         for i, key in enumerate(order):
-            uniques, inds = np.unique(param_dyn_dict[key],
-                                      return_index = True)
-            # provide unique values based on original occurence
-            # (np.unique sorts the result!!)
-            uniques = uniques[np.argsort(inds)]
-
-            if len(uniques) == 1:
-                newjacdict[key] = np.array([np.concatenate(jac[i], axis=0)])
-# TODO is it faster to use numpy directly for small arrays ?
-#            elif len(uniques) < 50:
-#                data = np.concatenate(jac[i])
-#                row_ind = []  # row-indices where jac is nonzero
-#                col_ind = []  # col-indices where jac is nonzero
-#                for n_uni, uni in enumerate(uniques):
-#                    rule = (param_dyn_dict[key] == uni)
-#                    where_n = np.where(
-#                            np.concatenate(
-#                                    np.broadcast_arrays(
-#                                            rule[:,np.newaxis], jac[0])[0]))[0]
-#
-#                    col_ind += list(where_n)
-#                    row_ind += list(np.full_like(where_n, n_uni))
-#                # generate a sparse matrix
-#                m = np.full((max(row_ind) + 1,
-#                                      max(col_ind) + 1), 0.)
-#                # fill matrix with values
-#                m[row_ind, col_ind] = data
-#                newjacdict[key] = m
-            else:
-                # if too many unique values occur, use scipy sparse matrix
-                # to avoid memory-overflow due to the large number of zeroes...
-                # (this will reduce speed since scipy.sparse does not fully
-                # supprot BLAS and so no proper parallelization is performed)
-                data = np.concatenate(jac[i])
-
-                row_ind = []  # row-indices where jac is nonzero
-                col_ind = []  # col-indices where jac is nonzero
-                for n_uni, uni in enumerate(uniques):
-                    rule = (param_dyn_dict[key] == uni)
-                    where_n = np.where(
-                            np.concatenate(
-                                    np.broadcast_to(
-                                            rule[:,np.newaxis], jac[i].shape)))[0]
-
-                    col_ind += list(where_n)
-                    row_ind += list(np.full_like(where_n, n_uni))
-
-                # generate a sparse matrix
-                m = csr_matrix((data, (row_ind, col_ind)),
-                               shape=(max(row_ind) + 1,
-                                      max(col_ind) + 1))
-                newjacdict[key] = m
-
-        # evaluate jacobians of the functional representations of tau
-        # and add them to newjacdict
-        for i in set(map(str, tausymb)) & set(param_dyn_dict.keys()):
-            # generate a function that evaluates the 'inner' derivative, i.e.:
-            # df/dx = df/dtau * dtau/dx = df/dtau * d_inner
-            d_inner = sp.lambdify(tausymb, sp.diff(orig_V.tau[0],
-                                                   sp.Symbol(i)),
-                                  modules=['numpy'])
-            # evaluate the inner derivative
-            dtau_dx = d_inner(*[res_dict[str(i)] for i in tausymb])
-            # calculate the derivative with respect to the parameters
-            if np.isscalar(dtau_dx):
-                newjacdict[str(i)] = newjacdict[str(i)] * dtau_dx
-            elif isspmatrix(newjacdict[str(i)]):
-                # In case the parameter is varying temporally, it must be
-                # repeated by the number of incidence-angles in order
-                # to have correct array-processing (it is assumed that no parameter
-                # is incidence-angle dependent itself)
-                dtau_dx = np.repeat(dtau_dx, len(np.atleast_2d(R.t_0)[0]))
-                # calculate "outer" * "inner" derivative for sparse matrices
-                newjacdict[str(i)] = newjacdict[str(i)].multiply(dtau_dx)
-            else:
-                dtau_dx = np.repeat(dtau_dx, len(np.atleast_2d(R.t_0)[0]))
-                # calculate "outer" * "inner" derivative for numpy arrays
-                newjacdict[str(i)] = newjacdict[str(i)] * dtau_dx
-
-        # same for omega
-        for i in set(map(str, omegasymb)) & set(param_dyn_dict.keys()):
-            d_inner = sp.lambdify(omegasymb, sp.diff(orig_V.omega[0],
-                                                     sp.Symbol(i)),
-                                  modules=['numpy'])
-            domega_dx = d_inner(*[res_dict[str(i)] for i in omegasymb])
-            if np.isscalar(domega_dx):
-                newjacdict[str(i)] = newjacdict[str(i)] * domega_dx
-            elif isspmatrix(newjacdict[str(i)]):
-                domega_dx = np.repeat(domega_dx, len(np.atleast_2d(R.t_0)[0]))
-                newjacdict[str(i)] = newjacdict[str(i)].multiply(domega_dx)
-            else:
-                domega_dx = np.repeat(domega_dx, len(np.atleast_2d(R.t_0)[0]))
-                newjacdict[str(i)] = newjacdict[str(i)] * domega_dx
-
-        # same for NormBRDF
-        for i in set(map(str, Nsymb)) & set(param_dyn_dict.keys()):
-            d_inner = sp.lambdify(Nsymb, sp.diff(orig_SRF.NormBRDF[0],
-                                                 sp.Symbol(i)),
-                                  modules=['numpy'])
-            dN_dx = d_inner(*[res_dict[str(i)] for i in Nsymb])
-            if np.isscalar(dN_dx):
-                newjacdict[str(i)] = newjacdict[str(i)] * dN_dx
-            elif isspmatrix(newjacdict[str(i)]):
-                dN_dx = np.repeat(dN_dx, len(np.atleast_2d(R.t_0)[0]))
-                newjacdict[str(i)] = newjacdict[str(i)].multiply(dN_dx)
-            else:
-                dN_dx = np.repeat(dN_dx, len(np.atleast_2d(R.t_0)[0]))
-                newjacdict[str(i)] = newjacdict[str(i)] * dN_dx
-
-        # return the transposed jacobian as needed by scipy's least_squares
-        if np.any([isspmatrix(newjacdict[key]) for key in order]):
-            # in case sparse matrices have been used, use scipy to vstack them
-            jac_lsq = vstack([newjacdict[key] for key in order]).transpose()
-        else:
-            jac_lsq = np.vstack([newjacdict[key] for key in order]).transpose()
-
-        # restore V and SRF to original values
-        R.V = orig_V
-        R.SRF = orig_SRF
-
-        return jac_lsq
-
-
-
-    def _calc_slope_curv(self, R, res_dict, return_components=False):
+            jac_i = jac[i]
+            if key in inner:
+                # evaluate the 'inner' derivative, i.e.:
+                # df/dx = df/dtau * dtau/dx = df/dtau * d_inner
+                # (it is assumed that no parameter is incidence-angle
+                # dependent itself)
+                d_inner = model_params.d_inner(inner[key], key, res_dict)
+                jac_i = jac_i * np.reshape(d_inner, (-1, 1))
+
+            data[:, i] = np.broadcast_to(jac_i, shape).ravel()
+
+        if weights is not None:
+            data = data * np.reshape(weights, (-1, 1))
+
+        if jac_pattern.shape[1] == len(order):
+            # all parameters are constant for all measurements
+            # (the jacobian is a dense matrix)
+            return data
+
+        # use a scipy sparse matrix to avoid memory-overflow due to the
+        # large number of zeroes (only the data-array has to be filled,
+        # the index-arrays are shared with the precomputed pattern)
+        return csr_matrix((data.ravel(), jac_pattern.indices,
+                           jac_pattern.indptr), shape=jac_pattern.shape)
+
+    def _calc_slope_curv(self, R, res_dict, return_components=False,
+                         model_params=None):
         '''
         function to calculate the monostatic slope and curvature
         of the model
@@ -604,6 +655,9 @@ class Fits(Scatter):
                             indicator if the individual components or only
                             the total backscattered radiation are returned
                             (useful for quick evaluation of a model)
+        model_params : _ModelParams (default = None)
+                       the compiled definitions of tau, omega and NormBRDF
+                       (if None, they are compiled from R.V and R.SRF)
         Returns:
         ----------
         model_calc : the output of R.calc() (as intensity or sigma_0)
@@ -611,117 +665,191 @@ class Fits(Scatter):
                      defined in the rtfits-class.
         '''
 
-        # store original V and SRF
-        orig_V = copy.deepcopy(R.V)
-        orig_SRF = copy.deepcopy(R.SRF)
+        if model_params is None:
+            model_params = _ModelParams(R.V, R.SRF)
+
+        # get a copy of R that uses the parameter-values of res_dict
+        R = model_params.bind(R, res_dict)
+
+        # calculate slope-values
+        if return_components is True:
+            model_slope = [R.tot_slope(sig0=self.sig0, dB=self.dB),
+                          R.surface_slope(sig0=self.sig0, dB=self.dB),
+                          R.volume_slope(sig0=self.sig0, dB=self.dB)]
+        else:
+            model_slope = R.tot_slope(sig0=self.sig0, dB=self.dB)
+
+        # calculate curvature-values
+        if return_components is True:
+            model_curv = [R.tot_curv(sig0=self.sig0, dB=self.dB),
+                          R.surface_curv(sig0=self.sig0, dB=self.dB),
+                          R.volume_curv(sig0=self.sig0, dB=self.dB)]
+        else:
+            model_curv = R.tot_curv(sig0=self.sig0, dB=self.dB)
+
+        return {'slope' : model_slope,
+                'curv' : model_curv}
+
+
+    def _get_param_R(self, V, SRF, param_dict, fixed_dict):
+        '''
+        check if all parameters required to evaluate V and SRF have been
+        provided and generate the param_dict of the RT1-object used in the
+        fit (i.e. remove the parameters that are only used in the
+        definitions of tau, omega and NormBRDF)
+
+        Parameters:
+        ------------
+        V, SRF, param_dict, fixed_dict :
+            see monofit()
+
+        Returns:
+        ---------
+        param_R : dict
+                  the param_dict of the RT1-object
+        '''
 
         # check if tau, omega or NormBRDF is given in terms of sympy-symbols
-        # and generate a function to evaluate the symbolic representation
         try:
-            tausymb = R.V.tau[0].free_symbols
-            taufunc = sp.lambdify(tausymb, R.V.tau[0],
-                                  modules=['numpy'])
+            tausymb = V.tau[0].free_symbols
         except Exception:
             tausymb = set()
-            taufunc = None
         try:
-            omegasymb = R.V.omega[0].free_symbols
-            omegafunc = sp.lambdify(omegasymb, R.V.omega[0],
-                                    modules=['numpy'])
+            omegasymb = V.omega[0].free_symbols
         except Exception:
             omegasymb = set()
-            omegafunc = None
         try:
-            Nsymb = R.SRF.NormBRDF[0].free_symbols
-            Nfunc = sp.lambdify(Nsymb, R.SRF.NormBRDF[0],
-                                modules=['numpy'])
+            Nsymb = SRF.NormBRDF[0].free_symbols
         except Exception:
             Nsymb = set()
-            Nfunc = None
 
-        # a list of all symbols used to define tau, omega and NormBRDF
         toNlist = set(map(str, list(tausymb) + list(omegasymb) + list(Nsymb)))
 
-        # update the numeric representations of omega, tau and NormBRDF
-        # based on the values for the used symbols provided in res_dict
-        if omegafunc is None:
-            if 'omega' in res_dict:
-                R.V.omega = res_dict['omega']
-        else:
-            R.V.omega = omegafunc(*[res_dict[str(i)] for i in omegasymb])
-
-        if taufunc is None:
-            if 'tau' in res_dict:
-                R.V.tau = res_dict['tau']
-        else:
-            R.V.tau = taufunc(*[res_dict[str(i)] for i in tausymb])
-
-        if Nfunc is None:
-            if 'NormBRDF' in res_dict:
-                R.SRF.NormBRDF = res_dict['NormBRDF']
-        else:
-            R.SRF.NormBRDF = Nfunc(*[res_dict[str(i)] for i in Nsymb])
-
-        if 'bsf' in res_dict:
-            R.bsf = res_dict['bsf']
+        # check of general input-requirements
+        #   check if all parameters have been provided
+        angset = {'phi_ex', 'phi_0', 'theta_0', 'theta_ex'}
+        vsymb = set(map(str, V._func.free_symbols)) - angset
+        srfsymb = set(map(str, SRF._func.free_symbols)) - angset
 
-        # remove all unwanted symbols that are NOT needed for evaluation
-        # of the fn-coefficients from res_dict to generate a dict that
-        # can be used as R.param_dict input. (i.e. "omega", "tau", "NormBRDF"
-        # and the symbols used to define them must be removed)
+        paramset = ((set(map(str, param_dict.keys()))
+                     ^ set(map(str, fixed_dict.keys())))
+                    - {'tau', 'omega', 'NormBRDF'})
 
-        # symbols used to define the functions
-        angset = {'phi_ex', 'phi_0', 'theta_0', 'theta_ex'}
-        vsymb = set(map(str, R.V._func.free_symbols)) - angset
-        srfsymb = set(map(str, R.SRF._func.free_symbols)) - angset
-
-        param_fn = res_dict.copy()
-        param_fn.pop('omega', None)
-        param_fn.pop('tau', None)
-        param_fn.pop('NormBRDF', None)
-        param_fn.pop('bsf', None)
-        # vsymb and srfsymb must be subtracted in case the same symbol is used
-        # for omega, tau or NormBRDF definition and in the function definiton
-        for i in set(toNlist - vsymb - srfsymb):
-            param_fn.pop(str(i), None)
+        assert paramset >= (vsymb | srfsymb), (
+            'the parameters ' +
+            str((vsymb | srfsymb) - paramset) +
+            ' must be provided in param_dict')
 
-        # ensure that the keys of the dict are strings and not sympy-symbols
-        strparam_fn = dict([[str(key),
-                             np.expand_dims(param_fn[key], 1)]
-                            for i, key in enumerate(param_fn.keys())])
 
-        # set the param-dict to the newly generated dict
-        R.param_dict = strparam_fn
+# TODO fix asserts
+#        if omega is not None and not np.isscalar(omega):
+#            assert len(omega) == Nmeasurements, ('len. of omega-array must' +
+#                      'be equal to the length of the dataset')
+#        if omega is None:
+#            assert len(V.omega) == Nmeasurements, ('length of' +
+#                      ' omega-array provided in the definition of V must' +
+#                      ' be equal to the length of the dataset')
+#
+#        if tau is not None and not np.isscalar(tau):
+#            assert len(tau) == Nmeasurements, ('length of tau-array' +
+#                      ' must be equal to the length of the dataset')
+#
+#        if tau is None:
+#            assert len(V.tau) == Nmeasurements, ('length of tau-array' +
+#                      ' provided in the definition of V must be equal to' +
+#                      ' the length of the dataset')
+#
+#        if NormBRDF is not None and not np.isscalar(NormBRDF):
+#            assert len(NormBRDF) == Nmeasurements, ('length of' +
+#                      ' NormBRDF-array must be equal to the' +
+#                      ' length of the dataset')
+#        if NormBRDF is None:
+#            assert len(SRF.NormBRDF) == Nmeasurements, ('length of' +
+#                      ' NormBRDF-array provided in the definition of SRF' +
+#                      ' must be equal to the length of the dataset')
+#
+        # generate a dict containing only the parameters needed to evaluate
+        # the fn-coefficients
+        # for python > 3.4
+        # param_R = dict(**param_dict, **fixed_dict)
+        param_R = dict((k, v) for k, v in list(param_dict.items())
+                       + list(fixed_dict.items()))
 
-        # calculate slope-values
-        if return_components is True:
-            model_slope = [R.tot_slope(sig0=self.sig0, dB=self.dB),
-                          R.surface_slope(sig0=self.sig0, dB=self.dB),
-                          R.volume_slope(sig0=self.sig0, dB=self.dB)]
-        else:
-            model_slope = R.tot_slope(sig0=self.sig0, dB=self.dB)
+        param_R.pop('omega', None)
+        param_R.pop('tau', None)
+        param_R.pop('NormBRDF', None)
+        param_R.pop('bsf', None)
 
-        # calculate curvature-values
-        if return_components is True:
-            model_curv = [R.tot_curv(sig0=self.sig0, dB=self.dB),
-                          R.surface_curv(sig0=self.sig0, dB=self.dB),
-                          R.volume_curv(sig0=self.sig0, dB=self.dB)]
-        else:
-            model_curv = R.tot_curv(sig0=self.sig0, dB=self.dB)
+        # remove also other symbols that are used in the definitions of
+        # tau, omega and NormBRDF
+        for i in set(toNlist - vsymb - srfsymb):
+            param_R.pop(i)
 
+        return param_R
 
-        # restore V and SRF to original values
-        R.V = orig_V
-        R.SRF = orig_SRF
+    def _select_observations(self, R, valid, rows):
+        '''
+        get a copy of the RT1-object that evaluates the model only for
+        the selected elements of the (rectangular) incidence-angle array
 
-        return {'slope' : model_slope,
-                'curv' : model_curv}
+        Parameters:
+        ------------
+        R : RT1-object
+            the rt1-object used for the fit
+        valid : array-like(bool)
+                a (flat) mask of the selected elements of R.t_0
+        rows : array-like(int)
+               the index of the measurement of each selected element
 
+        Returns:
+        ---------
+        R : RT1-object
+            a (shallow) copy of the RT1-object where the incidence-angles
+            are given as an array of the shape (number of selected elements,
+            1) and numerical values of tau, omega, NormBRDF and bsf that
+            are provided for each measurement are repeated accordingly.
+        '''
+        # make sure that the _fnevals function is evaluated before copying
+        # (to avoid re-generating it for each copy)
+        R._fnevals
+
+        Nmeasurements = np.atleast_2d(R.t_0).shape[0]
+
+        def select(val):
+            # select the values for the individual elements
+            # (the setter-functions add an axis that must be removed)
+            if np.ndim(val) == 2 and np.shape(val)[0] == Nmeasurements:
+                return val[rows, 0]
+            return val[..., 0]
+
+        V = copy.copy(R.V)
+        SRF = copy.copy(R.SRF)
+        for name, S in [['tau', V], ['omega', V], ['NormBRDF', SRF]]:
+            val = getattr(S, name)
+            if not isinstance(val[0], sp.Basic):
+                setattr(S, name, select(val))
+
+        t_0 = np.atleast_2d(R.t_0).ravel()[valid][:, np.newaxis]
+
+        bsf = select(R.bsf)
+
+        # (the copy uses separate angle- and attenuation-terms)
+        R = R._copy()
+        R.V = V
+        R.SRF = SRF
+        R.bsf = bsf
+        R.t_0 = t_0
+        R.p_0 = np.zeros_like(t_0)
+        R.t_ex = t_0
+        R.p_ex = np.full_like(t_0, np.pi)
+
+        return R
 
     def monofit(self, V, SRF, dataset, param_dict, bsf=0.,
                 bounds_dict={}, fixed_dict={}, param_dyn_dict={},
                 fn_input=None, _fnevals_input=None, int_Q=True,
-                lambda_backend='cse', verbosity=0, **kwargs):
+                lambda_backend='cse', fn_cache=None, ragged=False,
+                verbosity=0, **kwargs):
         '''
         Perform least-squares fitting of omega, tau, NormBRDF and any
         parameter used to define V and SRF to sets of monostatic measurements.
@@ -852,19 +980,39 @@ class Fits(Scatter):
              calculated results!
         int_Q : bool (default = True)
                 indicator if interaction-terms should be included
-                (note: they are always ommitted when calculating the jacobian!)
+                (in the model and in the jacobian)
         lambda_backend : string (default = 'cse')
                          select method for generating _fnevals functions
                          if they are not provided explicitly
+        fn_cache : rt1.fncache.FnCache or str (default = None)
+                   a persistent cache (or the path to the directory of a
+                   cache) used to store the fn-coefficients and the
+                   generated _fnevals functions (see RT1 for details)
+        ragged : bool (default = False)
+                 if True, the model (and the jacobian) is only evaluated
+                 for the valid observations of the dataset (i.e. not for
+                 the values that have been added to rectangularize the
+                 dataset). The returned residuals and jacobian (res_lsq.fun
+                 and res_lsq.jac) are given with respect to the
+                 rectangularized (and weighted) dataset as for
+                 ragged = False.
         verbosity : int
                   set verbosity level of rt1-module
         kwargs :
                  keyword arguments passed to scipy's least_squares function
+                 (by default the analytic jacobian is used. If a
+                 finite-difference scheme is provided as 'jac', the
+                 precomputed sparsity-pattern is passed as 'jac_sparsity')
 
         Returns:
         ---------
         res_lsq : dict
                   output of scipy's least_squares function
+                  (res_lsq.cache_info contains the number of hits and
+                  misses of the evaluation-cache of the RT1-object, see
+                  RT1.eval_cache_info, and res_lsq.dedup_info the ratio of
+                  samples to evaluations of angle-dependent quantities,
+                  see RT1.dedup_info)
         R : RT1-object
             the RT1-object used to perform the fit
         data : array-like
@@ -898,81 +1046,9 @@ class Fits(Scatter):
 #        tau = param_dict.get('tau', None)
 #        NormBRDF = param_dict.get('NormBRDF', None)
 
-        # check if tau, omega or NormBRDF is given in terms of sympy-symbols
-        try:
-            tausymb = V.tau[0].free_symbols
-        except Exception:
-            tausymb = set()
-        try:
-            omegasymb = V.omega[0].free_symbols
-        except Exception:
-            omegasymb = set()
-        try:
-            Nsymb = SRF.NormBRDF[0].free_symbols
-        except Exception:
-            Nsymb = set()
-
-        toNlist = set(map(str, list(tausymb) + list(omegasymb) + list(Nsymb)))
-
-        # check of general input-requirements
-        #   check if all parameters have been provided
-        angset = {'phi_ex', 'phi_0', 'theta_0', 'theta_ex'}
-        vsymb = set(map(str, V._func.free_symbols)) - angset
-        srfsymb = set(map(str, SRF._func.free_symbols)) - angset
-
-        paramset = ((set(map(str, param_dict.keys()))
-                     ^ set(map(str, fixed_dict.keys())))
-                    - {'tau', 'omega', 'NormBRDF'})
-
-        assert paramset >= (vsymb | srfsymb), (
-            'the parameters ' +
-            str((vsymb | srfsymb) - paramset) +
-            ' must be provided in param_dict')
-
-
-# TODO fix asserts
-#        if omega is not None and not np.isscalar(omega):
-#            assert len(omega) == Nmeasurements, ('len. of omega-array must' +
-#                      'be equal to the length of the dataset')
-#        if omega is None:
-#            assert len(V.omega) == Nmeasurements, ('length of' +
-#                      ' omega-array provided in the definition of V must' +
-#                      ' be equal to the length of the dataset')
-#
-#        if tau is not None and not np.isscalar(tau):
-#            assert len(tau) == Nmeasurements, ('length of tau-array' +
-#                      ' must be equal to the length of the dataset')
-#
-#        if tau is None:
-#            assert len(V.tau) == Nmeasurements, ('length of tau-array' +
-#                      ' provided in the definition of V must be equal to' +
-#                      ' the length of the dataset')
-#
-#        if NormBRDF is not None and not np.isscalar(NormBRDF):
-#            assert len(NormBRDF) == Nmeasurements, ('length of' +
-#                      ' NormBRDF-array must be equal to the' +
-#                      ' length of the dataset')
-#        if NormBRDF is None:
-#            assert len(SRF.NormBRDF) == Nmeasurements, ('length of' +
-#                      ' NormBRDF-array provided in the definition of SRF' +
-#                      ' must be equal to the length of the dataset')
-#
         # generate a dict containing only the parameters needed to evaluate
         # the fn-coefficients
-        # for python > 3.4
-        # param_R = dict(**param_dict, **fixed_dict)
-        param_R = dict((k, v) for k, v in list(param_dict.items())
-                       + list(fixed_dict.items()))
-
-        param_R.pop('omega', None)
-        param_R.pop('tau', None)
-        param_R.pop('NormBRDF', None)
-        param_R.pop('bsf', None)
-
-        # remove also other symbols that are used in the definitions of
-        # tau, omega and NormBRDF
-        for i in set(toNlist - vsymb - srfsymb):
-            param_R.pop(i)
+        param_R = self._get_param_R(V, SRF, param_dict, fixed_dict)
 
 #        if fn_input is None:
 #            # define rt1-object
@@ -1009,13 +1085,17 @@ class Fits(Scatter):
         R = RT1(1., inc, inc, np.zeros_like(inc), np.full_like(inc, np.pi),
                 V=V, SRF=SRF, fn_input=fn_input, _fnevals_input=_fnevals_input,
                 geometry='mono', bsf = bsf, param_dict=param_R, int_Q=int_Q,
-                lambda_backend=lambda_backend, verbosity=verbosity)
+                lambda_backend=lambda_backend, fn_cache=fn_cache,
+                eval_cache=True, verbosity=verbosity)
         # store _fnevals functions in case they have not been provided
         # as input-arguments explicitly to avoid recalculation for each step
         R._fnevals_input = R._fnevals
         # set fn_input to any value except None to avoid re-calculation
         R.fn_input = 1
 
+        # compile the (symbolic) definitions of tau, omega and NormBRDF
+        model_params = _ModelParams(V, SRF)
+
         # if param_dyn_dict is not set explicitly, use the number of
         # start-values provided in param_dict to assign the dynamics of
         # the parameters (i.e. either constant or varying for each measurement)
@@ -1026,74 +1106,71 @@ class Fits(Scatter):
                     len(np.atleast_1d(param_dict[key])),
                     Nmeasurements)
 
+        # the mapping between the parameter-vector and the parameter-values
+        # of the individual measurements
+        layout = ParameterLayout(order, param_dyn_dict, param_dict,
+                                 bounds_dict)
+
+        if ragged is True:
+            # evaluate the model only for the valid observations
+            valid = ~mask.ravel()
+            # the index of the measurement of each observation
+            rows = np.repeat(np.arange(Nmeasurements), inc.shape[1])[valid]
+
+            R_fit = self._select_observations(R, valid, rows)
+            data_fit = data[valid]
+            weights_fit = np.ones_like(data_fit)
+            # select the fixed parameter-values of each observation
+            fixed_fit = dict((key, np.asarray(val)[rows])
+                             if np.ndim(val) > 0 else (key, val)
+                             for key, val in fixed_dict.items())
+        else:
+            rows = None
+            R_fit = R
+            data_fit = data
+            weights_fit = weights
+            fixed_fit = fixed_dict
+
+        # precompute the sparsity-pattern of the jacobian
+        # (it is fixed by param_dyn_dict for the whole fit)
+        if rows is None:
+            jac_pattern = layout.jac_pattern(
+                np.repeat(np.arange(Nmeasurements), inc.shape[1]))
+        else:
+            jac_pattern = layout.jac_pattern(rows)
+
         # define a function that evaluates the model in the shape as needed
         # for scipy's least_squares function
         def fun(params):
-            # generate a dictionary to assign values based on input
-            count = 0
-            newdict = {}
-            for i, key in enumerate(order):
-                # find unique parameter estimates and how often they occur
-                uniques, index, inverse, Nuniq = np.unique(param_dyn_dict[key],
-                                                           return_counts=True,
-                                                           return_index=True,
-                                                           return_inverse=True)
-
-                # shift index to next parameter (this is necessary since params
-                # is provided as a concatenated array)
-                inverse = inverse + count
-                # select the fitted values for the corresponding parameter
-                newdict[key] = np.array(params)[inverse]
-                # increase counter
-                count = count + len(np.unique(param_dyn_dict[key]))
-
+            # generate a dictionary to assign values based on input and
             # incorporate values provided in fixed_dict
             # (i.e. incorporate fixed but possibly dynamic parameter-values)
-
-            # for python > 3.4
-            # newdict = dict(newdict, **fixed_dict)
-            newdict = dict(list(newdict.items()) +
-                           list(fixed_dict.items()))
+            newdict = dict(list(layout.unpack(params, rows).items()) +
+                           list(fixed_fit.items()))
 
             # calculate the residuals
-            errs = np.concatenate(self._calc_model(R, newdict)) - data
+            errs = np.concatenate(self._calc_model(
+                R_fit, newdict, model_params=model_params)) - data_fit
             # incorporate weighting-matrix to ensure correct treatment
             # of artificially added values (see _preparedata()-fucntion)
-            errs = weights * errs
+            errs = weights_fit * errs
 
             return errs
 
         # function to evaluate the jacobian
         def dfun(params):
-            # generate a dictionary to assign values based on input
-            count = 0
-            newdict = {}
-            for i, key in enumerate(order):
-                # find unique parameter estimates and how often they occur
-                uniques, index, inverse, Nuniq = np.unique(param_dyn_dict[key],
-                                                           return_counts=True,
-                                                           return_index=True,
-                                                           return_inverse=True)
-
-                # shift index to next parameter (this is necessary since params
-                # is provided as a concatenated array)
-                inverse = inverse + count
-                # select the fitted values for the corresponding parameter
-                newdict[key] = np.array(params)[inverse]
-                # increase counter by number of unique parameters of key
-                count = count + len(np.unique(param_dyn_dict[key]))
-
+            # generate a dictionary to assign values based on input and
             # incorporate values provided in fixed_dict
             # (i.e. incorporate fixed but possibly dynamic parameter-values)
-            # for python > 3.4
-            # newdict = dict(newdict, **fixed_dict)
-            newdict = dict(list(newdict.items()) +
-                           list(fixed_dict.items()))
+            newdict = dict(list(layout.unpack(params, rows).items()) +
+                           list(fixed_fit.items()))
 
             # calculate the jacobian
-            # (no need to include weighting matrix in here since the jacobian
-            # of the artificially added colums must be the same!)
-            jac = self._calc_jac(R, newdict, param_dyn_dict, order)
+            # (the weighting-matrix must be included since the jacobian
+            # of the weighted residuals is required)
+            jac = self._calc_jac(R_fit, newdict, param_dyn_dict, order,
+                                 model_params=model_params,
+                                 jac_pattern=jac_pattern, weights=weights_fit)
 
             return jac
 
@@ -1137,44 +1214,44 @@ class Fits(Scatter):
 #        bounds_dict['tau'] = tau_bounds
 #        bounds_dict['NormBRDF'] = NormBRDF_bounds
 
-        # generate list of boundary conditions as needed for the fit
-        bounds = [[], []]
-        for key in order:
-            bounds[0] = bounds[0] + list(bounds_dict[key][0])
-            bounds[1] = bounds[1] + list(bounds_dict[key][1])
-
-        # setup the start-value array as needed for the fit
-        startvals = []
-        for key in order:
-            if param_dict[key] is not None:
-                if np.isscalar(param_dict[key]):
-                    startvals = startvals + [param_dict[key]]
-                else:
-                    startvals = startvals + list(param_dict[key])
+        # use the analytic jacobian unless a finite-difference scheme
+        # is explicitly requested
+        jac = kwargs.pop('jac', dfun)
+        if layout.nparams > len(order):
+            # if any parameter is fitted with more than one value, the
+            # jacobian is sparse and the lsmr trust-region solver is used
+            if callable(jac):
+                kwargs.setdefault('tr_solver', 'lsmr')
+            else:
+                kwargs.setdefault('jac_sparsity', jac_pattern)
 
         # perform actual fitting
-        res_lsq = least_squares(fun, startvals, bounds=bounds,
-                                jac=dfun, **kwargs)
+        res_lsq = least_squares(fun, layout.startvals, bounds=layout.bounds,
+                                jac=jac, **kwargs)
+
+        if ragged is True:
+            # provide the residuals and the jacobian with respect to the
+            # rectangularized and weighted dataset
+            obs_index = np.maximum(np.cumsum(valid) - 1, 0)
+            res_lsq.fun = weights * res_lsq.fun[obs_index]
+            res_lsq.jac = diags(weights).dot(res_lsq.jac[obs_index])
+
+        # report the usage of the evaluation-cache (intermediate results
+        # of the residual-evaluations are re-used by the jacobian)
+        res_lsq.cache_info = R.eval_cache_info
+        if verbosity >= 1:
+            print('evaluation-cache: ' + str(res_lsq.cache_info['hits']) +
+                  ' hits, ' + str(res_lsq.cache_info['misses']) + ' misses')
+
+        # report the deduplication of angle-dependent evaluations
+        res_lsq.dedup_info = R.dedup_info
+        if verbosity >= 1:
+            print('deduplication-ratio: ' +
+                  str(round(res_lsq.dedup_info['ratio'], 2)))
 
         # generate a dictionary to assign values based on fit-results
-        count = 0
-        res_dict = {}
-        start_dict = {}
-        for i, key in enumerate(order):
-            # find unique parameter estimates and how often they occur
-            uniques, index, inverse, Nuniq = np.unique(param_dyn_dict[key],
-                                                       return_counts=True,
-                                                       return_index=True,
-                                                       return_inverse=True)
-
-            # shift index to next parameter (this is necessary since the result
-            # is provided as a concatenated array)
-            inverse = inverse + count
-            # select the fitted values for the corresponding parameter
-            res_dict[key] = np.array(res_lsq.x)[inverse]
-            start_dict[key] = np.array(startvals)[inverse]
-            # increase counter
-            count = count + len(np.unique(param_dyn_dict[key]))
+        res_dict = layout.unpack(res_lsq.x)
+        start_dict = layout.unpack(layout.startvals)
 
         # ------------------------------------------------------------------
         # ------------ prepare output-data for later convenience -----------
@@ -1185,6 +1262,153 @@ class Fits(Scatter):
         return [res_lsq, R, data, inc, mask, weights,
                 res_dict, start_dict, fixed_dict]
 
+    def monofit_batch(self, V, SRF, datasets, param_dict, bsf=0.,
+                      bounds_dict={}, fixed_dict={}, param_dyn_dict={},
+                      int_Q=True, lambda_backend='cse', fn_cache=None,
+                      processes=None, chunksize=None, verbosity=0,
+                      **kwargs):
+        '''
+        Perform monofit() for a batch of datasets that share the same
+        model-definition (i.e. V, SRF and the keys of param_dict and
+        fixed_dict) using a pool of worker-processes.
+
+        The _fnevals function is generated only once and the (pickleable)
+        evaluator is sent to the worker-processes (no symbolic computations
+        are performed within the workers).
+
+        The function is a generator that yields the results as soon as the
+        individual fits are finished (i.e. not necessarily in the order of
+        the datasets!). Errors raised within a single fit are returned
+        rather than raised, i.e. a failing fit does not affect the
+        remaining fits of the batch.
+
+        Parameters:
+        ------------
+        V, SRF : RT1.volume and RT1.surface class objects
+                 see monofit()
+        datasets : list
+                   a list of datasets, each of the form as required by
+                   monofit(), i.e. [[inc_0, data_0], [inc_1, data_1], ...]
+        param_dict, bounds_dict, fixed_dict, param_dyn_dict : dict or list
+                   see monofit().
+                   If a single dict is provided, it is used for all
+                   datasets. Alternatively a list of dicts (one for each
+                   dataset) can be provided.
+                   (the keys must be equal for all datasets!)
+        bsf, int_Q, lambda_backend, fn_cache :
+                   see monofit()
+                   (lambda_backend and fn_cache are only used to generate
+                   the _fnevals function within the main process)
+
+        Other Parameters:
+        ------------------
+        processes : int (default = None)
+                    the number of worker-processes. If None, the number of
+                    available cpus is used. If 0, the fits are performed
+                    sequentially within the current process.
+        chunksize : int (default = None)
+                    the number of fits that are sent to a worker-process at
+                    once. If None, the datasets are split into approx.
+                    4 chunks per process.
+        verbosity : int
+                    set verbosity level
+                    (if >= 1 the throughput of the batch is printed)
+        kwargs :
+                 keyword arguments passed to scipy's least_squares function
+
+        Yields:
+        ---------
+        index : int
+                the index of the dataset
+        fit : list
+              the output of monofit() (None if the fit failed)
+        error : Exception
+                the error raised within the fit (None if the fit succeeded)
+        '''
+
+        Nfits = len(datasets)
+
+        def batchlist(x):
+            if isinstance(x, dict):
+                return [x] * Nfits
+            assert len(x) == Nfits, ('the number of dicts must be equal ' +
+                                     'to the number of datasets')
+            return list(x)
+
+        param_dicts = batchlist(param_dict)
+        bounds_dicts = batchlist(bounds_dict)
+        fixed_dicts = batchlist(fixed_dict)
+        param_dyn_dicts = batchlist(param_dyn_dict)
+
+        # check if all datasets share the same model-parameters
+        # (the _fnevals function is called with positional arguments!)
+        param_keys = [list(self._get_param_R(V, SRF, i, j).keys())
+                      for i, j in zip(param_dicts, fixed_dicts)]
+        assert all(i == param_keys[0] for i in param_keys), (
+            'the parameters of V and SRF must be equal for all datasets')
+
+        # generate the _fnevals function only once
+        if int_Q is True and Nfits > 0:
+            R = RT1(1., 0., 0., 0., 0., V=V, SRF=SRF, geometry='mono',
+                    bsf=bsf,
+                    param_dict=self._get_param_R(V, SRF, param_dicts[0],
+                                                 fixed_dicts[0]),
+                    int_Q=int_Q, lambda_backend=lambda_backend,
+                    fn_cache=fn_cache, verbosity=verbosity)
+            _fnevals = R._fnevals
+        else:
+            _fnevals = None
+
+        fitargs = dict(bsf=bsf, int_Q=int_Q, verbosity=verbosity, **kwargs)
+        initargs = (self.sig0, self.dB, V, SRF, _fnevals, fitargs)
+
+        tasks = ((i, datasets[i], param_dicts[i], bounds_dicts[i],
+                  fixed_dicts[i], param_dyn_dicts[i]) for i in range(Nfits))
+
+        if processes == 0:
+            # (the shared arguments are bound to the tasks of this call to
+            # allow concurrent generators of monofit_batch())
+            pool = None
+            results = map(partial(_fit_batch_task,
+                                  _get_batch_args(*initargs)), tasks)
+        else:
+            from multiprocessing import Pool, cpu_count
+
+            if processes is None:
+                processes = cpu_count()
+            if chunksize is None:
+                chunksize = max(1, int(np.ceil(Nfits / (4. * processes))))
+
+            pool = Pool(processes, initializer=_init_batch_worker,
+                        initargs=initargs)
+            results = pool.imap_unordered(_batch_worker, tasks, chunksize)
+
+        import timeit
+        tic = timeit.default_timer()
+        Nfailed = 0
+        try:
+            for n, (i, fit, error) in enumerate(results):
+                if error is not None:
+                    Nfailed += 1
+                    if verbosity >= 1:
+                        print('fit ' + str(i) + ' failed: ' + repr(error))
+                elif verbosity >= 2:
+                    print('fit ' + str(i) + ' finished (' + str(n + 1) +
+                          '/' + str(Nfits) + ')')
+
+                yield i, fit, error
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        toc = timeit.default_timer()
+        if verbosity >= 1:
+            print(str(Nfits) + ' fits (' + str(Nfailed) + ' failed) ' +
+                  'finished in ' + str(round(toc - tic, 2)) + ' sec (' +
+                  str(round(Nfits / max(toc - tic, 1e-12), 2)) +
+                  ' fits/sec)')
+
     def printresults(self, fit, truevals=None, startvals=False,
                      datelist=None, legends=True):
         '''
@@ -2167,3 +2391,39 @@ class Fits(Scatter):
             ax.set_ylabel(str(param))
 
         return fig
+
+
+# the arguments that are shared by all fits of monofit_batch()
+# (set once within each worker-process of a Pool by _init_batch_worker())
+_batch_args = {}
+
+
+def _get_batch_args(sig0, dB, V, SRF, _fnevals, fitargs):
+    # the arguments that are shared by all fits of monofit_batch()
+    return dict(fits=Fits(sig0=sig0, dB=dB), V=V, SRF=SRF,
+                _fnevals=_fnevals, fitargs=fitargs)
+
+
+def _init_batch_worker(*initargs):
+    _batch_args.clear()
+    _batch_args.update(_get_batch_args(*initargs))
+
+
+def _batch_worker(task):
+    # perform a single fit of monofit_batch() within a worker-process
+    return _fit_batch_task(_batch_args, task)
+
+
+def _fit_batch_task(args, task):
+    # perform a single fit of monofit_batch() with the provided
+    # shared arguments (see _get_batch_args())
+    i, dataset, param_dict, bounds_dict, fixed_dict, param_dyn_dict = task
+    try:
+        fit = args['fits'].monofit(
+            V=args['V'], SRF=args['SRF'], dataset=dataset,
+            param_dict=param_dict, bounds_dict=bounds_dict,
+            fixed_dict=fixed_dict, param_dyn_dict=dict(param_dyn_dict),
+            _fnevals_input=args['_fnevals'], **args['fitargs'])
+        return i, fit, None
+    except Exception as error:
+        return i, None, error
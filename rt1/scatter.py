@@ -7,13 +7,151 @@ This is the basis object for any Surface and Vollume objects
 from __future__ import print_function
 
 # general other imports
+from collections import OrderedDict
+import threading
+
+import numpy as np
 import sympy as sp
 
+from .fnevals import fused_fn_source, SourceFnevals
+
 
 class Scatter(object):
+    # a (size-limited) cache of the functions generated by _get_lambda()
+    # the cache is stored as a class-attribute to ensure that copies of
+    # Volume and Surface objects (e.g. generated via copy.deepcopy())
+    # share the compiled functions and that the objects remain pickleable
+    _lambda_cache = OrderedDict()
+    _lambda_cache_size = 128
+    # a lock to allow concurrent access to the cache from several threads
+    _lambda_lock = threading.Lock()
+
     def __init__(self):
         pass
 
+    def _get_lambda(self, key, expr, param_keys, probe_values=None):
+        '''
+        Get a (cached) function to numerically evaluate a sympy-expression
+        that depends on the angles (theta_0, theta_ex, phi_0, phi_ex) and the
+        provided parameters.
+
+        The function is only compiled (using sp.lambdify) if no function
+        is found in the cache for the given key and parameter-names.
+
+        Parameters
+        ----------
+        key : hashable
+              a key that uniquely identifies the expression
+              (e.g. the expression itself)
+        expr : sympy expression or callable
+               the expression to be compiled, or a function without
+               arguments that returns the expression (to avoid unnecessary
+               symbolic computations if the function is already cached)
+        param_keys : iterable(str)
+                     the names of the parameters (in the order as they
+                     are provided to the compiled function)
+        probe_values : list (default = None)
+                       parameter-values used to check if the compiled
+                       function returns array-outputs
+                       if None, 0.345 is used for all parameters
+
+        Returns
+        -------
+        callable
+            a function with the call-signature:
+                func(t_0, t_ex, p_0, p_ex, *param_values)
+        '''
+        param_keys = tuple(map(str, param_keys))
+        cachekey = (key, param_keys)
+
+        cache = Scatter._lambda_cache
+        with Scatter._lambda_lock:
+            func = cache.pop(cachekey, None)
+            if func is not None:
+                # re-insert the function to keep track of the usage order
+                cache[cachekey] = func
+                return func
+
+        if callable(expr) and not isinstance(expr, sp.Basic):
+            expr = expr()
+
+        args = (sp.Symbol('theta_0'), sp.Symbol('theta_ex'),
+                sp.Symbol('phi_0'), sp.Symbol('phi_ex')) + tuple(
+                    map(sp.Symbol, param_keys))
+
+        func = sp.lambdify(args, expr, modules=["numpy", "sympy"])
+
+        # in case expr is a constant, lambdify will produce a function with
+        # scalar output which is not suitable for further processing
+        # (this happens e.g. for the Isotropic brdf).
+        # The following query is implemented to ensure correct array-output:
+        # TODO this is not a proper test !
+        if probe_values is None:
+            probe_values = [.345 for i in param_keys]
+        if not isinstance(func(np.array([.1, .2, .3]), .1, .1, .1,
+                               *probe_values), np.ndarray):
+            func = np.vectorize(func)
+
+        with Scatter._lambda_lock:
+            cache[cachekey] = func
+            while len(cache) > Scatter._lambda_cache_size:
+                cache.popitem(last=False)
+
+        return func
+
+    def _get_diff_lambda(self, keys, param_keys):
+        '''
+        Get a (cached) function that evaluates _func and its derivatives
+        with respect to the provided parameters in a single pass
+        (a joint common-subexpression-elimination is performed for the
+        function and all derivatives, see rt1.fnevals.fused_fn_source())
+
+        Parameters
+        ----------
+        keys : iterable(str)
+               the names of the parameters for which the derivatives are
+               evaluated
+        param_keys : iterable(str)
+                     the names of the parameters (in the order as they
+                     are provided to the compiled function)
+
+        Returns
+        -------
+        callable
+            a function with the call-signature:
+                func(t_0, t_ex, p_0, p_ex, *param_values)
+            that returns a stacked array of the function-value and the
+            derivatives (in the order of keys)
+        '''
+        keys = tuple(map(str, keys))
+        param_keys = tuple(map(str, param_keys))
+        cachekey = (('diff', self._func, keys), param_keys)
+
+        cache = Scatter._lambda_cache
+        with Scatter._lambda_lock:
+            func = cache.pop(cachekey, None)
+            if func is not None:
+                # re-insert the function to keep track of the usage order
+                cache[cachekey] = func
+                return func
+
+        expr = sp.sympify(self._func)
+        exprs = [expr] + [sp.diff(expr, sp.Symbol(key)) for key in keys]
+
+        args = (sp.Symbol('theta_0'), sp.Symbol('theta_ex'),
+                sp.Symbol('phi_0'), sp.Symbol('phi_ex')) + tuple(
+                    map(sp.Symbol, param_keys))
+
+        func = SourceFnevals(fused_fn_source(exprs, args, name='diff'),
+                             name='diff')
+
+        with Scatter._lambda_lock:
+            cache[cachekey] = func
+            while len(cache) > Scatter._lambda_cache_size:
+                cache.popitem(last=False)
+
+        return func
+
     def scat_angle(self, t_0, t_ex, p_0, p_ex, a):
         """
         Function to return the generalized scattering angle with respect to the
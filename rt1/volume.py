@@ -66,31 +66,10 @@ class Volume(Scatter):
         array_like(float)
             Numerical value of the volume-scattering phase-function
         """
-        # define sympy objects
-        theta_0 = sp.Symbol('theta_0')
-        theta_ex = sp.Symbol('theta_ex')
-        phi_0 = sp.Symbol('phi_0')
-        phi_ex = sp.Symbol('phi_ex')
-
-        # replace arguments and evaluate expression
-        # sp.lambdify is used to allow array-inputs
-        # for python > 3.5 unpacking could be used, i.e.:
-        # pfunc = sp.lambdify((theta_0, theta_ex, phi_0, phi_ex,
-        #                     *param_dict.keys()),
-        #                    self._func, modules=["numpy", "sympy"])
-        args = (theta_0, theta_ex, phi_0, phi_ex) + tuple(param_dict.keys())
-        pfunc = sp.lambdify(args, self._func, modules=["numpy", "sympy"])
-
-        # in case _func is a constant, lambdify will produce a function with
-        # scalar output which is not suitable for further processing
-        # (this happens e.g. for the Isotropic brdf).
-        # The following query is implemented to ensure correct array-output:
-        # TODO this is not a proper test !
-        if not isinstance(pfunc(np.array([.1, .2, .3]),
-                                .1, .1, .1,
-                                *[i[0] for i in param_dict.values()]),
-                          np.ndarray):
-            pfunc = np.vectorize(pfunc)
+        # the function is only compiled (using sp.lambdify) once for
+        # each combination of _func and the keys of param_dict
+        pfunc = self._get_lambda(self._func, self._func, param_dict.keys(),
+                                 [i[0] for i in param_dict.values()])
 
         return pfunc(t_0, t_ex, p_0, p_ex, *param_dict.values())
 
@@ -203,37 +182,25 @@ class Volume(Scatter):
             else:
                 raise AssertionError('wrong choice of phi_ex geometry')
 
-        if geometry[1] == 'f':
-            dfunc_dtheta_0 = 0.
-        else:
-            func = self._func.xreplace({sp.Symbol('theta_0') : theta_0,
-                                        sp.Symbol('theta_ex') : theta_ex,
-                                        sp.Symbol('phi_0') : phi_0,
-                                        sp.Symbol('phi_ex') : phi_ex,})
+        def dfunc_dtheta_0():
+            if geometry[1] == 'f':
+                return 0.
+            else:
+                func = self._func.xreplace({sp.Symbol('theta_0') : theta_0,
+                                            sp.Symbol('theta_ex') : theta_ex,
+                                            sp.Symbol('phi_0') : phi_0,
+                                            sp.Symbol('phi_ex') : phi_ex,})
 
-            dfunc_dtheta_0 = sp.diff(func, theta_ex, n)
+                return sp.diff(func, theta_ex, n)
 
         if return_symbolic is True:
-            return dfunc_dtheta_0
+            return dfunc_dtheta_0()
         else:
-            args = (sp.Symbol('theta_0'),
-                    sp.Symbol('theta_ex'),
-                    sp.Symbol('phi_0'),
-                    sp.Symbol('phi_ex')) + tuple(param_dict.keys())
-
-
-            pfunc = sp.lambdify(args, dfunc_dtheta_0, modules=["numpy", "sympy"])
-
-            # in case _func is a constant, lambdify will produce a function with
-            # scalar output which is not suitable for further processing
-            # (this happens e.g. for the Isotropic brdf).
-            # The following query is implemented to ensure correct array-output:
-            # TODO this is not a proper test !
-            if not isinstance(pfunc(np.array([.1, .2, .3]),
-                                       .1, .1, .1,
-                                       *[.345 for i in param_dict.values()]),
-                              np.ndarray):
-                pfunc = np.vectorize(pfunc)
+            # the derivative is only evaluated and compiled once for each
+            # combination of _func, geometry, n and the keys of param_dict
+            pfunc = self._get_lambda(('theta_diff', self._func, geometry, n,
+                                      theta_0, theta_ex, phi_0, phi_ex),
+                                     dfunc_dtheta_0, param_dict.keys())
 
             return pfunc(t_0, t_ex, p_0, p_ex, *param_dict.values())
 
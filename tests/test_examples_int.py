@@ -66,6 +66,32 @@ class TestExamples(unittest.TestCase):
 
         self.assertTrue(np.allclose(self.int_num_2, R.calc()[3], atol=1e-6))
 
+    def test_example_1_int_numeric(self):
+        inc = self.inc1
+
+        # ---- evaluation of first example using numerical fn-coefficients
+        V = Rayleigh(tau=0.7, omega=0.3)
+        SRF = CosineLobe(ncoefs=11, i=5, NormBRDF=np.pi)
+
+        R = RT1(1., np.deg2rad(inc), np.deg2rad(inc),
+                np.zeros_like(inc), np.full_like(inc, np.pi),
+                V=V, SRF=SRF, geometry='mono', lambda_backend='numeric')
+
+        self.assertTrue(np.allclose(self.int_num_1, R.calc()[3]))
+
+    def test_example_2_int_numeric(self):
+        inc = self.inc2
+
+        # ---- evaluation of second example using numerical fn-coefficients
+        V = HenyeyGreenstein(tau=0.7, omega=0.3, t=0.7, ncoefs=20)
+        SRF = CosineLobe(ncoefs=10, i=5, NormBRDF=np.pi)
+
+        R = RT1(1., np.deg2rad(inc), np.deg2rad(inc),
+                np.zeros_like(inc), np.full_like(inc, np.pi),
+                V=V, SRF=SRF, geometry='mono', lambda_backend='numeric')
+
+        self.assertTrue(np.allclose(self.int_num_2, R.calc()[3], atol=1e-6))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy as np
+import sympy as sp
+import shutil
+import tempfile
+
+import sys
+sys.path.append('..')
+from rt1.rt1 import RT1
+from rt1.fncache import FnCache
+from rt1.volume import Rayleigh
+from rt1.surface import CosineLobe
+
+
+class TestFnCache(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.inc = np.deg2rad(np.linspace(20., 60., 10))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def getR(self, ncoefs=5, fn_cache=None, **kwargs):
+        V = Rayleigh(tau=0.7, omega=0.3)
+        SRF = CosineLobe(ncoefs=ncoefs, i=5, NormBRDF=np.pi)
+        return RT1(1., self.inc, self.inc, np.zeros_like(self.inc),
+                   np.full_like(self.inc, np.pi), V=V, SRF=SRF,
+                   geometry='mono', fn_cache=fn_cache, verbosity=0,
+                   **kwargs)
+
+    def test_warm_start(self):
+        cache = FnCache(self.path)
+
+        # cold start
+        Iint = self.getR(fn_cache=cache).calc()[3]
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 0)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
+
+        # warm start (the path is used to initialize a new cache-object)
+        R = self.getR(fn_cache=self.path)
+        self.assertTrue(np.allclose(R.calc()[3], Iint))
+        self.assertEqual(R.fn_cache.stats()['hits'], 1)
+        self.assertEqual(R.fn_cache.stats()['misses'], 0)
+
+        # the stored fn-coefficients must be equal to the calculated ones
+        # (the fn-coefficients are stored as (evaluated) srepr-strings)
+        R_ref = self.getR()
+        for fn_cached, fn_ref in zip(R.fn, R_ref.fn):
+            self.assertEqual(fn_cached, sp.sympify(sp.srepr(fn_ref)))
+
+    def test_provided_fn(self):
+        # provided fn-coefficients must neither be stored in the cache
+        # nor be replaced by cached values
+        cache = FnCache(self.path)
+        R_ref = self.getR()
+        Iint = R_ref.calc()[3]
+
+        R = self.getR(fn_cache=cache, fn_input=[2 * i for i in R_ref.fn])
+        self.assertTrue(np.allclose(R.calc()[3], 2. * Iint))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+        self.assertTrue(np.allclose(self.getR(fn_cache=cache).calc()[3],
+                                    Iint))
+        R = self.getR(fn_cache=cache, fn_input=[2 * i for i in R_ref.fn])
+        self.assertTrue(np.allclose(R.calc()[3], 2. * Iint))
+
+    def test_signature(self):
+        cache = FnCache(self.path)
+        key1 = cache.key(self.getR(ncoefs=5))
+        key2 = cache.key(self.getR(ncoefs=6))
+        key3 = cache.key(self.getR(ncoefs=5, lambda_backend='sympy'))
+
+        self.assertEqual(key1, cache.key(self.getR(ncoefs=5)))
+        self.assertNotEqual(key1, key2)
+        self.assertNotEqual(key1, key3)
+
+    def test_eviction(self):
+        cache = FnCache(self.path)
+        self.getR(ncoefs=3, fn_cache=cache).calc()
+        size = cache.stats()['size']
+
+        # only a single entry fits into the cache
+        cache.max_size = 1.05 * size
+        self.getR(ncoefs=2, fn_cache=cache).calc()
+
+        stats = cache.stats()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['evictions'], 1)
+
+        # the least recently used entry has been removed
+        self.assertIsNone(cache.get(cache.key(self.getR(ncoefs=3))))
+        self.assertIsNotNone(cache.get(cache.key(self.getR(ncoefs=2))))
+
+        cache.clear()
+        self.assertEqual(cache.stats()['entries'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
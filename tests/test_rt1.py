@@ -2,15 +2,21 @@
 
 import unittest
 import numpy as np
+import sympy as sp
 
 import sys
+import pickle
 sys.path.append('..')
-from rt1.rt1 import RT1
+from rt1.rt1 import RT1, iter_chunks
+from rt1.fnquadrature import QuadratureFnevals
+from rt1.fntensor import TensorFnevals
+from rt1.fninterp import ChebyshevFnevals
 from rt1.volume import Rayleigh, HenyeyGreenstein
 # from rt1.coefficients import RayleighIsotropic
 from rt1.surface import Isotropic, CosineLobe
+from rt1.surface import HenyeyGreenstein as HGsurface
 
-from scipy.special import gamma
+from scipy.special import gamma, expi, expn
 
 
 class TestRT1(unittest.TestCase):
@@ -151,6 +157,550 @@ class TestRT1(unittest.TestCase):
         # r = RT._get_fn(0, RT.theta_0, RT.phi_0)
         # self.assertEqual(r,1./(2.*np.pi))
 
+    def test_calc_Fint(self):
+        # compare the (chunked) evaluation of F_int with a direct
+        # evaluation of the series-terms
+        t_0 = np.deg2rad(np.linspace(20., 70., 12)).reshape(4, 3)
+        tau = np.array([0.1, 0.5, 1., 1.5])
+        V = Rayleigh(tau=tau, omega=0.3)
+        S = CosineLobe(ncoefs=5, i=5, NormBRDF=np.pi)
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                 np.full_like(t_0, np.pi), V=V, SRF=S, geometry='mono',
+                 verbosity=0)
+        mu1, mu2, phi1, phi2 = RT._mu_0, RT._mu_ex, RT.p_0, RT.p_ex
+
+        fn = np.broadcast_arrays(*RT._fnevals(np.arccos(mu1), phi1,
+                                              np.arccos(mu2), phi2))
+        tau = RT.V.tau
+        hlp1 = (np.exp(-tau / mu1) * np.log(mu1 / (1. - mu1))
+                - expi(-tau) + np.exp(-tau / mu1) * expi(tau / mu1 - tau))
+        ref = 0.
+        for n in range(len(fn)):
+            S2 = sum(mu1 ** (-k) * (expn(k + 1., tau) - np.exp(-tau / mu1) / k)
+                     for k in range(1, n + 2))
+            ref = ref + fn[n] * mu1 ** (n + 1) * (S2 + hlp1)
+
+        self.assertTrue(np.allclose(RT._calc_Fint(mu1, mu2, phi1, phi2), ref))
+
+        # evaluation in chunks of 2 rows
+        RT._Fint_chunksize = 6
+        self.assertTrue(np.allclose(RT._calc_Fint(mu1, mu2, phi1, phi2), ref))
+
+    def test_calc_Fint_pair(self):
+        # the pair of F_int terms must be equal to separate evaluations
+        t_0 = np.deg2rad(np.linspace(20., 70., 12)).reshape(4, 3)
+        V = Rayleigh(tau=np.array([0.1, 0.5, 1., 1.5]), omega=0.3)
+        S = HGsurface(ncoefs=5, t=sp.Symbol('g'), NormBRDF=0.3,
+                      a=[1., 1., 1.])
+        param_dict = {'g': np.array([[0.4]])}
+
+        for geometry, t_ex in [('mono', t_0), ('vvvv', t_0 + 0.1)]:
+            RT = RT1(self.I0, t_0, t_ex, np.zeros_like(t_0),
+                     np.full_like(t_0, np.pi), V=V, SRF=S,
+                     geometry=geometry, param_dict=param_dict,
+                     eval_cache=True, verbosity=0)
+            mu_0, mu_ex, p_0, p_ex = RT._mu_0, RT._mu_ex, RT.p_0, RT.p_ex
+
+            ref1 = RT._calc_Fint(mu_0, mu_ex, p_0, p_ex, ['tau', 'g'])
+            ref2 = RT._calc_Fint(mu_ex, mu_0, p_ex, p_0, ['tau', 'g'])
+
+            for RT._Fint_chunksize in [50000, 6]:
+                res1, res2 = RT._calc_Fint_pair(['tau', 'g'])
+                for res, ref in [(res1, ref1), (res2, ref2)]:
+                    self.assertTrue(np.allclose(res[0], ref[0]))
+                    for key in ['tau', 'g']:
+                        self.assertTrue(np.allclose(res[1][key],
+                                                    ref[1][key]))
+
+            # for the monostatic geometry F_int is evaluated only once
+            entries = RT._eval_cache.entries
+            self.assertEqual(geometry == 'mono', 'fn12' not in entries)
+            # the fn-coefficients are not cached if they are evaluated
+            # in several chunks
+            self.assertTrue('fn1' not in entries and 'fn2' not in entries)
+
+    def test_cse_fused(self):
+        # the fused cse-backend must give the same fn-coefficients as the
+        # cse-backend and return a stacked array
+        t_0 = np.deg2rad(np.linspace(20., 70., 12))
+        p_ex = np.full_like(t_0, np.pi)
+        V = HenyeyGreenstein(tau=0.7, omega=0.3, t=0.4, ncoefs=4)
+        S = CosineLobe(ncoefs=4, i=5, NormBRDF=np.pi)
+
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0), p_ex, V=V, SRF=S,
+                 geometry='vvvv', lambda_backend='cse', verbosity=0)
+        RT_fused = RT1(self.I0, t_0, t_0, np.zeros_like(t_0), p_ex, V=V,
+                       SRF=S, geometry='vvvv', lambda_backend='cse_fused',
+                       fn_input=RT.fn, verbosity=0)
+
+        args = (t_0, np.zeros_like(t_0), t_0, p_ex)
+        res = np.broadcast_arrays(*RT._fnevals(*args))
+        res_fused = RT_fused._fnevals(*args)
+
+        self.assertEqual(res_fused.shape, (len(RT.fn), len(t_0)))
+        self.assertTrue(np.allclose(res, res_fused))
+        self.assertTrue(np.allclose(RT.calc(), RT_fused.calc()))
+
+    def test_interaction_expansion(self):
+        # the fn-coefficients obtained via the recurrence-relation of the
+        # legendre-polynomials must be equal to the ones obtained by a
+        # direct expansion of the legendre-expansions
+        t_0 = np.deg2rad(np.linspace(20., 70., 12))
+        p_ex = np.full_like(t_0, np.pi)
+        V = HenyeyGreenstein(tau=0.7, omega=0.3, t=0.4, ncoefs=5)
+        S = CosineLobe(ncoefs=4, i=5, NormBRDF=np.pi)
+
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0), p_ex, V=V, SRF=S,
+                 geometry='vvvv', verbosity=0)
+        RT_direct = RT1(self.I0, t_0, t_0, np.zeros_like(t_0), p_ex, V=V,
+                        SRF=S, geometry='vvvv', verbosity=0)
+        RT_direct._split_legexpansion = lambda expr: None
+
+        self.assertEqual(len(RT.fn), V.ncoefs + S.ncoefs - 1)
+
+        args = (t_0, np.zeros_like(t_0), t_0 + 0.1, p_ex)
+        self.assertTrue(np.allclose(RT._fnevals(*args),
+                                    RT_direct._fnevals(*args)))
+
+    def test_numeric_fn(self):
+        # the numerically evaluated fn-coefficients must be equal to the
+        # symbolic ones (also for parameter-dependent legendre-coefficients)
+        t_0 = np.deg2rad(np.linspace(20., 70., 12))
+        p_ex = np.full_like(t_0, np.pi)
+        V = HenyeyGreenstein(tau=0.7, omega=0.3, t=sp.Symbol('t_v'),
+                             ncoefs=5)
+        S = CosineLobe(ncoefs=4, i=5, NormBRDF=np.pi)
+        param_dict = {'t_v': np.linspace(0.1, 0.5, 12)}
+
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0), p_ex, V=V, SRF=S,
+                 geometry='vvvv', param_dict=param_dict, verbosity=0)
+        RT_num = RT1(self.I0, t_0, t_0, np.zeros_like(t_0), p_ex, V=V,
+                     SRF=S, geometry='vvvv', param_dict=param_dict,
+                     lambda_backend='numeric', verbosity=0)
+
+        args = (t_0, 0.3 * t_0, t_0 + 0.1, p_ex, param_dict['t_v'])
+        res = np.broadcast_arrays(*RT._fnevals(*args))
+        res_num = RT_num._fnevals(*args)
+
+        self.assertEqual(res_num.shape, (len(RT.fn), len(t_0)))
+        self.assertTrue(np.allclose(res, res_num))
+
+        # increasing the number of quadrature-nodes has no effect
+        fnevals = QuadratureFnevals(V, S, param_dict.keys(), n_theta=20,
+                                    n_phi=20, chunksize=5)
+        self.assertTrue(np.allclose(fnevals(*args), res_num))
+
+        # too few nodes give inaccurate results
+        fnevals = QuadratureFnevals(V, S, param_dict.keys(), n_theta=4,
+                                    n_phi=4)
+        self.assertFalse(np.allclose(fnevals(*args), res_num))
+
+    def test_tensor_fn(self):
+        # the polynomial-tensor representation of the fn-coefficients
+        # (and of their derivatives) must be equal to the symbolic one
+        t_0 = np.deg2rad(np.linspace(20., 70., 12))
+        p_ex = np.full_like(t_0, np.pi)
+        V = HenyeyGreenstein(tau=0.7, omega=0.3, t=sp.Symbol('t_v'),
+                             ncoefs=5)
+        S = CosineLobe(ncoefs=4, i=5, NormBRDF=np.pi)
+        param_dict = {'t_v': np.linspace(0.1, 0.5, 12)}
+
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0), p_ex, V=V, SRF=S,
+                 geometry='vvvv', param_dict=param_dict, verbosity=0)
+        RT_tens = RT1(self.I0, t_0, t_0, np.zeros_like(t_0), p_ex, V=V,
+                      SRF=S, geometry='vvvv', param_dict=param_dict,
+                      lambda_backend='tensor', verbosity=0)
+
+        args = (t_0, 0.3 * t_0, t_0 + 0.1, p_ex, param_dict['t_v'])
+        res = np.broadcast_arrays(*RT._fnevals(*args))
+        res_tens = RT_tens._fnevals(*args)
+
+        self.assertTrue(isinstance(RT_tens._fnevals, TensorFnevals))
+        self.assertEqual(res_tens.shape, (len(RT.fn), len(t_0)))
+        self.assertTrue(np.allclose(res, res_tens))
+
+        # the tensor can also be generated from the fn-coefficients
+        fnevals = TensorFnevals.from_fn(RT.fn, sp.symbols(
+            'theta_0, phi_0, theta_ex, phi_ex, t_v'), chunksize=5)
+        self.assertTrue(np.allclose(fnevals(*args), res_tens))
+
+        dres = np.broadcast_arrays(*RT._get_dfnevals('t_v')(*args))
+        dres_tens = RT_tens._get_dfnevals('t_v')
+        self.assertTrue(isinstance(dres_tens, TensorFnevals))
+        self.assertTrue(np.allclose(dres, dres_tens(*args)))
+
+    def test_chebyshev_fn(self):
+        # the interpolated fn-coefficients must be within the tolerance
+        t_0 = np.deg2rad(np.linspace(20., 70., 200))
+        V = Rayleigh(tau=0.7, omega=0.3)
+        S = HGsurface(ncoefs=8, t=sp.Symbol('t_s'), NormBRDF=0.3,
+                      a=[1., 1., 1.])
+        param_dict = {'t_s': np.repeat([0.1, 0.3], 100)}
+
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                 np.full_like(t_0, np.pi), V=V, SRF=S, geometry='mono',
+                 param_dict=param_dict, verbosity=0)
+        fnevals = ChebyshevFnevals(RT._fnevals, tol=1e-10)
+        RT_int = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                     np.full_like(t_0, np.pi), V=V, SRF=S, geometry='mono',
+                     param_dict=param_dict, _fnevals_input=fnevals,
+                     verbosity=0)
+
+        args = (t_0, 0., t_0, np.pi, param_dict['t_s'])
+        res = np.broadcast_arrays(t_0, *RT._fnevals(*args))[1:]
+        res_int = fnevals(*args)
+        self.assertTrue(fnevals.n_nodes > 0)
+        self.assertTrue(fnevals.error <= 1e-10)
+        self.assertEqual(len(fnevals._tables), 2)
+        self.assertTrue(np.allclose(res, res_int, rtol=0., atol=1e-10))
+        self.assertTrue(np.allclose(RT.calc(), RT_int.calc()))
+
+        # angles outside of the interpolation-range are evaluated exactly
+        args = (t_0 + 0.2, 0., t_0, np.pi, param_dict['t_s'])
+        res = np.broadcast_arrays(t_0, *RT._fnevals(*args))[1:]
+        self.assertTrue(np.allclose(res, fnevals(*args), rtol=0.,
+                                    atol=1e-10))
+
+        # tables are only generated if they are used for enough samples
+        args = (t_0, 0., t_0, np.pi, np.linspace(0.1, 0.3, 200))
+        res = np.broadcast_arrays(t_0, *RT._fnevals(*args))[1:]
+        self.assertTrue(np.allclose(res, fnevals(*args)))
+        self.assertEqual(len(fnevals._tables), 2)
+
+        fnevals = pickle.loads(pickle.dumps(fnevals))
+        self.assertTrue(np.allclose(res, fnevals(*args)))
+
+    def test_chebyshev_fn_refine(self):
+        # the tolerance must also be reached for parameter-values that
+        # require more grid-nodes than the parameters of the first call
+        t_0 = np.deg2rad(np.linspace(10., 80., 300))
+        V = HenyeyGreenstein(tau=0.7, omega=0.3, t=0.2, ncoefs=6)
+        S = HGsurface(ncoefs=12, t=sp.Symbol('t_s'), NormBRDF=0.3,
+                      a=[1., 1., 1.])
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                 np.full_like(t_0, np.pi), V=V, SRF=S, geometry='mono',
+                 param_dict={'t_s': 0.05}, lambda_backend='tensor',
+                 verbosity=0)
+        fnevals = ChebyshevFnevals(RT._fnevals, tol=1e-8)
+
+        for t_s in [0.05, 0.4, 0.7]:
+            args = (t_0, 0., t_0, np.pi, np.full_like(t_0, t_s))
+            res = np.broadcast_arrays(t_0, *RT._fnevals(*args))[1:]
+            self.assertTrue(np.allclose(res, fnevals(*args), rtol=0.,
+                                        atol=1e-8), msg=t_s)
+
+        n_nodes = [len(i) for i in fnevals._tables.values()]
+        self.assertEqual(n_nodes[0], fnevals.n_nodes)
+        self.assertTrue(max(n_nodes) > fnevals.n_nodes)
+
+        # tables that can not reach the tolerance are evaluated exactly
+        fnevals = ChebyshevFnevals(RT._fnevals, tol=1e-8, max_nodes=16)
+        for t_s in [0.05, 0.7]:
+            args = (t_0, 0., t_0, np.pi, np.full_like(t_0, t_s))
+            res = np.broadcast_arrays(t_0, *RT._fnevals(*args))[1:]
+            self.assertTrue(np.allclose(res, fnevals(*args), rtol=0.,
+                                        atol=1e-8), msg=t_s)
+        self.assertTrue(any(i is None for i in fnevals._tables.values()))
+
+    def test_pickle(self):
+        # RT1-objects (including the _fnevals functions) must be pickleable
+        # for all lambda_backends
+        backends = ['cse', 'cse_fused', 'sympy', 'numeric', 'tensor']
+        try:
+            import symengine
+            backends += ['symengine', 'cse_symengine_sympy',
+                         'cse_seng_sp_newlambdify']
+        except ImportError:
+            pass
+
+        t_0 = np.deg2rad(np.linspace(20., 70., 6))
+        V = Rayleigh(tau=0.7, omega=0.3)
+        S = CosineLobe(ncoefs=4, i=5, NormBRDF=np.pi)
+
+        ref = None
+        for backend in backends:
+            RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                     np.full_like(t_0, np.pi), V=V, SRF=S, geometry='mono',
+                     lambda_backend=backend, verbosity=0)
+            res = RT.calc()
+            if ref is None:
+                ref = res
+            self.assertTrue(np.allclose(res, ref), msg=backend)
+
+            RT_pickled = pickle.loads(pickle.dumps(RT))
+            self.assertTrue(np.allclose(RT_pickled.calc(), ref),
+                            msg=backend)
+
+    def test_evaluate(self):
+        # evaluate() must not change the RT1-object and must give the same
+        # results as calc() (also if some tau-values are zero)
+        t_0 = np.deg2rad(np.array([np.linspace(20., 70., 5)] * 4))
+        V = Rayleigh(tau=np.array([0.7, 0., 0.2, 0.]), omega=0.3)
+        S = CosineLobe(ncoefs=4, i=5, NormBRDF=np.pi)
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                 np.full_like(t_0, np.pi), V=V, SRF=S, geometry='mono',
+                 verbosity=0)
+        ref = RT.calc()
+        self.assertTrue(np.allclose(ref[2][[1, 3]], 0.))
+        self.assertTrue(np.allclose(ref[3][[1, 3]], 0.))
+
+        t_0_new = t_0[:, ::-1]
+        params = {'tau': np.array([0.1, 0.3, 0., 0.5]),
+                  'omega': np.array([0.1, 0.2, 0.3, 0.4])}
+        res = RT.evaluate((t_0_new, t_0_new, np.zeros_like(t_0),
+                           np.full_like(t_0, np.pi)), params)
+
+        self.assertTrue(np.allclose(RT.calc(), ref))
+        self.assertTrue(np.allclose(RT.V.tau[:, 0], [0.7, 0., 0.2, 0.]))
+        self.assertTrue(np.allclose(RT.t_0, t_0))
+
+        RT.t_0 = t_0_new
+        RT.V.tau = params['tau']
+        RT.V.omega = params['omega']
+        self.assertTrue(np.allclose(res, RT.calc()))
+
+    def test_calc_workers(self):
+        # the chunked evaluation on a thread-pool must give the same results
+        # as the evaluation of all samples at once
+        t_0 = np.deg2rad(np.array([np.linspace(20., 40., 5)] * 7))
+        V = Rayleigh(tau=np.array([0., 0., 0.7, 0.2, 0., 0.5, 0.1]),
+                     omega=0.3)
+        S = CosineLobe(ncoefs=4, i=5, NormBRDF=np.pi)
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                 np.full_like(t_0, np.pi), V=V, SRF=S, geometry='mono',
+                 verbosity=0)
+
+        res = RT.calc(workers=2, chunksize=10)
+        self.assertTrue(np.allclose(res, RT.calc()))
+
+        jac = RT.jacobian(dB=True, workers=2, chunksize=10)
+        self.assertTrue(np.allclose(jac, RT.jacobian(dB=True)))
+
+    def test_calc_workers_cache(self):
+        # chunks that are evaluated concurrently use separate caches and
+        # dedup-statistics
+        t_0 = np.deg2rad(np.array([np.linspace(20., 40., 5)] * 40))
+        V = Rayleigh(tau=np.linspace(0.1, 0.8, 40), omega=0.3)
+        S = CosineLobe(ncoefs=4, i=5, NormBRDF=np.pi)
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                 np.full_like(t_0, np.pi), V=V, SRF=S, geometry='mono',
+                 eval_cache=True, verbosity=0)
+        RT_ref = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                     np.full_like(t_0, np.pi), V=V, SRF=S, geometry='mono',
+                     verbosity=0)
+        ref = RT_ref.calc()
+
+        for i in range(3):
+            self.assertTrue(np.allclose(RT.calc(workers=4, chunksize=10),
+                                        ref))
+        self.assertEqual(len(RT._eval_cache.chunks), 20)
+        self.assertTrue(RT.eval_cache_info['hits'] > 0)
+        # (the repeated evaluations only use cached values)
+        self.assertEqual(RT.dedup_info['samples'],
+                         RT_ref.dedup_info['samples'])
+
+        # different parameters are correctly re-evaluated
+        params = {'omega': 0.1, 'tau': np.linspace(0.2, 0.5, 40)}
+        self.assertTrue(np.allclose(
+            RT.evaluate(params=params, workers=4, chunksize=10),
+            RT_ref.evaluate(params=params)))
+
+    def test_calc_stream(self):
+        # the results of the chunks must be equal to the results of calc()
+        t_0 = np.deg2rad(np.array([np.linspace(20., 40., 5)] * 7))
+        tau = np.array([0., 0., 0.7, 0.2, 0., 0.5, 0.1])
+        V = Rayleigh(tau=tau, omega=0.3)
+        S = CosineLobe(ncoefs=4, i=5, NormBRDF=np.pi)
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                 np.full_like(t_0, np.pi), V=V, SRF=S, geometry='mono',
+                 verbosity=0)
+        ref = RT.calc()
+
+        chunks = iter_chunks((t_0, t_0, np.zeros_like(t_0),
+                              np.full_like(t_0, np.pi)),
+                             {'tau': tau}, rows=3)
+        out = tuple(np.empty_like(t_0) for i in range(4))
+        nchunks = 0
+        for res in RT.calc_stream(chunks, out=out):
+            self.assertTrue(len(res[0]) <= 3)
+            nchunks += 1
+        self.assertEqual(nchunks, 3)
+        self.assertTrue(np.allclose(out, ref))
+
+    def test_select_rows(self):
+        # parameters that are given for each column of a square array of
+        # angles must not be split into rows if some tau-values are zero
+        t_0 = np.deg2rad(np.array([np.linspace(20., 50., 4)] * 4))
+        tau = np.array([0.5, 0., 0.5, 0.5])
+        g = np.array([0.1, 0.2, 0.3, 0.4])
+        S = HGsurface(ncoefs=6, t=sp.Symbol('g'), NormBRDF=0.3)
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                 np.full_like(t_0, np.pi), V=Rayleigh(tau=tau, omega=0.3),
+                 SRF=S, geometry='mono', param_dict={'g': g}, verbosity=0)
+        res = RT.calc()
+
+        # compare against the evaluation of each row
+        for n in range(4):
+            RT_row = RT1(self.I0, t_0[n], t_0[n], np.zeros_like(t_0[n]),
+                         np.full_like(t_0[n], np.pi),
+                         V=Rayleigh(tau=tau[n], omega=0.3), SRF=S,
+                         geometry='mono', param_dict={'g': g}, verbosity=0)
+            for i, j in zip(res, RT_row.calc()):
+                self.assertTrue(np.allclose(i[n], j))
+
+    def test_iter_chunks(self):
+        # parameters that are given for each column of a square array of
+        # angles must be used for all chunks
+        t_0 = np.deg2rad(np.array([np.linspace(20., 50., 4)] * 4))
+        angles = (t_0, t_0, np.zeros_like(t_0), np.full_like(t_0, np.pi))
+        params = {'tau': np.array([0.5, 0.2, 0.3, 0.4]),
+                  'g': np.array([0.1, 0.2, 0.3, 0.4])}
+
+        chunks = list(iter_chunks(angles, params, rows=2))
+        self.assertEqual(len(chunks), 2)
+        for chunk_angles, chunk_params in chunks:
+            self.assertEqual(chunk_angles[0].shape, (2, 4))
+            self.assertEqual(chunk_params['tau'].shape, (2,))
+            self.assertTrue(np.array_equal(chunk_params['g'], params['g']))
+
+        S = HGsurface(ncoefs=6, t=sp.Symbol('g'), NormBRDF=0.3)
+        RT = RT1(self.I0, *angles, V=Rayleigh(tau=params['tau'], omega=0.3),
+                 SRF=S, geometry='mono', param_dict={'g': params['g']},
+                 verbosity=0)
+        res = np.concatenate([RT.evaluate(*chunk) for chunk in chunks],
+                             axis=1)
+        self.assertTrue(np.allclose(res, RT.calc()))
+
+    def test_eval_cache(self):
+        # cached intermediate results must only be used if the values
+        # they depend on are unchanged
+        t_0 = np.deg2rad(np.array([np.linspace(20., 40., 5)] * 3))
+        V = Rayleigh(tau=np.array([0.7, 0.2, 0.5]), omega=0.3)
+        S = CosineLobe(ncoefs=4, i=5, NormBRDF=np.pi)
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                 np.full_like(t_0, np.pi), V=V, SRF=S, geometry='mono',
+                 eval_cache=True, verbosity=0)
+        RT_ref = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                     np.full_like(t_0, np.pi), V=V, SRF=S, geometry='mono',
+                     verbosity=0)
+        self.assertTrue(RT_ref.eval_cache_info is None)
+
+        self.assertTrue(np.allclose(RT.calc(), RT_ref.calc()))
+        misses = RT.eval_cache_info['misses']
+
+        # changing omega and NormBRDF re-uses all cached values
+        params = {'omega': np.array([0.1, 0.2, 0.3]), 'NormBRDF': 0.2}
+        self.assertTrue(np.allclose(RT.evaluate(params=params),
+                                    RT_ref.evaluate(params=params)))
+        self.assertEqual(RT.eval_cache_info['misses'], misses)
+        self.assertTrue(RT.eval_cache_info['hits'] > 0)
+
+        # changing tau invalidates the cached values
+        params = {'tau': np.array([0.1, 0.2, 0.3])}
+        self.assertTrue(np.allclose(RT.evaluate(params=params),
+                                    RT_ref.evaluate(params=params)))
+        self.assertTrue(RT.eval_cache_info['misses'] > misses)
+
+        # the cached values are not pickled
+        RT_pickled = pickle.loads(pickle.dumps(RT))
+        self.assertEqual(len(RT_pickled._eval_cache.entries), 0)
+        self.assertTrue(np.allclose(RT_pickled.calc(), RT_ref.calc()))
+
+    def test_dedup(self):
+        # repeated incidence-angles are evaluated only once
+        inc = np.tile(np.deg2rad([25., 35., 45.]), (20, 1))
+        V = Rayleigh(tau=np.linspace(0.1, 0.5, 20), omega=0.3)
+        S = HGsurface(ncoefs=6, t=sp.Symbol('g'), NormBRDF=0.3,
+                      a=[1., 1., 1.])
+
+        RT = RT1(self.I0, inc, inc, np.zeros_like(inc),
+                 np.full_like(inc, np.pi), V=V, SRF=S, geometry='mono',
+                 param_dict={'g': np.array([[0.4]])}, verbosity=0)
+        res = RT.calc()
+
+        self.assertEqual(RT.dedup_info['samples'],
+                         RT.dedup_info['evaluations'] * 20)
+        self.assertEqual(RT.dedup_info['ratio'], 20.)
+
+        # deduplication is skipped if the uniqueness is high
+        RT_direct = RT1(self.I0, inc, inc, np.zeros_like(inc),
+                        np.full_like(inc, np.pi), V=V, SRF=S,
+                        geometry='mono', param_dict={'g': np.array([[0.4]])},
+                        verbosity=0)
+        RT_direct._dedup_threshold = 0.
+        self.assertTrue(np.allclose(res, RT_direct.calc()))
+        self.assertEqual(RT_direct.dedup_info['ratio'], 1.)
+
+        # unique parameter-values for each row
+        RT.param_dict = {'g': np.linspace(0.2, 0.4, 20)[:, np.newaxis]}
+        RT_direct.param_dict = RT.param_dict
+        self.assertTrue(np.allclose(RT.calc(), RT_direct.calc()))
+
+    def test_geometry(self):
+        # the angle- and attenuation-terms are evaluated only once and
+        # re-evaluated if the angles or tau change
+        t_0 = np.deg2rad(np.linspace(20., 70., 6))
+        RT = RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                 np.full_like(t_0, np.pi), V=Rayleigh(tau=0.7, omega=0.3),
+                 SRF=self.S, geometry='vvvv', verbosity=0)
+
+        mu_0, att = RT._mu_0, RT._attenuation()
+        self.assertTrue(RT._mu_0 is mu_0)
+        self.assertTrue(RT._attenuation() is att)
+        self.assertTrue(np.allclose(att, np.exp(-2. * 0.7 / np.cos(t_0))))
+
+        # assigning tau only invalidates the terms that depend on tau
+        RT.V.tau = 0.5
+        self.assertTrue(RT._mu_0 is mu_0)
+        self.assertTrue(np.allclose(RT._attenuation(),
+                                    np.exp(-2. * 0.5 / np.cos(t_0))))
+
+        RT.t_0 = t_0 + 0.1
+        self.assertTrue(np.allclose(RT._mu_0, np.cos(t_0 + 0.1)))
+        self.assertTrue(np.allclose(RT._mu_ex, np.cos(t_0)))
+
+        # copies use separate terms
+        RT_copy = RT._copy()
+        RT_copy.t_0 = t_0
+        self.assertTrue(np.allclose(RT._mu_0, np.cos(t_0 + 0.1)))
+        self.assertTrue(np.allclose(RT_copy._mu_0, np.cos(t_0)))
+
+        # arrays that are modified in-place are used after they are
+        # assigned again
+        RT_copy.t_0 = t_0.copy()
+        self.assertTrue(np.allclose(RT_copy._mu_0, np.cos(t_0)))
+        RT_copy.t_0[:] = t_0 + 0.2
+        RT_copy.t_0 = RT_copy.t_0
+        self.assertTrue(np.allclose(RT_copy._mu_0, np.cos(t_0 + 0.2)))
+
+    def test_jacobian(self):
+        # the derivatives with respect to the symbols used in V and SRF
+        # must be equal to central differences of the model
+        t_0 = np.deg2rad(np.array([np.linspace(20., 60., 5)] * 2))
+
+        def get_RT(params):
+            return RT1(self.I0, t_0, t_0, np.zeros_like(t_0),
+                       np.full_like(t_0, np.pi),
+                       V=HenyeyGreenstein(t=sp.Symbol('v'), ncoefs=4,
+                                          omega=0.3, tau=0.5),
+                       SRF=HGsurface(ncoefs=6, t=sp.Symbol('g'),
+                                     NormBRDF=0.2),
+                       geometry='mono', bsf=0.1, param_dict=params,
+                       verbosity=0)
+
+        params = {'v': np.array([[0.2], [0.3]]), 'g': np.array([[0.4]])}
+        jac = get_RT(params).jacobian(dB=True, param_list=['v', 'g'])
+
+        for key, jac_key in zip(['v', 'g'], jac):
+            dp = dict(params)
+            dp[key] = params[key] + 1e-6
+            dm = dict(params)
+            dm[key] = params[key] - 1e-6
+            diff = (10. * np.log10(get_RT(dp).calc()[0]) -
+                    10. * np.log10(get_RT(dm).calc()[0])) / 2e-6
+
+            self.assertTrue(np.allclose(jac_key, diff, atol=1e-5), msg=key)
+
 
 # todo test for tau-omgea zero order
 
@@ -3,6 +3,7 @@ Test the fits-module by generating a dataset and fitting the model to itself
 """
 
 import unittest
+import pickle
 
 # import matplotlib.pyplot as plt
 import numpy as np
@@ -10,7 +11,7 @@ import sympy as sp
 from scipy.stats import linregress
 
 from rt1.rt1 import RT1
-from rt1.rtfits import Fits
+from rt1.rtfits import Fits, ParameterLayout
 
 from rt1.volume import Rayleigh
 from rt1.surface import HenyeyGreenstein as HGsurface
@@ -350,6 +351,259 @@ class TestRTfits(unittest.TestCase):
             tmax=0.5,
         )
 
+    def test_preparedata(self):
+        # rectangularize a ragged dataset (with a missing value)
+        dataset = [[[.1, .2, .3], [1., 2., 3.]],
+                   [[.4], [4.]],
+                   [[.5, .6, .7], [5., np.nan, 7.]]]
+
+        inc, data, weights, N, mask = Fits()._preparedata(dataset)
+
+        self.assertEqual(N, 3)
+        self.assertTrue(np.allclose(inc, [[.1, .2, .3],
+                                          [.4, .4, .4],
+                                          [.5, .5, .7]]))
+        self.assertTrue(np.allclose(data, [1., 2., 3., 4., 4., 4.,
+                                           5., 5., 7.]))
+        self.assertTrue(np.allclose(weights**2, [1., 1., 1., 1. / 3.,
+                                                 1. / 3., 1. / 3., .5, .5,
+                                                 1.]))
+        self.assertTrue(np.array_equal(mask, [[False, False, False],
+                                              [False, True, True],
+                                              [False, True, False]]))
+
+    def test_calc_model(self):
+        # _calc_model must not alter the RT1-object and must give the same
+        # results as a direct calculation with the parameter-values
+        inc = np.array([np.deg2rad(np.linspace(25, 65, 10))] * 3)
+        a = sp.Symbol('a')
+        V = Rayleigh(omega=0.3, tau=2. * a**2)
+        SRF = HGsurface(ncoefs=8, t=sp.Symbol('t1'), NormBRDF=.3,
+                        a=[1., 1., 1.])
+        R = RT1(1., inc, inc, np.zeros_like(inc), np.full_like(inc, np.pi),
+                V=V, SRF=SRF, geometry='mono', param_dict={'t1': .2},
+                verbosity=0)
+
+        res_dict = {'a': np.array([.1, .2, .3]), 't1': np.array([.1, .2, .3])}
+        testfit = Fits(sig0=True, dB=True)
+        model = testfit._calc_model(R, res_dict)
+
+        self.assertEqual(R.V.tau[0], 2. * a**2)
+        self.assertEqual(R.param_dict, {'t1': .2})
+
+        R_ref = RT1(1., inc, inc, np.zeros_like(inc),
+                    np.full_like(inc, np.pi),
+                    V=Rayleigh(omega=0.3, tau=2. * res_dict['a']**2),
+                    SRF=HGsurface(ncoefs=8, t=sp.Symbol('t1'), NormBRDF=.3,
+                                  a=[1., 1., 1.]),
+                    geometry='mono',
+                    param_dict={'t1': res_dict['t1'][:, np.newaxis]},
+                    verbosity=0)
+        model_ref = 10. * np.log10(4. * np.pi * np.cos(inc) *
+                                   R_ref.calc()[0])
+        self.assertTrue(np.allclose(model, model_ref))
+
+        # the copies of the RT1-object use separate angle-terms
+        mu_0 = R._mu_0
+        valid = np.ones(inc.size, dtype=bool)
+        valid[::4] = False
+        rows = np.repeat(np.arange(3), 10)[valid]
+        R_sel = testfit._select_observations(R, valid, rows)
+        self.assertTrue(np.allclose(R_sel._mu_0,
+                                    np.cos(inc.ravel()[valid])[:, None]))
+        self.assertTrue(R._mu_0 is mu_0)
+
+    def test_parameter_layout(self):
+        # parameters are assigned in the order of the unique values
+        # of param_dyn_dict (also for non-monotonic param_dyn_dicts)
+        layout = ParameterLayout(['a', 'b'],
+                                 {'a': [3, 1, 3, 2], 'b': [1, 1, 1, 1]},
+                                 param_dict={'a': [.1, .2, .3], 'b': .5},
+                                 bounds_dict={'a': ([0.] * 3, [1.] * 3),
+                                              'b': ([0.], [2.])})
+        self.assertEqual(layout.nparams, 4)
+        self.assertTrue(np.allclose(layout.startvals, [.1, .2, .3, .5]))
+        self.assertTrue(np.allclose(layout.bounds[1], [1., 1., 1., 2.]))
+
+        params = np.array([1., 2., 3., 4.])
+        res = layout.unpack(params)
+        self.assertTrue(np.allclose(res['a'], [3., 1., 3., 2.]))
+        self.assertTrue(np.allclose(res['b'], [4., 4., 4., 4.]))
+
+        rows = np.array([0, 0, 2, 3])
+        res = layout.unpack(params, rows)
+        self.assertTrue(np.allclose(res['a'], [3., 3., 3., 2.]))
+
+        pattern = layout.jac_pattern(rows).toarray()
+        self.assertEqual(pattern.shape, (4, 4))
+        self.assertTrue(np.allclose(pattern[:, 2], [1, 1, 1, 0]))
+        self.assertTrue(np.allclose(pattern[:, 3], 1))
+
+    def test_calc_jac(self):
+        # the jacobian must be consistent with the mapping of the parameters
+        # (also for non-monotonic param_dyn_dicts) and it must include
+        # the contribution of the interaction-term
+        inc = np.array([np.deg2rad(np.linspace(25, 65, 10))] * 4)
+        V = Rayleigh(omega=0.3, tau=0.5)
+        SRF = HGsurface(ncoefs=8, t=sp.Symbol('t1'), NormBRDF=.3,
+                        a=[1., 1., 1.])
+        R = RT1(1., inc, inc, np.zeros_like(inc), np.full_like(inc, np.pi),
+                V=V, SRF=SRF, geometry='mono', param_dict={'t1': .2},
+                int_Q=True, verbosity=0)
+
+        order = ['omega', 'tau', 't1']
+        param_dyn_dict = {'omega': [2, 1, 2, 3], 'tau': [1, 2, 1, 2],
+                          't1': [1, 1, 1, 1]}
+        params = np.array([.2, .4, .6, .3, .5, .3])
+
+        get_res_dict = ParameterLayout(order, param_dyn_dict).unpack
+
+        testfit = Fits(sig0=True, dB=True)
+        jac = testfit._calc_jac(R, get_res_dict(params), param_dyn_dict,
+                                order).toarray()
+        self.assertEqual(jac.shape, (40, 6))
+
+        # compare to finite differences
+        for i in range(6):
+            dx = np.zeros(6)
+            dx[i] = 1e-6
+            diff = (np.concatenate(testfit._calc_model(
+                        R, get_res_dict(params + dx))) -
+                    np.concatenate(testfit._calc_model(
+                        R, get_res_dict(params - dx)))) / 2e-6
+
+            self.assertTrue(np.allclose(jac[:, i], diff, atol=1e-5))
+
+    def test_ragged(self):
+        # fitting only the valid observations must give the same results
+        # as the weighted fit of the rectangularized dataset
+        inc = np.array([np.deg2rad(np.linspace(25, 65, 15))] * 6)
+
+        np.random.seed(0)  # reset seed to have a reproducible test
+        V_data = Rayleigh(tau=np.random.uniform(.2, .8, 6),
+                          omega=np.random.uniform(.3, .4, 6))
+        SRF_data = HGsurface(ncoefs=8, t=.3, NormBRDF=.3, a=[1., 1., 1.])
+        R_data = RT1(1., inc, inc, np.zeros_like(inc),
+                     np.full_like(inc, np.pi), V=V_data, SRF=SRF_data,
+                     geometry='mono', verbosity=0)
+        data = R_data.calc()[0]
+
+        dataset = []
+        for i, n in enumerate([15, 3, 8, 2, 15, 5]):
+            dataset += [[inc[i][:n], data[i][:n]]]
+
+        V = Rayleigh(omega=0.1, tau=0.1)
+        SRF = HGsurface(ncoefs=8, t=sp.Symbol('t1'),
+                        NormBRDF=np.full(6, .3), a=[1., 1., 1.])
+        param_dict = {'tau': [.5] * 6, 'omega': .35, 't1': .2}
+        bounds_dict = {'tau': ([0.] * 6, [1.] * 6),
+                       'omega': ([0.], [1.]),
+                       't1': ([0.], [.5])}
+
+        testfit = Fits()
+        fits = [testfit.monofit(V, SRF, dataset, param_dict,
+                                bounds_dict=bounds_dict, param_dyn_dict={},
+                                ragged=ragged)
+                for ragged in [False, True]]
+
+        self.assertTrue(np.allclose(fits[0][0].x, fits[1][0].x, rtol=1e-5))
+        self.assertTrue(np.allclose(fits[0][0].fun, fits[1][0].fun,
+                                    atol=1e-8))
+        self.assertTrue(np.allclose(fits[0][0].jac.toarray(),
+                                    fits[1][0].jac.toarray()))
+
+    def test_monofit_batch(self):
+        # fit the same model to several datasets using a process-pool
+        # and compare the results to the results of monofit()
+        inc = np.array([np.deg2rad(np.linspace(25, 65, 15))] * 5)
+
+        np.random.seed(0)  # reset seed to have a reproducible test
+        datasets = []
+        for i in range(3):
+            V_data = Rayleigh(tau=np.random.uniform(.2, .8, 5),
+                              omega=np.random.uniform(.3, .4, 5))
+            SRF_data = HGsurface(ncoefs=8, t=.3, NormBRDF=.3,
+                                 a=[1., 1., 1.])
+            R_data = RT1(1., inc, inc, np.zeros_like(inc),
+                         np.full_like(inc, np.pi), V=V_data, SRF=SRF_data,
+                         geometry='mono', verbosity=0)
+            data = R_data.calc()[0]
+            datasets += [[[inc_i, data_i] for inc_i, data_i in zip(inc,
+                                                                   data)]]
+        # add a dataset that can not be fitted
+        datasets += [[[inc_i, np.full_like(inc_i, np.nan)] for inc_i in inc]]
+
+        V = Rayleigh(omega=0.1, tau=0.1)
+        SRF = HGsurface(ncoefs=8, t=sp.Symbol('t1'), NormBRDF=.3,
+                        a=[1., 1., 1.])
+        param_dict = {'tau': [.5] * 5, 'omega': .35, 't1': .2}
+        bounds_dict = {'tau': ([0.] * 5, [1.] * 5),
+                       'omega': ([0.], [1.]),
+                       't1': ([0.], [.5])}
+
+        testfit = Fits()
+        results = list(testfit.monofit_batch(V, SRF, datasets, param_dict,
+                                             bounds_dict=bounds_dict,
+                                             processes=2, chunksize=1))
+
+        self.assertEqual(sorted(i[0] for i in results), [0, 1, 2, 3])
+        for i, fit, error in results:
+            if i == 3:
+                self.assertTrue(fit is None)
+                self.assertTrue(isinstance(error, ValueError))
+                continue
+
+            self.assertTrue(error is None)
+            reffit = testfit.monofit(V, SRF, datasets[i], param_dict,
+                                     bounds_dict=bounds_dict,
+                                     param_dyn_dict={})
+            for key in param_dict:
+                self.assertTrue(np.allclose(fit[6][key], reffit[6][key]))
+
+            # the results of monofit must be pickleable
+            R = pickle.loads(pickle.dumps(reffit))[1]
+            self.assertTrue(np.allclose(
+                testfit._calc_model(R, reffit[6]),
+                testfit._calc_model(reffit[1], reffit[6])))
+
+    def test_monofit_batch_inprocess(self):
+        # concurrent in-process generators of monofit_batch() must use
+        # their own models
+        inc = np.array([np.deg2rad(np.linspace(25, 65, 15))] * 3)
+        R_data = RT1(1., inc, inc, np.zeros_like(inc),
+                     np.full_like(inc, np.pi),
+                     V=Rayleigh(tau=np.array([.3, .5, .7]), omega=.35),
+                     SRF=HGsurface(ncoefs=8, t=.3, NormBRDF=.3,
+                                   a=[1., 1., 1.]),
+                     geometry='mono', verbosity=0)
+        data = R_data.calc()[0]
+        datasets = [[[inc_i, data_i] for inc_i, data_i in zip(inc, data)]
+                    ] * 2
+
+        V = Rayleigh(omega=0.35, tau=0.1)
+        param_dict = {'tau': [.5] * 3, 't1': .2}
+        bounds_dict = {'tau': ([0.] * 3, [1.] * 3), 't1': ([0.], [.5])}
+        SRFs = [HGsurface(ncoefs=8, t=sp.Symbol('t1'), NormBRDF=i,
+                          a=[1., 1., 1.]) for i in [.3, .1]]
+
+        testfit = Fits()
+        batches = [testfit.monofit_batch(V, SRF, datasets, param_dict,
+                                         bounds_dict=bounds_dict,
+                                         processes=0, verbosity=0)
+                   for SRF in SRFs]
+        # evaluate the generators alternately
+        results = [[next(batch) for batch in batches] for i in range(2)]
+
+        for SRF, res in zip(SRFs, zip(*results)):
+            reffit = testfit.monofit(V, SRF, datasets[0], param_dict,
+                                     bounds_dict=bounds_dict,
+                                     param_dyn_dict={})
+            for i, fit, error in res:
+                self.assertTrue(error is None)
+                for key in param_dict:
+                    self.assertTrue(np.allclose(fit[6][key],
+                                                reffit[6][key]))
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -115,6 +115,17 @@ class TestSurface(unittest.TestCase):
             self.assertTrue(np.allclose(H.brdf(t_0[i], t_ex[i], p_0, p_ex),
                                         1. / np.pi))
 
+    def test_brdf_cache(self):
+        # the brdf-function must only be compiled once
+        S1 = CosineLobe(ncoefs=10, i=5, NormBRDF=1.)
+        S2 = CosineLobe(ncoefs=10, i=5, NormBRDF=1.)
+        t_0 = np.deg2rad(np.linspace(20., 60., 10))
+        b1 = S1.brdf(t_0, t_0, 0., np.pi)
+        b2 = S2.brdf(t_0, t_0, 0., np.pi)
+        self.assertTrue(np.allclose(b1, b2))
+        self.assertTrue(S1._get_lambda(S1._func, S1._func, []) is
+                        S2._get_lambda(S2._func, S2._func, []))
+
 
 if __name__ == "__main__":
     unittest.main()